@@ -0,0 +1,232 @@
+import os
+import time
+import operator
+import threading
+from collections import deque
+
+import numpy as np
+import risk_math
+
+# ==============================================================================
+# --- MOTOR DE ALERTAS EN STREAMING ---
+# ==============================================================================
+# Cada tick trae algunas métricas ({'price': ..., 'z_score': ...}); solo se evalúan
+# las reglas que leen esas métricas, en O(1) cada una. Todas las reglas se reducen
+# a una condición booleana por tick y comparten la misma máquina de estados:
+#   debounce -> la condición debe cumplirse N ticks seguidos
+#   disparo  -> solo en el flanco (se rearma cuando la condición deja de cumplirse)
+#   cooldown -> segundos mínimos entre dos disparos de la misma regla
+#   ttl      -> segundos que la alerta sigue activa en pantalla
+SEVERITY = {"info": 0, "warning": 1, "critical": 2}
+
+class Rule:
+    """
+    Base común. Las subclases implementan metrics y condition(values, t, state).
+    - message: texto del banner; admite {value} y los campos de la regla.
+    La regla es solo configuración (DEFAULT_RULES se comparte entre motores):
+    lo que depende del flujo de ticks vive en el _RuleState de cada motor.
+    """
+    initially_armed = True
+
+    def __init__(self, name, message, severity="warning", debounce=1, cooldown=900, ttl=300):
+        self.name = name
+        self.message = message
+        self.severity = severity
+        self.debounce = debounce
+        self.cooldown = cooldown
+        self.ttl = ttl
+
+    def condition(self, values, t, state):
+        raise NotImplementedError
+
+    def value(self, values, state):
+        return values.get(self.metric)
+
+class Threshold(Rule):
+    """metric <op> level (op: '<', '<=', '>', '>=')."""
+    OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+    def __init__(self, name, metric, op, level, message, **kwargs):
+        super().__init__(name, message, **kwargs)
+        self.metric, self.op, self.level = metric, op, level
+        self.metrics = (metric,)
+        self._cmp = self.OPS[op]
+
+    def condition(self, values, t, state):
+        return self._cmp(values[self.metric], self.level)
+
+class Crossover(Rule):
+    """metric cruza reference hacia 'above' o 'below'. No dispara si ya estaba cruzado al arrancar."""
+    initially_armed = False
+
+    def __init__(self, name, metric, reference, direction, message, **kwargs):
+        super().__init__(name, message, **kwargs)
+        self.metric, self.reference, self.direction = metric, reference, direction
+        self.metrics = (metric, reference)
+
+    def condition(self, values, t, state):
+        a, b = values.get(self.metric), values.get(self.reference)
+        if a is None or b is None: return None
+        return a > b if self.direction == "above" else a < b
+
+class RateOfChange(Rule):
+    """Cambio % de metric en los últimos `window` segundos: <= pct si pct < 0, >= pct si pct > 0."""
+    def __init__(self, name, metric, window, pct, message, **kwargs):
+        super().__init__(name, message, **kwargs)
+        self.metric, self.window, self.pct = metric, window, pct
+        self.metrics = (metric,)
+
+    def condition(self, values, t, state):
+        # Ventana deslizante: cada muestra entra y sale una vez (O(1) amortizado)
+        samples = state.samples
+        samples.append((t, values[self.metric]))
+        while len(samples) > 2 and samples[1][0] <= t - self.window:
+            samples.popleft()
+        t0, v0 = samples[0]
+        if t - t0 < self.window * 0.5 or not v0: return None    # Aún no hay ventana suficiente
+        state.change = change = (values[self.metric] / v0 - 1) * 100
+        return change <= self.pct if self.pct < 0 else change >= self.pct
+
+    def value(self, values, state):
+        return state.change
+
+class _RuleState:
+    """Estado de una regla dentro de un motor (máquina de estados + ventana de RateOfChange)."""
+    __slots__ = ("streak", "armed", "last_fired", "samples", "change")
+
+    def __init__(self, armed):
+        self.streak = 0
+        self.armed = armed
+        self.last_fired = -np.inf
+        self.samples = deque()
+        self.change = None
+
+class AlertEngine:
+    """
+    - rules: lista de reglas (por defecto DEFAULT_RULES).
+    update(metrics, t) devuelve las alertas disparadas en ese tick; current(t)
+    la alerta activa más grave (o None).
+    """
+    def __init__(self, rules=None):
+        self.rules = list(DEFAULT_RULES if rules is None else rules)
+        self.values = {}
+        self.fired = deque(maxlen=200)
+        self._state = {r.name: _RuleState(r.initially_armed) for r in self.rules}
+        self._by_metric = {}
+        for rule in self.rules:
+            for metric in rule.metrics:
+                self._by_metric.setdefault(metric, []).append(rule)
+        self._lock = threading.Lock()
+
+    def update(self, metrics, t=None):
+        t = time.time() if t is None else t
+        out = []
+        with self._lock:
+            values = self.values
+            touched = {}
+            for metric, value in metrics.items():
+                if value is None or value != value: continue    # NaN: sin dato
+                values[metric] = value
+                for rule in self._by_metric.get(metric, ()):
+                    touched[rule.name] = rule
+            for rule in touched.values():
+                alert = self._step(rule, values, t)
+                if alert: out.append(alert)
+        return out
+
+    def _step(self, rule, values, t):
+        state = self._state[rule.name]
+        hit = rule.condition(values, t, state)
+        if hit is None: return None
+        if not hit:
+            state.streak = 0
+            state.armed = True
+            return None
+        state.streak += 1
+        if not state.armed or state.streak < rule.debounce or t - state.last_fired < rule.cooldown:
+            return None
+        state.armed = False
+        state.last_fired = t
+        value = rule.value(values, state)
+        alert = {
+            'id': f"{rule.name}:{int(t)}",
+            'rule': rule.name,
+            'severity': rule.severity,
+            'message': rule.message.format(value=value, **vars(rule)),
+            'value': value,
+            't': t,
+            'expires': t + rule.ttl,
+        }
+        self.fired.append(alert)
+        return alert
+
+    def current(self, t=None):
+        """Alerta activa más grave (y más reciente a igual gravedad)."""
+        t = time.time() if t is None else t
+        with self._lock:
+            live = [a for a in self.fired if a['expires'] > t]
+        if not live: return None
+        return max(live, key=lambda a: (SEVERITY.get(a['severity'], 0), a['t']))
+
+# ==============================================================================
+# --- REGLAS DE MERCADO POR DEFECTO ---
+# ==============================================================================
+DEFAULT_RULES = [
+    Threshold("credit_critical", "credit_buffer", "<", risk_math.CRITICAL_BUFFER,
+              "Credit line safety buffer at {value:.1%} (liquidation zone)",
+              severity="critical", debounce=2, cooldown=3600, ttl=600),
+    RateOfChange("btc_crash_1h", "price", 3600, -5.0, "BTC {value:+.1f}% in the last hour",
+                 severity="critical", debounce=2, cooldown=3600, ttl=600),
+    RateOfChange("btc_pump_1h", "price", 3600, 5.0, "BTC {value:+.1f}% in the last hour",
+                 severity="warning", debounce=2, cooldown=3600),
+    Threshold("zscore_overheated", "z_score", ">", 2.5, "Z-Score at {value:+.2f}: price stretched above the 200D mean"),
+    Threshold("zscore_capitulation", "z_score", "<", -2.0, "Z-Score at {value:+.2f}: deep mean-reversion zone"),
+    Threshold("volatility_spike", "volatility", ">", 0.9, "30D volatility at {value:.0%}"),
+    Crossover("trend_break", "price", "sma_50", "below", "BTC lost the 50D moving average", debounce=3, cooldown=6 * 3600),
+]
+
+def market_metrics(btc_df, price=None, line=None):
+    """
+    Métricas de un tick a partir del frame BTC y del precio vivo.
+    line: línea de crédito ya concedida (risk_math.simulate_credit_line al precio de
+    entrada); sin ella no hay 'credit_buffer'. Re-dimensionar el colateral al precio
+    vivo daría siempre el mismo colchón y credit_critical no saltaría nunca.
+    """
+    if btc_df is None or btc_df.empty: return {}
+    last = btc_df.iloc[-1]
+    price = price or float(last['close'])
+    metrics = {
+        'price': price,
+        'z_score': float(last['z_score']),
+        'volatility': float(last['volatility']),
+        'sma_50': float(last['sma_50']),
+    }
+    if line is not None: metrics['credit_buffer'] = risk_math.credit_buffer(price, line)
+    return metrics
+
+def credit_entry_price():
+    """VOLCANO_CREDIT_ENTRY_PRICE: precio al que se concedió la línea vigilada (None -> el primer precio visto)."""
+    raw = os.getenv("VOLCANO_CREDIT_ENTRY_PRICE")
+    try: return float(raw) if raw else None
+    except ValueError:
+        print(f"Alerts Config Error: VOLCANO_CREDIT_ENTRY_PRICE={raw!r} is not a number")
+        return None
+
+def make_alert_refresher(refresh, engine=None, entry_price=None):
+    """
+    Función para el scheduler: un tick por refresco del precio vivo; devuelve la alerta activa.
+    La línea de crédito se concede una vez (entry_price, o el primer precio visto) y
+    su colateral queda fijo.
+    """
+    engine = engine or AlertEngine()
+    entry_price = entry_price or credit_entry_price()
+    booked = {'line': risk_math.simulate_credit_line(entry_price) if entry_price else None}
+
+    def refresh_alerts():
+        btc = ((refresh.value("market") or {}).get('frames') or {}).get('BTC')
+        price = (refresh.value("live_prices", max_age=60) or {}).get('BTC')
+        if booked['line'] is None and btc is not None and not btc.empty:
+            booked['line'] = risk_math.simulate_credit_line(price or float(btc['close'].iloc[-1]))
+        engine.update(market_metrics(btc, price, booked['line']))
+        return engine.current()
+    return refresh_alerts
@@ -0,0 +1,255 @@
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# --- BACKTEST DE LAS SEÑALES DEL DASHBOARD (Vectorizado) ---
+# ==============================================================================
+# ¿Qué habría rendido seguir cada señal que enseña la pantalla?
+#   - trend:         largo si el cierre está sobre la SMA (BULLISH), fuera si no.
+#   - zscore:        se sale al tocar la banda +band (sobrecalentado) y se vuelve
+#                    a entrar cuando el z-score baja a `reentry`.
+#   - power_law:     se compra en el soporte y se vende en la resistencia del
+#                    corredor, con la regresión log-log ajustada solo con el
+#                    pasado (mínimos cuadrados acumulados, sin mirar al futuro).
+#   - golden_pocket: se compra el retroceso al golden pocket (0.618-0.65) del
+#                    rango de 365 días; se vende en el 0.236 o si pierde el 0.786.
+# Todo es largo/fuera (spot, sin apalancamiento). Cada estrategia es una
+# columna de una matriz (fecha x parámetros): posiciones, P&L y métricas salen
+# de operaciones sobre la matriz completa, sin bucles por día. La posición
+# decidida al cierre de t cobra el rendimiento de t a t+1.
+#   VOLCANO_BACKTEST_WORKERS=n  -> procesos para los barridos (por defecto: en este
+#                                  proceso salvo rejillas enormes, ver PARALLEL_MIN_CELLS)
+ANNUAL = 365
+FEE = 0.001                 # 10 pb por cambio de posición (comisión + deslizamiento)
+WARMUP = 400                # Días de calentamiento: todas las variantes arrancan el mismo día
+MIN_DAYS = WARMUP + ANNUAL
+GENESIS = pd.Timestamp("2009-01-03")
+
+STRATEGIES = {
+    "trend":         {"label": "Trend (SMA50)",       "params": {"window": 50}},
+    "zscore":        {"label": "Z-Score ±3",          "params": {"window": 200, "band": 3.0, "reentry": 0.0}},
+    "power_law":     {"label": "Power Law Corridor",  "params": {"support": -0.35, "resistance": 0.5}},
+    "golden_pocket": {"label": "Fib Golden Pocket",   "params": {"lookback": 365}},
+}
+
+# Rejillas de los barridos (miles de combinaciones)
+TREND_WINDOWS = np.arange(10, WARMUP + 1, 2)                      # 196 ventanas
+ZSCORE_WINDOWS = np.arange(50, WARMUP + 1, 10)                    # 36
+ZSCORE_BANDS = np.arange(1.5, 4.01, 0.25)                         # 11
+ZSCORE_REENTRIES = np.arange(-2.0, 1.01, 0.5)                     # 7 -> 2772 combinaciones
+
+# ==============================================================================
+# --- 1. SEÑALES -> POSICIONES (Matriz fecha x variante) ---
+# ==============================================================================
+def hold_positions(enter, leave, initial=0.0):
+    """
+    Posición 1/0 que se mantiene entre eventos: entra con `enter`, sale con
+    `leave` (gana leave si coinciden). Forward-fill del último evento por
+    columna con un máximo acumulado de índices.
+    """
+    state = np.where(leave, 0.0, np.where(enter, 1.0, np.nan))
+    rows = np.arange(state.shape[0]).reshape((-1,) + (1,) * (state.ndim - 1))
+    last = np.maximum.accumulate(np.where(np.isnan(state), -1, rows), axis=0)
+    held = np.take_along_axis(state, np.clip(last, 0, None), axis=0)
+    return np.where(last < 0, initial, held)
+
+def rolling_stats(close, windows):
+    """Media y desviación (ddof=1) móviles para varias ventanas a la vez: matrices (fecha x ventana)."""
+    windows = np.asarray(windows)
+    c1 = np.concatenate([[0.0], np.cumsum(close)])
+    c2 = np.concatenate([[0.0], np.cumsum(close * close)])
+    hi = np.arange(1, len(close) + 1)[:, None]
+    lo = hi - windows[None, :]
+    ok = lo >= 0
+    lo = np.clip(lo, 0, None)
+    s1, s2 = c1[hi] - c1[lo], c2[hi] - c2[lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(ok, s1 / windows, np.nan)
+        var = np.where(ok, (s2 - s1 * s1 / windows) / (windows - 1), np.nan)
+    return mean, np.sqrt(np.clip(var, 0, None))
+
+def trend_positions(close, windows=(50,)):
+    """Largo mientras el cierre está sobre la SMA de cada ventana."""
+    sma, _ = rolling_stats(close, windows)
+    return (close[:, None] > sma).astype(np.float64)        # NaN (calentamiento) -> fuera
+
+def zscore_positions(close, window=200, bands=(3.0,), reentries=(0.0,)):
+    """
+    Z-score sobre la SMA de `window` (como compute_indicators). Columnas:
+    producto band x reentry (band varía más lento). Arranca invertido.
+    """
+    mean, std = rolling_stats(close, [window])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = (close[:, None] - mean) / np.where(std == 0, np.nan, std)
+    band, reentry = (a.ravel()[None, :] for a in np.meshgrid(bands, reentries, indexing='ij'))
+    return hold_positions(z <= reentry, z >= band, initial=1.0)
+
+def power_law_residual(close, dates):
+    """
+    Distancia (log10) del precio a la recta log-log ajustada con los datos
+    hasta cada fecha: mínimos cuadrados con sumas acumuladas.
+    """
+    x = np.log10(np.asarray((dates - GENESIS).days, dtype=np.float64))
+    y = np.log10(close)
+    x0 = x[0]                  # Centrado: evita cancelación en n·Sxx - Sx²
+    x = x - x0
+    n = np.arange(1, len(x) + 1)
+    sx, sy, sxx, sxy = np.cumsum(x), np.cumsum(y), np.cumsum(x * x), np.cumsum(x * y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+    resid = y - (intercept + slope * x)
+    resid[:ANNUAL] = np.nan                                 # Ajuste con menos de un año: sin señal
+    return resid
+
+def power_law_positions(close, dates, support=-0.35, resistance=0.5):
+    resid = power_law_residual(close, dates)[:, None]
+    return hold_positions(resid <= support, resid >= resistance)
+
+def golden_pocket_positions(close, lookback=365):
+    """Retrocesos de Fibonacci sobre el máximo/mínimo de `lookback` días (como el gráfico de la Vista 1)."""
+    s = pd.Series(close)
+    hi = s.rolling(lookback).max().to_numpy()
+    lo = s.rolling(lookback).min().to_numpy()
+    level = lambda f: (hi - (hi - lo) * f)[:, None]
+    c = close[:, None]
+    enter = (c <= level(0.618)) & (c >= level(0.65))
+    leave = (c >= level(0.236)) | (c < level(0.786))
+    return hold_positions(enter, leave)
+
+# ==============================================================================
+# --- 2. P&L Y MÉTRICAS (Por columna) ---
+# ==============================================================================
+def performance(positions, close, start=WARMUP, fee=FEE, curves=False):
+    """
+    Métricas de cada columna desde `start`: total, cagr, sharpe, max_dd,
+    exposure y trades (entradas). Con curves=True añade la curva de capital.
+    """
+    ret = close[1:] / close[:-1] - 1
+    held = positions[:-1]                                    # Posición de t cobra t -> t+1
+    turnover = np.abs(np.diff(held, axis=0, prepend=0.0))
+    pnl = (held * ret[:, None] - fee * turnover)[start:]
+    equity = np.cumprod(1 + pnl, axis=0)
+    years = len(pnl) / ANNUAL
+    std = pnl.std(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, pnl.mean(axis=0) / std * np.sqrt(ANNUAL), 0.0)
+    out = {
+        'total': equity[-1] - 1,
+        'cagr': equity[-1] ** (1 / years) - 1,
+        'sharpe': sharpe,
+        'max_dd': (equity / np.maximum.accumulate(equity, axis=0) - 1).min(axis=0),
+        'exposure': held[start:].mean(axis=0),
+        'trades': (np.diff(held[start:], axis=0) > 0).sum(axis=0),
+    }
+    if curves: out['equity'] = equity
+    return out
+
+# ==============================================================================
+# --- 3. BARRIDOS DE PARÁMETROS (En paralelo entre núcleos) ---
+# ==============================================================================
+# Arrancar procesos con spawn (importar numpy/pandas en cada uno) cuesta ~1-2 s; el
+# barrido de 10 años (3650 días x 2968 variantes, ~11M celdas) tarda ~0.7 s en
+# este proceso. Solo compensa repartir por encima de ~100M celdas (fecha x variante).
+PARALLEL_MIN_CELLS = 100_000_000
+
+def grid_size():
+    return len(TREND_WINDOWS) + len(ZSCORE_WINDOWS) * len(ZSCORE_BANDS) * len(ZSCORE_REENTRIES)
+
+def default_workers(cells=None):
+    """Procesos del barrido: VOLCANO_BACKTEST_WORKERS manda; si no, 1 por debajo de PARALLEL_MIN_CELLS."""
+    try: forced = int(os.getenv("VOLCANO_BACKTEST_WORKERS", "0"))
+    except ValueError: forced = 0
+    if forced > 0: return forced
+    if cells is not None and cells < PARALLEL_MIN_CELLS: return 1
+    return os.cpu_count() or 1
+
+def _trend_chunk(close, windows):
+    return performance(trend_positions(close, windows), close)
+
+def _zscore_chunk(close, window):
+    return performance(zscore_positions(close, window, ZSCORE_BANDS, ZSCORE_REENTRIES), close)
+
+def sweep(close, workers=None):
+    """
+    Trend: una variante por ventana de SMA. Z-score: ventana x banda x reentrada.
+    Cada proceso recibe el array de cierres (unos KB) y un bloque de la rejilla.
+    """
+    workers = workers or default_workers(len(close) * grid_size())
+    trend_chunks = [c for c in np.array_split(TREND_WINDOWS, workers) if len(c)]
+    tasks = [(_trend_chunk, (close, chunk)) for chunk in trend_chunks]
+    tasks += [(_zscore_chunk, (close, int(w))) for w in ZSCORE_WINDOWS]
+
+    results = None
+    if workers > 1:
+        # spawn: el proceso padre tiene hilos (scheduler) y fork no es seguro con ellos
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = [f.result() for f in [pool.submit(fn, *args) for fn, args in tasks]]
+        except Exception as e:
+            print(f"Backtest Pool Error: {e}")         # Se repite en este proceso
+    if results is None:
+        results = [fn(*args) for fn, args in tasks]
+
+    merge = lambda parts: pd.DataFrame({k: np.concatenate([p[k] for p in parts]) for k in parts[0]})
+    trend = merge(results[:len(trend_chunks)]).set_axis(pd.Index(TREND_WINDOWS, name='window'))
+    grid = pd.MultiIndex.from_product([ZSCORE_WINDOWS, ZSCORE_BANDS, ZSCORE_REENTRIES], names=['window', 'band', 'reentry'])
+    zscore = merge(results[len(trend_chunks):]).set_axis(grid)
+    return {'trend': trend, 'zscore': zscore}
+
+def _robustness(table, default):
+    """Posición de los parámetros del dashboard dentro del barrido (por Sharpe)."""
+    sharpe = table['sharpe']
+    best = sharpe.idxmax()
+    return {
+        'combinations': len(table),
+        'beats': float((sharpe < sharpe.loc[default]).mean()),
+        'best': best,
+        'best_sharpe': float(sharpe.max()),
+    }
+
+# ==============================================================================
+# --- 4. RESUMEN PARA LA PANTALLA ---
+# ==============================================================================
+def run_backtests(df, workers=None, with_sweep=True):
+    """
+    Backtest de las cuatro señales sobre fetch_full_history():
+    - table: DataFrame (estrategia x métricas) con la señal actual.
+    - equity: curvas de capital (incluido buy & hold) para el gráfico.
+    - sweep / robustness: barridos y dónde quedan los parámetros por defecto.
+    """
+    if df is None or len(df) < MIN_DAYS: raise ValueError("Not enough price history to backtest")
+    close = df['close'].to_numpy(dtype=np.float64)
+    dates = df.index.tz_localize(None) if df.index.tz is not None else df.index
+
+    p = {name: spec['params'] for name, spec in STRATEGIES.items()}
+    positions = np.hstack([
+        trend_positions(close, [p['trend']['window']]),
+        zscore_positions(close, p['zscore']['window'], [p['zscore']['band']], [p['zscore']['reentry']]),
+        power_law_positions(close, dates, **p['power_law']),
+        golden_pocket_positions(close, **p['golden_pocket']),
+        np.ones((len(close), 1)),                                   # Buy & hold
+    ])
+    names = list(STRATEGIES) + ['buy_hold']
+    perf = performance(positions, close, curves=True)
+    table = pd.DataFrame({k: v for k, v in perf.items() if k != 'equity'}, index=names)
+    table['label'] = [STRATEGIES[n]['label'] if n in STRATEGIES else "Buy & Hold" for n in names]
+    table['signal'] = np.where(positions[-1] > 0, "LONG", "FLAT")
+
+    result = {
+        'start': dates[WARMUP],
+        'end': dates[-1],
+        'table': table,
+        'equity': pd.DataFrame(perf['equity'].astype(np.float32), index=dates[WARMUP + 1:], columns=names),
+    }
+    if with_sweep:
+        result['sweep'] = sweep(close, workers)
+        result['robustness'] = {
+            'trend': _robustness(result['sweep']['trend'], p['trend']['window']),
+            'zscore': _robustness(result['sweep']['zscore'], tuple(p['zscore'].values())),
+        }
+    return result
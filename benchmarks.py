@@ -0,0 +1,489 @@
+"""
+Benchmarks del dashboard (se ejecutan a mano, no forman parte del render).
+
+Mide tiempo (mediana de varias repeticiones) y pico de memoria (tracemalloc)
+de indicadores, risk_math y constructores de gráficos sobre datos con tamaño
+de producción: 2y diario, 10y diario, 1y horario y un libro de 300 niveles.
+
+Uso:
+    python benchmarks.py                     # todos, compara contra la línea base
+    python benchmarks.py charts risk         # solo los que contienen esas palabras
+    python benchmarks.py --save-baseline     # guarda los resultados como línea base
+    python benchmarks.py --threshold 0.5     # tolerancia de regresión (50%)
+
+Con VOLCANO_FEED_MODE=replay los frames de mercado salen del log grabado
+(ver upstream.py) en lugar de los datos sintéticos.
+
+Sale con código 1 si alguna función empeora más que el umbral.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from statistics import median
+
+import numpy as np
+import pandas as pd
+
+import upstream
+import data_fetcher, news_fetcher, risk_math, charts, correlation, hashrate, etfs, alerts, candles, colstore, warmstart, ivsurface, liquidation, backtest, regime, scheduler, rotation, heartbeat, slippage
+
+BASELINE_FILE = "benchmarks_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# Holgura absoluta para que funciones de microsegundos no den falsos positivos
+MIN_SLACK_SECONDS = 1e-4
+MIN_SLACK_BYTES = 64 * 1024
+
+# ==============================================================================
+# --- 1. DATOS SINTÉTICOS (Tamaño de producción) ---
+# ==============================================================================
+_WORDS = [
+    "market", "price", "traders", "pirate", "bank", "rates", "bitcoin", "gold",
+    "fed", "china", "lawsuit", "record", "week", "investors", "oil", "inflation",
+    "federal", "reserve", "tax", "etfs", "army", "outlook", "crypto", "stocks",
+]
+
+def synthetic_headlines(n=100_000, seed=7):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 14))).capitalize() for _ in range(n)]
+
+def synthetic_ohlcv(periods, freq="D", start_price=30000.0, seed=42, end="2025-01-01"):
+    """Paseo aleatorio log-normal con OHLCV coherente (columnas en minúsculas)."""
+    rng = np.random.default_rng(seed)
+    step_vol = 0.035 if freq == "D" else 0.035 / np.sqrt(24)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0005, step_vol, periods)))
+    open_ = np.concatenate([[start_price], close[:-1]])
+    spread = np.abs(rng.normal(0, step_vol, periods)) * close
+    idx = pd.date_range(end=end, periods=periods, freq=freq, name="Date")
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.uniform(1e9, 5e10, periods),
+    }, index=idx)
+
+def synthetic_close_panel(periods, n_assets, seed=21):
+    """Panel de cierres (fecha x activo) para medir el coste por número de activos."""
+    frames = {f"A{i}": synthetic_ohlcv(periods, seed=seed + i)["close"] for i in range(n_assets)}
+    return pd.DataFrame(frames)
+
+def synthetic_order_book(levels=300, mid=96000.0, seed=3):
+    rng = np.random.default_rng(seed)
+    half = levels // 2
+    steps = np.arange(1, half + 1) / 1000
+    bids = pd.DataFrame({"price": mid * (1 - steps), "amount": rng.uniform(0.1, 5, half), "side": "bid"})
+    asks = pd.DataFrame({"price": mid * (1 + steps), "amount": rng.uniform(0.1, 5, half), "side": "ask"})
+    df = pd.concat([bids, asks])
+    df["is_simulated"] = True
+    return df
+
+def synthetic_macro(periods=130, seed=11):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2025-01-01", periods=periods, name="Date")
+    cols = ["Bitcoin", "S&P 500", "Gold", "DXY (Dollar)"]
+    paths = np.exp(np.cumsum(rng.normal(0, 0.01, (periods, len(cols))), axis=0)) - 1
+    return pd.DataFrame(paths, index=idx, columns=cols)
+
+def synthetic_macro_prices(periods=365, seed=13):
+    """Cierres crudos con calendario mixto: BTC 24/7, el resto solo L-V."""
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range(end="2025-01-01", periods=periods, freq="D", name="Date")
+    cols = ["Bitcoin", "S&P 500", "Gold", "DXY (Dollar)"]
+    prices = pd.DataFrame(np.exp(np.cumsum(rng.normal(0, 0.015, (periods, len(cols))), axis=0)), index=idx, columns=cols)
+    prices.loc[prices.index.dayofweek >= 5, cols[1:]] = np.nan
+    return prices
+
+def synthetic_hash_rate(periods, seed=5, end="2025-01-01"):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range(end=end, periods=periods, freq="D", name="Date")
+    hash_rate = 1e6 * np.exp(np.linspace(0, 6, periods) + rng.normal(0, 0.05, periods))
+    return pd.DataFrame({"hash_rate": hash_rate}, index=idx)
+
+def synthetic_derivatives(n=5000, seed=17):
+    """Respuesta tipo CoinGecko /derivatives (lista de dicts con huecos)."""
+    rng = random.Random(seed)
+    return [{
+        "market": f"Exchange {i % 80}", "symbol": "BTCUSDT",
+        "index_id": rng.choice(["BTC", "ETH", "SOL", "XRP"]),
+        "contract_type": rng.choice(["perpetual", "futures"]),
+        "funding_rate": rng.uniform(-0.02, 0.03) if rng.random() > 0.1 else None,
+        "open_interest": rng.uniform(1e6, 5e9) if rng.random() > 0.1 else None,
+    } for i in range(n)]
+
+def synthetic_etf_basket(n=12, periods=25, seed=23):
+    """Cache de ETFBasketMonitor: {ticker: ['close', 'volume']} en días hábiles."""
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2025-01-03", periods=periods, name="Date")
+    return {f"ETF{i}": pd.DataFrame({
+        "close": 40 * np.exp(np.cumsum(rng.normal(0, 0.02, periods))),
+        "volume": rng.lognormal(16, 0.4, periods),
+    }, index=idx) for i in range(n)}
+
+def synthetic_ticks(n=10_000, seed=29):
+    """Ticks del motor de alertas (uno por segundo): precio vivo + métricas de la barra."""
+    rng = np.random.default_rng(seed)
+    price = 96000 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    z = np.cumsum(rng.normal(0, 0.05, n))
+    line = risk_math.simulate_credit_line(96000)       # Línea concedida al precio inicial
+    return [{"price": p, "z_score": zz, "volatility": 0.55, "sma_50": 95000.0, "credit_buffer": risk_math.credit_buffer(p, line)}
+            for p, zz in zip(price.tolist(), z.tolist())]
+
+def _alert_stream(ticks):
+    """Callable que pasa todos los ticks por un motor nuevo (reglas por defecto)."""
+    def run():
+        engine = alerts.AlertEngine()
+        for t, tick in enumerate(ticks):
+            engine.update(tick, t=t)
+        return engine
+    return run
+
+def _candle_ticks(market_2y, n=1000):
+    """Callable que fusiona n ticks en la vela del día de un frame de 2 años."""
+    base = {'frames': {'BTC': market_2y}}
+    t0 = (market_2y.index[-1] + pd.Timedelta(hours=1)).timestamp()
+    prices = (float(market_2y['close'].iloc[-1]) * (1 + np.random.default_rng(31).normal(0, 0.001, n))).tolist()
+
+    def run():
+        multi = base
+        agg = candles.CandleAggregator()
+        for i, p in enumerate(prices):
+            multi = agg.apply(multi, {'BTC': p}, t=t0 + i)
+        return multi
+    return run
+
+def _barrier_tick(spot, sigma):
+    ensemble = liquidation.get_ensemble(sigma)       # En producción lo publica la fuente 'credit_paths'
+    def run():
+        return liquidation.credit_barrier_risk(spot, sigma, ensemble=ensemble)
+    return run
+
+def _regime_update(returns):
+    model = regime.GaussianHMM()
+    model.fit(returns.iloc[:-1])
+    alpha, last_date = model.alpha, model.last_date
+    def run():
+        model.alpha, model.last_date = alpha, last_date
+        return model.update(returns.iloc[-2:])
+    return run
+
+def _chart_tick(create, df):
+    """Callable que mueve el último cierre y redibuja: solo se rellenan los arrays (mide el gráfico, no la copia del tick)."""
+    df = df.copy()
+    col = df.columns.get_loc('close')
+    base = float(df['close'].iloc[-1])
+    state = {'n': 0}
+    def run():
+        state['n'] += 1
+        df.iloc[-1, col] = base * (1 + 1e-4 * (state['n'] % 50))
+        return create(df)
+    return run
+
+def _chart_cold(skeleton, create, df):
+    """Callable que descarta el esqueleto antes de cada render (coste del primer gráfico del proceso)."""
+    def run():
+        skeleton.reset()
+        return create(df)
+    return run
+
+def _heartbeat_watch(n=1000):
+    """Callable con n comprobaciones del vigía (lo que paga cada sesión entre reruns completos)."""
+    refresh = scheduler.RefreshScheduler()
+    for name in ("market", "live_prices", "etf", "news", "fng", "alerts", "breaking"):
+        refresh.register(name, lambda: None, cadence=600)
+    beat = heartbeat.Heartbeat(rotation.PlaylistClock(), refresh)
+    prices = {"BTC": 96000.0, "ETH": 3400.0, "SOL": 190.0}
+    shown = beat.stamp(["market", "live_prices", "etf"], prices)
+    def run():
+        for _ in range(n): beat.due(shown, prices)
+    return run
+
+def _column_store(df):
+    """Almacén columnar temporal con la serie 'full_10y' ya escrita."""
+    store = colstore.ColumnStore(tempfile.mkdtemp(prefix="volcano_bench_"))
+    store.write("full_10y", df)
+    return store
+
+def _pickle_snapshot(df):
+    """Snapshot pickle temporal de df (lo que hacía warmstart para full_history)."""
+    store = warmstart.SnapshotStore(tempfile.mkdtemp(prefix="volcano_bench_"))
+    store.save("full_10y", df)
+    return store
+
+def synthetic_option_chain(n_expiries=12, n_strikes=200, seed=37, now=None):
+    """Respuesta tipo Deribit get_book_summary_by_currency (calls y puts con smile conocido)."""
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp.now(tz=None).normalize() if now is None else now
+    rows = []
+    for i in range(n_expiries):
+        expiry = now + pd.Timedelta(days=int(3 + i * i * 3)) + pd.Timedelta(hours=ivsurface.EXPIRY_HOUR)
+        t = (expiry - pd.Timestamp(time.time(), unit='s')).total_seconds() / ivsurface.YEAR
+        forward = 96000 * (1 + 0.08 * t)
+        strikes = np.round(forward * np.exp(np.linspace(-0.9, 0.9, n_strikes)), -2)
+        m = np.log(strikes / forward)
+        iv = 0.5 + 0.08 * np.sqrt(t) + 0.25 * m * m - 0.08 * m
+        for is_call in (True, False):
+            price, _ = ivsurface.black76(strikes / forward, np.full(n_strikes, t), iv, np.full(n_strikes, is_call))
+            code = f"{expiry.day}{expiry:%b%y}".upper()
+            rows.extend({
+                "instrument_name": f"BTC-{code}-{int(k)}-{'C' if is_call else 'P'}",
+                "mark_price": float(p), "underlying_price": forward,
+                "mark_iv": float(v * 100), "open_interest": float(rng.uniform(0, 500)),
+            } for k, p, v in zip(strikes, price, iv))
+    return rows
+
+def _raw_market(period, interval, periods, freq):
+    """Frame OHLCV crudo: grabado si estamos en replay, sintético si no."""
+    if upstream.feed_mode() == "replay":
+        df = upstream.yf_history("BTC-USD", period=period, interval=interval)
+        df.columns = [c.lower() for c in df.columns]
+        if df.index.tz is not None: df.index = df.index.tz_localize(None)
+        return df[["open", "high", "low", "close", "volume"]]
+    return synthetic_ohlcv(periods, freq)
+
+def _raw_hash_rate(periods, end):
+    """Hash rate diario: grabado en replay (fetch_hash_rate), sintético si no."""
+    if upstream.feed_mode() == "replay":
+        df = data_fetcher.fetch_hash_rate("all")
+        if not df.empty: return df
+    return synthetic_hash_rate(periods, end=end)
+
+def _hash_update(stored, new):
+    """Callable que aplica `new` sobre un almacén con `stored` (se restaura en cada repetición)."""
+    engine = hashrate.HashRibbonEngine(None)   # Solo en memoria: el benchmark no toca disco
+    engine.update(stored)
+    base = engine.frame
+
+    def run():
+        engine.frame = base
+        return engine.update(new)
+    return run
+
+def build_fixtures():
+    raw_2y = _raw_market("2y", "1d", 730, "D")
+    raw_1y_h = _raw_market("1y", "1h", 365 * 24, "h")
+    full_10y = _raw_market("max", "1d", 3650, "D")
+    return {
+        "colstore_10y": _column_store(full_10y),
+        "pickle_10y": _pickle_snapshot(full_10y),
+        "raw_2y": raw_2y,
+        "raw_1y_h": raw_1y_h,
+        "market_2y": data_fetcher.compute_indicators(raw_2y.copy(), "1d"),
+        "full_10y": full_10y,
+        "hash_10y": _raw_hash_rate(len(full_10y), end=full_10y.index[-1]),
+        "book_300": synthetic_order_book(300),
+        "book_10k": synthetic_order_book(10_000),
+        "macro_6mo": synthetic_macro(),
+        "macro_prices_1y": synthetic_macro_prices(),
+        "headlines_100k": synthetic_headlines(100_000),
+        "derivatives_5k": synthetic_derivatives(5000),
+        "etf_basket_12": synthetic_etf_basket(12),
+        "ticks_10k": synthetic_ticks(10_000),
+        "option_chain_4k": synthetic_option_chain(),
+        "panel_3": synthetic_close_panel(730, 3),
+        "panel_30": synthetic_close_panel(730, 30),
+    }
+
+# ==============================================================================
+# --- 2. CATÁLOGO DE BENCHMARKS ---
+# ==============================================================================
+# nombre -> función que recibe los fixtures y devuelve el callable a medir.
+# compute_indicators muta su entrada, así que recibe una copia (incluida en la medición).
+BENCHMARKS = {
+    # Indicadores
+    "indicators_2y_daily":   lambda f: lambda: data_fetcher.compute_indicators(f["raw_2y"].copy(), "1d"),
+    "indicators_1y_hourly":  lambda f: lambda: data_fetcher.compute_indicators(f["raw_1y_h"].copy(), "1h"),
+    "panel_indicators_3":    lambda f: lambda: data_fetcher.compute_panel_indicators(f["panel_3"], "1d"),
+    "panel_indicators_30":   lambda f: lambda: data_fetcher.compute_panel_indicators(f["panel_30"], "1d"),
+    # Risk math
+    "risk_volatility_10y":   lambda f: lambda: risk_math.calculate_volatility(f["full_10y"]["close"]),
+    "risk_implied_vol_2y":   lambda f: lambda: risk_math.simulate_implied_volatility(f["market_2y"]["volatility"]),
+    "risk_mvrv_proxy_10y":   lambda f: lambda: risk_math.calculate_mvrv_proxy(f["full_10y"]),
+    # Barreras de la línea de crédito: tick con el ensemble ya simulado y simulación completa (10k x 365)
+    "credit_barrier_tick":   lambda f: _barrier_tick(96000, 0.55),
+    "credit_paths_jump_10k": lambda f: lambda: liquidation.PathEnsemble(0.55, model="jump"),
+    "risk_var_metrics":      lambda f: lambda: risk_math.calculate_var_metrics(96000, 0.55, 30, "99.0%", 5_000_000),
+    "hash_signals_10y":      lambda f: lambda: hashrate.ribbon_signals(f["hash_10y"]["hash_rate"]),
+    # Actualización diaria: la descarga de 90 días trae un día nuevo sobre 10 años guardados
+    "hash_update_1d":        lambda f: _hash_update(f["hash_10y"].iloc[:-1], f["hash_10y"].iloc[-90:]),
+    "derivatives_parse_5k":  lambda f: lambda: data_fetcher.parse_derivatives(f["derivatives_5k"], "BTC"),
+    "etf_basket_table_12":   lambda f: lambda: etfs.basket_table(f["etf_basket_12"]),
+    # Vela en curso: 1000 ticks fusionados en sitio (OHLC + indicadores de la última fila)
+    "candle_merge_1k_ticks": lambda f: _candle_ticks(f["market_2y"]),
+    # Historial compartido: abrir el mapeo (sin deserializar) frente a cargar el pickle
+    "colstore_open_10y":     lambda f: lambda: colstore.ColumnStore(f["colstore_10y"].directory).frame("full_10y"),
+    "snapshot_pickle_10y":   lambda f: lambda: f["pickle_10y"].load("full_10y"),
+    "colstore_window_1y":    lambda f: lambda: f["colstore_10y"].window("full_10y", last=365, columns=["close", "volume"]),
+    # Regímenes: ajuste EM sobre 10 años y filtrado de una barra nueva (O(K²))
+    "regime_fit_10y":        lambda f: lambda: regime.GaussianHMM().fit(regime.log_returns(f["full_10y"]["close"])),
+    "regime_update_1bar":    lambda f: _regime_update(regime.log_returns(f["full_10y"]["close"])),
+    # Backtest de las 4 señales sobre 10 años y barrido completo (~3k combinaciones, en este proceso)
+    "backtest_signals_10y":  lambda f: lambda: backtest.run_backtests(f["full_10y"], with_sweep=False),
+    "backtest_sweep_10y":    lambda f: (lambda c: lambda: backtest.sweep(c, workers=1))(f["full_10y"]["close"].to_numpy(dtype=np.float64)),
+    # Coste de liquidación: acumular el libro (una vez por descarga) y vender 10k tamaños de una cartera a la vez
+    "slippage_depth_10k":    lambda f: lambda: slippage.BookDepth(f["book_10k"]),
+    "slippage_loan_book_10k": lambda f: (lambda d, q: lambda: d.sell(q))(
+                                   slippage.BookDepth(f["book_10k"]), np.random.default_rng(5).uniform(1, 500, 10_000)),
+    # Heartbeat: 1000 comprobaciones del vigía (frente a ~100 ms de un rerun completo)
+    "heartbeat_watch_1k":    lambda f: _heartbeat_watch(),
+    # Throughput del motor de alertas: 10k ticks (ticks/s = 10k / tiempo)
+    "alerts_stream_10k":     lambda f: _alert_stream(f["ticks_10k"]),
+    "correlation_bootstrap_1y": lambda f: lambda: correlation.RollingCorrelationEngine(window=30).update(f["macro_prices_1y"]),
+    # Superficie de IV: parseo + inversión de toda la cadena (4.8k opciones) + interpolación
+    "iv_surface_chain_4k":   lambda f: lambda: ivsurface.build_surface(ivsurface.parse_option_chain(f["option_chain_4k"])),
+    # Gráficos
+    "chart_price_volume_2y": lambda f: lambda: charts.create_price_volume_chart(f["market_2y"]),
+    # Mismo frame: figura ya rellenada (rerun sin datos nuevos); tick: solo arrays; cold: esqueleto desde cero
+    "chart_price_volume_tick_2y": lambda f: _chart_tick(charts.create_price_volume_chart, f["market_2y"]),
+    "chart_price_volume_cold_2y": lambda f: _chart_cold(charts.price_volume_skeleton("BTC"), charts.create_price_volume_chart, f["market_2y"]),
+    "chart_volatility_2y":   lambda f: lambda: charts.create_volatility_chart(f["market_2y"]),
+    "chart_volatility_iv_2y": lambda f: (lambda s: lambda: charts.create_volatility_chart(f["market_2y"], s))(
+                                   dict(ivsurface.build_surface(ivsurface.parse_option_chain(f["option_chain_4k"])),
+                                        history=pd.Series(0.5, index=f["market_2y"].index[-90:]))),
+    "chart_zscore_2y":       lambda f: lambda: charts.create_zscore_chart(f["market_2y"]),
+    "chart_macro_6mo":       lambda f: lambda: charts.create_macro_chart(f["macro_6mo"]),
+    "chart_liquidity_300":   lambda f: lambda: charts.create_liquidity_heatmap(f["book_300"], 96000),
+    "chart_seasonality_10y": lambda f: lambda: charts.create_seasonality_heatmap(f["full_10y"]),
+    "chart_power_law_10y":   lambda f: lambda: charts.create_power_law_chart(f["full_10y"]),
+    "chart_rainbow_10y":     lambda f: lambda: charts.create_rainbow_chart(f["full_10y"]),
+    "chart_power_law_tick_10y": lambda f: _chart_tick(charts.create_power_law_chart, f["full_10y"]),
+    "chart_rainbow_tick_10y": lambda f: _chart_tick(charts.create_rainbow_chart, f["full_10y"]),
+    "chart_backtest_10y":    lambda f: (lambda r: lambda: charts.create_backtest_chart(r))(backtest.run_backtests(f["full_10y"], with_sweep=False)),
+    "chart_miner_10y":       lambda f: lambda: charts.create_miner_metrics_chart_tv(f["full_10y"], f["hash_10y"]),
+    "chart_miner_signals_10y": lambda f: (lambda s: lambda: charts.create_miner_metrics_chart_tv(None, s))(
+                                   hashrate.with_valuation(hashrate.ribbon_signals(f["hash_10y"]["hash_rate"]), f["full_10y"]["close"])),
+    # Noticias
+    "smart_tags_100k":       lambda f: lambda: [news_fetcher.get_smart_tags(h, "Crypto") for h in f["headlines_100k"]],
+}
+
+# ==============================================================================
+# --- 2.1 PRESUPUESTO DE MEMORIA (Datos compartidos por todas las sesiones) ---
+# ==============================================================================
+# Bytes máximos del frame cacheado. Las sesiones solo guardan referencias a los
+# datos publicados por el scheduler, así que el coste por sesión es este total.
+MEMORY_BUDGETS = {
+    "market_2y": 48 * 1024,        # 730 filas x 10 columnas float32 + índice
+    "market_1y_hourly": 480 * 1024,
+}
+
+def check_memory_budgets(fixtures):
+    frames = {
+        "market_2y": fixtures["market_2y"],
+        "market_1y_hourly": data_fetcher.compute_indicators(fixtures["raw_1y_h"].copy(), "1h"),
+    }
+    over = {}
+    for name, df in frames.items():
+        used, budget = data_fetcher.frame_nbytes(df), MEMORY_BUDGETS[name]
+        status = "OK" if used <= budget else "OVER BUDGET"
+        print(f"{'mem_' + name:<24} {used/1024:10.1f} KB / {budget/1024:.0f} KB  {status}")
+        if used > budget: over[f"mem_{name}"] = [f"{used} > {budget} bytes"]
+    return over
+
+# ==============================================================================
+# --- 2.2 PRESUPUESTO DE TAMAÑO DE FIGURA (JSON que viaja al navegador) ---
+# ==============================================================================
+# Bytes máximos de fig.to_json(): es lo que Streamlit envía en cada rerun y lo
+# que broadcast.py escribe en el bundle. Arrays numpy -> binario base64.
+FIGURE_SIZE_BUDGETS = {
+    "price_volume_2y": 48 * 1024,     # Antes ~60 KB
+    "zscore_2y": 24 * 1024,
+    "power_law_10y": 256 * 1024,      # Antes ~480 KB (listas JSON, float64)
+    "rainbow_10y": 384 * 1024,        # Antes ~720 KB
+}
+
+def check_figure_sizes(fixtures):
+    figures = {
+        "price_volume_2y": charts.create_price_volume_chart(fixtures["market_2y"]),
+        "zscore_2y": charts.create_zscore_chart(fixtures["market_2y"]),
+        "power_law_10y": charts.create_power_law_chart(fixtures["full_10y"]),
+        "rainbow_10y": charts.create_rainbow_chart(fixtures["full_10y"]),
+    }
+    over = {}
+    for name, fig in figures.items():
+        used, budget = len(fig.to_json()), FIGURE_SIZE_BUDGETS[name]
+        status = "OK" if used <= budget else "OVER BUDGET"
+        print(f"{'fig_' + name:<24} {used/1024:10.1f} KB / {budget/1024:.0f} KB  {status}")
+        if used > budget: over[f"fig_{name}"] = [f"{used} > {budget} bytes"]
+    return over
+
+# ==============================================================================
+# --- 3. MEDICIÓN ---
+# ==============================================================================
+def measure(fn, repeat=5):
+    """Mediana de tiempo (s) y pico de memoria (bytes) de fn()."""
+    fn()  # Calentamiento (imports perezosos, caches de plotly)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": median(times), "peak_bytes": peak}
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path) as f: return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def compare(name, result, baseline, threshold):
+    """Lista de regresiones de name frente a la línea base."""
+    base = baseline.get(name)
+    if not base: return []
+    problems = []
+    if result["seconds"] > base["seconds"] * (1 + threshold) + MIN_SLACK_SECONDS:
+        problems.append(f"time {base['seconds']*1000:.1f} -> {result['seconds']*1000:.1f} ms")
+    if result["peak_bytes"] > base["peak_bytes"] * (1 + threshold) + MIN_SLACK_BYTES:
+        problems.append(f"memory {base['peak_bytes']/1e6:.1f} -> {result['peak_bytes']/1e6:.1f} MB")
+    return problems
+
+def run(selected=(), repeat=5, threshold=DEFAULT_THRESHOLD, save_baseline=False, baseline_file=BASELINE_FILE):
+    fixtures = build_fixtures()
+    baseline = load_baseline(baseline_file)
+    results, regressions = {}, {}
+
+    for name, factory in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected): continue
+        try:
+            result = measure(factory(fixtures), repeat=repeat)
+        except Exception as e:
+            print(f"{name:<24} ERROR: {e}")
+            regressions[name] = [f"error: {e}"]
+            continue
+        results[name] = result
+        problems = compare(name, result, baseline, threshold)
+        if problems: regressions[name] = problems
+        flag = "REGRESSION " + "; ".join(problems) if problems else ("" if name in baseline else "(no baseline)")
+        print(f"{name:<24} {result['seconds']*1000:10.2f} ms {result['peak_bytes']/1e6:9.2f} MB  {flag}")
+
+    if not selected or any("mem" in s for s in selected):
+        regressions.update(check_memory_budgets(fixtures))
+    if not selected or any("fig" in s for s in selected):
+        regressions.update(check_figure_sizes(fixtures))
+
+    if save_baseline:
+        baseline.update(results)
+        with open(baseline_file, "w") as f: json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {baseline_file}")
+    return results, regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Volcano TV benchmarks")
+    parser.add_argument("filters", nargs="*", help="Run only benchmarks whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    _, regressions = run(args.filters, args.repeat, args.threshold, args.save_baseline, args.baseline)
+    if regressions and not args.save_baseline:
+        print(f"{len(regressions)} benchmark(s) regressed or failed")
+        sys.exit(1)
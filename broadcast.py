@@ -0,0 +1,565 @@
+"""
+Modo broadcast: renderiza las vistas UNA vez por versión de datos y las publica
+como ficheros estáticos. Cada pantalla es un cliente HTML (broadcast_client.html)
+que solo descarga JSON; añadir la pantalla 50 cuesta leer un fichero, no un
+rerun de Python.
+
+Ficheros publicados en VOLCANO_BROADCAST_DIR (por defecto ./broadcast_out):
+    current.json        -> {"version", "bundle", "generated_at"}
+    bundle-<ver>.json   -> figuras Plotly (JSON) + HTML de cada vista
+    live.json           -> precio, cabecera, tarjetas con precio vivo y breaking news
+
+Uso:
+    python broadcast.py [--port 8600] [--dir broadcast_out]
+    VOLCANO_BROADCAST=1 streamlit run main.py   # la app Streamlit también publica
+"""
+import os
+import glob
+import json
+import time
+import argparse
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import data_fetcher, risk_math, charts, telemetry, rotation, hashrate, liquidation, slippage
+
+DEFAULT_DIR = "broadcast_out"
+DEFAULT_PORT = 8600
+CLIENT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "broadcast_client.html")
+
+# Fuentes que definen la versión del bundle (live_prices y breaking van en live.json)
+BUNDLE_SOURCES = ("market", "etf", "macro", "derivatives", "iv_surface", "regime", "full_history", "hash_rate", "backtest", "news", "fng", "forecast")
+KEEP_BUNDLES = 3                 # Bundles antiguos que se conservan para clientes a mitad de descarga
+BREAKING_WINDOW = 900            # Máximo 15 minutos de interrupción desde la detección
+
+def is_enabled():
+    return os.getenv("VOLCANO_BROADCAST", "0").lower() in ("1", "true", "yes")
+
+def broadcast_dir():
+    return os.getenv("VOLCANO_BROADCAST_DIR", DEFAULT_DIR)
+
+# ==============================================================================
+# --- 1. FRAGMENTOS HTML (Compartidos con main.py) ---
+# ==============================================================================
+def header_html(price, delta, fg_value, fg_label):
+    color = "#00C805" if delta >= 0 else "#FF4B4B"
+    arrow = "▲" if delta >= 0 else "▼"
+    return f"""
+<div style="padding: 10px 0px; border-bottom: 1px solid #333; display: flex; justify-content: space-between; align-items: flex-end;">
+    <div>
+        <div style="font-size: 14px; color: #888; letter-spacing: 2px;">VOLCANO BANK TV</div>
+        <div style="font-size: 60px; font-weight: 700; color: {color}; line-height: 1;">${price:,.2f}</div>
+    </div>
+    <div style="text-align: right;">
+        <div style="font-size: 24px; color: {color};">{arrow} {delta:.2%}</div>
+        <div style="font-size: 14px; color: #666;">24H CHANGE</div>
+    </div>
+    <div style="text-align: right; padding-left: 20px; border-left: 1px solid #333;">
+        <div style="font-size: 20px; color: #e0e0e0; font-weight: bold;">{fg_value}</div>
+        <div style="font-size: 14px; color: #888;">{fg_label}</div>
+    </div>
+</div>
+"""
+
+def ticker_html(batch):
+    items = ""
+    for n in batch:
+        tag = " | ".join(n.get('tags', ['NEWS'])[:1]).upper()
+        items += f"""<div class="ticker-item"><span class="ticker-tag">⚡ {tag}</span>{n['title']}</div>"""
+    return f"""<div class="ticker-wrap"><div class="ticker">{items}{items}</div></div>"""
+
+def asset_strip_html(snapshot, highlight=None):
+    """Comparativa de todos los activos (una celda por fila de latest_snapshot)."""
+    cells = "".join(
+        f"""<div style="flex:1; text-align:center; padding:8px; border-left:1px solid #333; {'background:#1a1a1a;' if code == highlight else ''}">
+            <div style="color:#888; font-size:14px; letter-spacing:1px;">{code}</div>
+            <div style="color:#fff; font-size:22px; font-weight:700;">${row.price:,.2f}</div>
+            <div style="color:{'#00C805' if row.change >= 0 else '#FF4B4B'}; font-size:16px;">{row.change:+.2%} · {'▲' if row.trend_up else '▼'} SMA50</div>
+            <div style="color:#aaa; font-size:14px;">Vol {row.volatility:.0%} · Z {row.z_score:+.2f}</div>
+        </div>"""
+        for code, row in snapshot.iterrows()
+    )
+    return f"""<div style="display:flex; border:1px solid #333; border-radius:8px; margin-top:10px;">{cells}</div>"""
+
+def render_tv_card(title, value, subvalue, color="#FFFFFF", bg_color="#111"):
+    """Tarjeta en HTML puro, igual que el Header, para garantizar nitidez."""
+    return f"""
+        <div style="
+            background-color: {bg_color};
+            border: 1px solid #333;
+            border-radius: 10px;
+            padding: 15px;
+            margin-bottom: 10px;
+            height: 100%;
+        ">
+            <div style="color: #888; font-size: 16px; font-weight: 500; letter-spacing: 1px; text-transform: uppercase; margin-bottom: 5px;">
+                {title}
+            </div>
+            <div style="color: {color}; font-size: 42px; font-weight: 800; line-height: 1.1;">
+                {value}
+            </div>
+            <div style="color: #ccc; font-size: 18px; margin-top: 5px; font-weight: 400;">
+                {subvalue}
+            </div>
+        </div>
+        """
+
+def liquidation_cost_card(cost):
+    """Slippage de vender el colateral contra el libro (slippage.collateral_liquidation())."""
+    if not cost:
+        return render_tv_card("Liquidation Slippage", "N/A", "Order book loading...", color="#888")
+    fills = cost['fills']
+    single = fills.iloc[0]
+    slip = lambda row: "exhausted" if row['exhausted'] else f"-{row['slippage']:.2%}"
+    if single['exhausted']:
+        size = single['filled_btc'] + single['shortfall_btc']
+        color, detail = "#FF4B4B", f"Book absorbs only {cost['depth_btc']:,.1f} of {size:,.1f} BTC"
+    else:
+        color = "#FF4B4B" if cost['slippage'] > 0.02 else ("#F59E0B" if cost['slippage'] > 0.005 else "#10B981")
+        detail = f"VWAP ${cost['vwap']:,.0f} · {int(single['levels'])} levels"
+    ladder = " · ".join(f"×{n} {slip(row)}" for n, row in fills.iloc[1:].iterrows())
+    source = " (simulated book)" if cost['simulated'] else ""
+    return render_tv_card(
+        "Liquidation Slippage", slip(single),
+        f"""{detail}<br><span style="color:#888; font-size:14px;">Loan book {ladder}{source}</span>""", color=color
+    )
+
+def credit_columns_html(sim, cost=None):
+    """
+    Las tres columnas de la Vista 3 a partir de risk_math.simulate_credit_line().
+    cost: slippage.collateral_liquidation() para la tarjeta junto a Liquidation Price.
+    """
+    rec_pct = 100 - sim['haircut']
+    liq_color = "#FF4B4B" if sim['buffer_pct'] < risk_math.CRITICAL_BUFFER else "#10B981"
+    buffer_status = "CRITICAL" if sim['buffer_pct'] < risk_math.CRITICAL_BUFFER else "SAFE ZONE"
+
+    deal = "<h4>💼 Deal Structure</h4>" + render_tv_card(
+        "Principal Loan", f"${sim['loan']/1_000_000:.1f}M", "USD Currency"
+    ) + render_tv_card(
+        "Risk Policy", f"{sim['haircut']}% HC", f"Effective LTV: {sim['ltv']:.0%}"
+    )
+
+    # Tarjeta Especial Destacada (Dorado) + barra de reconocimiento
+    collateral = f"""<h4>🔐 Collateral Required</h4>
+        <div style="
+            background-color: #1a1a1a;
+            border: 2px solid #F59E0B;
+            border-radius: 10px;
+            padding: 20px;
+            text-align: center;
+            margin-bottom: 15px;
+        ">
+            <div style="color: #F59E0B; font-size: 18px; letter-spacing: 2px; font-weight: bold; margin-bottom: 10px;">
+                REQUIRED COLLATERAL
+            </div>
+            <div style="color: #FFFFFF; font-size: 65px; font-weight: 900; line-height: 1;">
+                {sim['collateral_btc']:.2f} <span style="font-size: 30px; color: #888;">BTC</span>
+            </div>
+            <div style="color: #fff; font-size: 22px; margin-top: 10px;">
+                Market Value: ${sim['collateral_usd']:,.0f}
+            </div>
+        </div>
+        <div style="color:#aaa; font-size:14px; margin-bottom:5px;">Bank Recognition Rate: {rec_pct}%</div>
+        <div style="width:100%; background:#333; height:10px; border-radius:5px;">
+            <div style="width:{rec_pct}%; background:#10B981; height:100%; border-radius:5px;"></div>
+        </div>
+        """
+
+    risk = "<h4>📉 Risk Analysis</h4>" + render_tv_card(
+        "Liquidation Price", f"${sim['liq_price']:,.0f}", f"Threshold: {sim['liq_thresh']:.0%}", color=liq_color
+    ) + liquidation_cost_card(cost) + render_tv_card(
+        "Safety Buffer", f"{sim['buffer_pct']:.2%}", f"Status: {buffer_status}", color=liq_color
+    )
+    return [deal, collateral, risk]
+
+def barrier_risk_html(risk, sim):
+    """Probabilidad de tocar margin call y liquidación por plazo (liquidation.credit_barrier_risk())."""
+    if not risk: return ""
+    color = lambda p: "#FF4B4B" if p >= 0.25 else ("#F59E0B" if p >= 0.05 else "#10B981")
+    # Sin ensemble publicado todavía (arranque): la celda grande muestra la fórmula cerrada
+    mc_ready = risk['margin_call']['mc'] is not None
+    cell = lambda p, q: f"""<td style="padding:6px 12px; text-align:center; color:{color(p)}; font-size:22px; font-weight:700;">{p:.1%}
+        <span style="color:#666; font-size:13px; font-weight:400;">({q:.1%})</span></td>""" if p is not None else f"""<td style="padding:6px 12px; text-align:center; color:{color(q)}; font-size:22px; font-weight:700;">{q:.1%}</td>"""
+    head = "".join(f"<th style='padding:6px 12px; color:#888; font-weight:400;'>{d}D</th>" for d in risk['horizons'])
+    rows = "".join(
+        f"""<tr><td style="padding:6px 12px; color:#ccc; font-size:16px;">{label}<br><span style="color:#666; font-size:13px;">${price:,.0f}</span></td>
+            {''.join(cell(p, q) for p, q in zip(risk[key]['mc'] or [None] * len(risk['horizons']), risk[key]['closed']))}</tr>"""
+        for label, key, price in (("Margin Call", 'margin_call', sim['margin_call_price']), ("Liquidation", 'liquidation', sim['liq_price']))
+    )
+    return f"""
+    <div style="border:1px solid #333; border-radius:8px; margin-top:15px; padding:10px;">
+        <div style="color:#888; font-size:14px; letter-spacing:1px; text-transform:uppercase;">
+            Barrier Hit Probability · σ {risk['sigma']:.0%} · {f"fat-tail MC ({risk['model']}) / (GBM closed form)" if mc_ready else "GBM closed form (MC warming up)"}</div>
+        <table style="width:100%; border-collapse:collapse;"><tr><th></th>{head}</tr>{rows}</table>
+    </div>"""
+
+def derivatives_strip_html(summary):
+    """Franja de derivados bajo los gráficos de la Vista 2 (derivatives.DerivativesStore.summary())."""
+    if not summary: return ""
+    fmt = lambda v, f: "N/A" if v is None else format(v, f)
+    z = summary.get('funding_z')
+    cells = [
+        ("Funding (OI-weighted)", f"{summary['funding_rate']:+.4f}%", "#FF4B4B" if z is not None and abs(z) > 2 else "#FFFFFF"),
+        ("Funding Z-Score", fmt(z, "+.2f"), "#FFFFFF"),
+        ("Open Interest", f"${summary['open_interest']:,.1f}B", "#FFFFFF"),
+        ("OI 24h Change", f"{fmt(summary.get('oi_change'), '+.2f')}%", "#FFFFFF"),
+        ("Put / Call (OI)", fmt(summary.get('pc_ratio'), ".2f"), "#FFFFFF"),
+    ]
+    items = "".join(
+        f"""<div style="flex:1; text-align:center; padding:8px; border-left:1px solid #333;">
+            <div style="color:#888; font-size:14px; letter-spacing:1px;">{label}</div>
+            <div style="color:{color}; font-size:24px; font-weight:700;">{value}</div>
+        </div>"""
+        for label, value, color in cells
+    )
+    return f"""<div style="display:flex; border:1px solid #333; border-radius:8px; margin-top:10px;">{items}</div>"""
+
+def regime_strip_html(regime, confidence="99.0%", days=30):
+    """Régimen de volatilidad (regime.py) y VaR con la volatilidad esperada según los regímenes."""
+    if not regime: return ""
+    model = regime['model']
+    _, var_pct = risk_math.calculate_var_metrics(1.0, None, days, confidence, 0, regime=model)
+    colors = dict(zip(model.labels, ("#10B981", "#F59E0B", "#FF4B4B")[-len(model.labels):]))
+    items = "".join(
+        f"""<div style="flex:1; text-align:center; padding:8px; border-left:1px solid #333;">
+            <div style="color:#888; font-size:14px; letter-spacing:1px;">{label.upper()} · σ {regime['vols'][label]:.0%}</div>
+            <div style="color:{colors[label]}; font-size:22px; font-weight:700;">{p:.0%}</div>
+        </div>"""
+        for label, p in regime['current'].items()
+    )
+    return f"""<div style="display:flex; border:1px solid #333; border-radius:8px; margin-top:10px;">
+        <div style="padding:8px 14px; color:#888; font-size:14px; align-self:center;">VOL REGIME<br>{regime['as_of']:%Y-%m-%d}</div>{items}
+        <div style="flex:1.3; text-align:center; padding:8px; border-left:1px solid #333;">
+            <div style="color:#888; font-size:14px; letter-spacing:1px;">VaR {confidence} {days}D</div>
+            <div style="color:#fff; font-size:22px; font-weight:700;">-{var_pct:.1%}</div>
+        </div></div>"""
+
+def etf_strip_html(table):
+    """Flujos de los ETFs spot bajo la Vista 1 de BTC (etfs.basket_table())."""
+    if table is None or table.empty: return ""
+    items = "".join(
+        f"""<div style="flex:1; text-align:center; padding:8px; border-left:1px solid #333;">
+            <div style="color:#888; font-size:14px; letter-spacing:1px;">{ticker}</div>
+            <div style="color:{'#10B981' if row['change'] >= 0 else '#FF4B4B'}; font-size:22px; font-weight:700;">{row['change']:+.2f}%</div>
+            <div style="color:{'#F59E0B' if row['rvol'] >= 1.5 else '#AAA'}; font-size:14px;">RVOL {row['rvol']:.1f}x · ${row['dollar_volume'] / 1e6:,.0f}M ({row['share']:.0f}%)</div>
+        </div>"""
+        for ticker, row in table.iterrows()
+    )
+    return f"""<div style="display:flex; border:1px solid #333; border-radius:8px; margin-top:10px;">
+        <div style="padding:8px 14px; color:#888; font-size:14px; align-self:center;">SPOT ETF<br>FLOWS</div>{items}</div>"""
+
+def alert_banner_html(alert):
+    """Banner de interrupción de mercado (alerts.AlertEngine.current())."""
+    if not alert: return ""
+    critical = alert['severity'] == "critical"
+    bg, fg, size = ("#7f1d1d", "#fca5a5", 50) if critical else ("#78350f", "#fde68a", 30)
+    title = "🚨 MARKET INTERRUPT" if critical else "⚠️ MARKET ALERT"
+    return f"""
+    <div style="background-color: {bg}; color: white; padding: {40 if critical else 16}px; text-align: center; border-radius: 15px; margin-bottom: 20px; animation: pulse 2s infinite;">
+        <h1 style="margin:0; font-size: {size}px; text-transform: uppercase; font-weight: 900;">{title}</h1>
+        <h2 style="margin:10px 0 0 0; color: {fg}; font-size: {size * 0.6:.0f}px;">{alert['message']}</h2>
+    </div>"""
+
+def miner_cards_html(status):
+    """Tarjetas de la vista de minería a partir de hashrate.latest_status()."""
+    if status is None: return "<p>Loading Hash Rate...</p>"
+    capitulating = status['regime'] == "CAPITULATION"
+    regime_color = "#FF4B4B" if capitulating else "#10B981"
+    if status['last_event']:
+        event = f"{status['last_event']} · {status['last_event_date']:%Y-%m-%d} ({status['days_since_event']}d ago)"
+    else:
+        event = "No crossover yet"
+    valuation = f"${status['valuation']:,.0f}" if status['valuation'] == status['valuation'] else "N/A"  # NaN != NaN
+    return render_tv_card(
+        "Miner Regime", status['regime'], event, color=regime_color
+    ) + render_tv_card(
+        "Hash Rate", f"{status['hash_eh']:,.0f} EH/s", f"Ribbon spread: {status['ribbon']:+.2%}"
+    ) + render_tv_card(
+        "Price / Hash", valuation, "USD per EH/s", color="#F59E0B"
+    )
+
+def backtest_cards_html(result):
+    """Tarjetas del backtest (backtest.run_backtests): una por señal, comparadas con Buy & Hold."""
+    if not result: return "<p>Running Backtest...</p>"
+    table = result['table']
+    bench = table.loc['buy_hold']
+    cards = "".join(
+        render_tv_card(
+            f"{row['label']} · {row['signal']}",
+            f"{row['cagr']:+.1%}/yr",
+            f"Sharpe {row['sharpe']:.2f} · Max DD {row['max_dd']:.0%} · {row['trades']} trades",
+            color="#10B981" if row['sharpe'] > bench['sharpe'] else "#FF4B4B",
+        )
+        for name, row in table.iterrows() if name != 'buy_hold'
+    )
+    notes = [f"Buy & Hold {bench['cagr']:+.1%}/yr · Sharpe {bench['sharpe']:.2f} · Max DD {bench['max_dd']:.0%}",
+             f"{result['start']:%Y-%m-%d} → {result['end']:%Y-%m-%d} · fees 10 bp/trade"]
+    robust = result.get('robustness', {})
+    if 'trend' in robust:
+        r = robust['trend']
+        notes.append(f"SMA50 beats {r['beats']:.0%} of {r['combinations']} SMA windows (best: SMA{r['best']}, Sharpe {r['best_sharpe']:.2f})")
+    if 'zscore' in robust:
+        r = robust['zscore']
+        notes.append(f"Z ±3 beats {r['beats']:.0%} of {r['combinations']:,} z-score setups (best: {r['best'][0]}D, +{r['best'][1]:g} / {r['best'][2]:+g})")
+    return cards + "".join(f'<div style="color:#888; font-size:14px; margin-top:4px;">{n}</div>' for n in notes)
+
+def _metric_cells_html(df, price):
+    """Métricas inferiores de la Vista 1 (equivalente HTML de st.metric)."""
+    cells = [
+        ("24h High", f"${df['high'].iloc[-1]:,.0f}"),
+        ("24h Low", f"${df['low'].iloc[-1]:,.0f}"),
+        ("Trend (SMA50)", "BULLISH" if price > df['sma_50'].iloc[-1] else "BEARISH"),
+        ("Volatility", f"{df['volatility'].iloc[-1]:.1%}"),
+    ]
+    return "".join(
+        f"""<div style="flex:1; padding:8px;"><div style="color:#888; font-size:14px;">{label}</div>
+            <div style="color:#fff; font-size:32px; font-weight:600;">{value}</div></div>"""
+        for label, value in cells
+    )
+
+# ==============================================================================
+# --- 2. RENDERIZADO (Una vez por versión de datos) ---
+# ==============================================================================
+def data_version(refresh):
+    """Identificador del bundle: versión de cada fuente que lo compone."""
+    return "-".join(f"{name}{refresh.version(name)}" for name in BUNDLE_SOURCES)
+
+def _figure(fig, caption=None):
+    # to_json() usa el codificador de Plotly (fechas, numpy); se guarda ya como dict
+    return {"caption": caption, "figure": json.loads(fig.to_json())}
+
+def _html(html, caption=None):
+    return {"caption": caption, "html": html}
+
+def _live(key):
+    """Panel cuyo HTML depende del precio vivo: el cliente lo lee de live.json."""
+    return {"live": key}
+
+def render_views(refresh):
+    """Las vistas como paneles (figura Plotly, HTML o referencia a live.json)."""
+    multi = refresh.value("market") or {}
+    market_df = multi['frames']['BTC']
+    macro = refresh.value("macro") or {}
+    macro_df = macro.get('normalized', pd.DataFrame())
+    corr_hist = macro.get('corr_history', pd.DataFrame())
+    full_history = refresh.value("full_history")
+    if full_history is None: full_history = pd.DataFrame()
+
+    # Vista 1: una variante por activo (la pantalla elige según la vuelta de rotación)
+    market_variants = [
+        {
+            "title": f"📈 {multi['names'][code]} Market Structure & Volume",
+            "columns": [1],
+            "panels": [_figure(charts.create_price_volume_chart(multi['frames'][code], code)),
+                       _live(f"metrics_{code}"), _live(f"strip_{code}")],
+            **({"footer": [_html(etf_strip_html(refresh.value("etf")))]} if code == 'BTC' else {}),
+        }
+        for code in multi['assets']
+    ]
+
+    if not corr_hist.empty: macro_panel = _figure(charts.create_correlation_regime_chart(corr_hist), "Macro Correlations (vs S&P500 / Gold)")
+    elif not macro_df.empty: macro_panel = _figure(charts.create_macro_chart(macro_df), "Macro Correlations (vs S&P500 / Gold)")
+    else: macro_panel = _html("<p>Loading Macro Data...</p>", "Macro Correlations (vs S&P500 / Gold)")
+    risk = {
+        "title": "⚠️ Risk Radar & Macro Correlations",
+        "columns": [1, 1, 1],
+        "panels": [
+            _figure(charts.create_volatility_chart(market_df, refresh.value("iv_surface"), refresh.value("regime")), "Realized vs Implied Volatility"),
+            _figure(charts.create_zscore_chart(market_df), "Mean Reversion (Z-Score)"),
+            macro_panel,
+        ],
+        "footer": [_html(derivatives_strip_html(refresh.value("derivatives"))), _html(regime_strip_html(refresh.value("regime")))],
+    }
+
+    credit = {"title": "🛡️ Live Credit Stress Test (Institutional)", "columns": [1, 1, 1],
+              "panels": [_live("credit_0"), _live("credit_1"), _live("credit_2")],
+              "footer": [_live("credit_risk")]}
+
+    if not full_history.empty:
+        alpha_panels = [
+            _figure(charts.create_power_law_chart(full_history), "🪐 Bitcoin Power Law Corridor"),
+            _figure(charts.create_seasonality_heatmap(full_history), "📅 Historical Monthly Returns"),
+        ]
+    else:
+        alpha_panels = [_html("<p>Loading History...</p>"), _html("<p>Loading...</p>")]
+    alpha = {"title": "", "columns": [3, 2], "panels": alpha_panels}
+
+    hash_signals = refresh.value("hash_rate")
+    if hash_signals is not None and not hash_signals.empty:
+        miner_panels = [_figure(charts.create_miner_metrics_chart_tv(full_history, hash_signals), "Hash Ribbons (30D / 60D) · Price / Hash"),
+                        _html(miner_cards_html(hashrate.latest_status(hash_signals)))]
+    else:
+        miner_panels = [_html("<p>Loading Hash Rate...</p>"), _html("")]
+    miner = {"title": "⛏️ Miner Health: Hash Ribbons & Valuation", "columns": [3, 1], "panels": miner_panels}
+
+    results = refresh.value("backtest")
+    backtest_panels = [_figure(charts.create_backtest_chart(results), "Growth of $1 following each signal") if results else _html("<p>Running Backtest...</p>"),
+                       _html(backtest_cards_html(results))]
+    signals = {"title": "📊 Signal Backtest: How the Dashboard's Signals Performed", "columns": [3, 2], "panels": backtest_panels}
+
+    return [
+        {"sources": ["market", "live_prices", "etf"], "variants": market_variants},
+        {"sources": ["market", "macro", "derivatives", "iv_surface", "regime"], "variants": [risk]},
+        {"sources": ["market", "live_prices", "iv_surface"], "variants": [credit]},
+        {"sources": ["full_history"], "variants": [alpha]},
+        {"sources": ["hash_rate", "full_history"], "variants": [miner]},
+        {"sources": ["backtest", "full_history"], "variants": [signals]},
+    ]
+
+def render_bundle(refresh):
+    """Bundle completo o None si aún no hay datos de mercado (arranque en frío)."""
+    multi = refresh.value("market") or {}
+    if 'BTC' not in multi.get('frames', {}): return None
+
+    fg_value, fg_label = refresh.value("fng") or (50, "Neutral")
+    news = refresh.value("news") or []
+    with telemetry.timer("volcano_broadcast_seconds", "stage", "render"):
+        views = render_views(refresh)
+    return {
+        "version": data_version(refresh),
+        "generated_at": time.time(),
+        "sources": {name: refresh.version(name) for name in BUNDLE_SOURCES},
+        # Mismo reloj que main.py: las pantallas calculan la vista con la hora del servidor
+        "rotation": rotation.get_playlist_clock().config(),
+        "fng": [fg_value, fg_label],
+        "news": [ticker_html([n]) for n in news],
+        "views": views,
+    }
+
+def render_live(refresh):
+    """Lo que cambia cada pocos segundos: precios, cabecera, tarjetas, breaking news y alertas."""
+    multi = refresh.value("market") or {}
+    frames = multi.get('frames', {})
+    if 'BTC' not in frames: return None
+    live_prices = refresh.value("live_prices", max_age=30) or {}
+    fg_value, fg_label = refresh.value("fng") or (50, "Neutral")
+
+    market_df = frames['BTC']
+    price = live_prices.get('BTC') or market_df['close'].iloc[-1]
+    prev_close = market_df['close'].iloc[-2]
+
+    snapshot = data_fetcher.latest_snapshot(multi, live_prices)
+    panels = {}
+    for code in multi['assets']:
+        code_price = live_prices.get(code) or frames[code]['close'].iloc[-1]
+        panels[f"metrics_{code}"] = f"""<div style="display:flex;">{_metric_cells_html(frames[code], code_price)}</div>"""
+        panels[f"strip_{code}"] = asset_strip_html(snapshot, highlight=code)
+    sim = risk_math.simulate_credit_line(price)
+    cost = slippage.collateral_liquidation(refresh.value("order_book", max_age=300), sim)
+    for i, html in enumerate(credit_columns_html(sim, cost)):
+        panels[f"credit_{i}"] = html
+    sigma = liquidation.reference_sigma(refresh.value("iv_surface"), market_df)
+    panels["credit_risk"] = barrier_risk_html(liquidation.credit_barrier_risk(price, sigma, sim, refresh.value("credit_paths")), sim)
+
+    watchdog = refresh.jobs.get("breaking")
+    breaking = watchdog.value if watchdog else None
+    if not (breaking and breaking.get('is_breaking') and time.time() - watchdog.changed_at <= BREAKING_WINDOW):
+        breaking = None
+
+    return {
+        "t": time.time(),
+        "prices": {code: float(p) for code, p in live_prices.items() if p},
+        "header": header_html(price, (price - prev_close) / prev_close, fg_value, fg_label),
+        "panels": panels,
+        "breaking": breaking,
+        "alert": _alert_payload(refresh.value("alerts")),
+        "versions": {name: ver for name, (ver, _) in refresh.versions().items()},
+    }
+
+def _alert_payload(alert):
+    if not alert or alert['expires'] <= time.time(): return None
+    return {"id": alert['id'], "severity": alert['severity'], "html": alert_banner_html(alert)}
+
+# ==============================================================================
+# --- 3. PUBLICACIÓN (Escritura atómica + limpieza) ---
+# ==============================================================================
+def _write_json(path, obj):
+    # Escritura atómica: los clientes nunca leen un fichero a medias
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, separators=(",", ":"), default=str)
+    os.replace(tmp, path)
+
+class BroadcastPublisher:
+    """Publica un bundle nuevo solo cuando cambia la versión de datos; live.json siempre."""
+    def __init__(self, out_dir=None):
+        self.out_dir = out_dir or broadcast_dir()
+        self.version = None
+        self._lock = threading.Lock()
+        os.makedirs(self.out_dir, exist_ok=True)
+
+    def publish(self, refresh):
+        with self._lock:
+            version = data_version(refresh)
+            if version != self.version:
+                bundle = render_bundle(refresh)
+                if bundle is not None:
+                    name = f"bundle-{version}.json"
+                    with telemetry.timer("volcano_broadcast_seconds", "stage", "write"):
+                        _write_json(os.path.join(self.out_dir, name), bundle)
+                    _write_json(os.path.join(self.out_dir, "current.json"),
+                                {"version": version, "bundle": name, "generated_at": bundle["generated_at"]})
+                    self.version = version
+                    self._prune()
+
+            live = render_live(refresh)
+            if live is not None: _write_json(os.path.join(self.out_dir, "live.json"), live)
+            return self.version
+
+    def _prune(self):
+        bundles = sorted(glob.glob(os.path.join(self.out_dir, "bundle-*.json")), key=os.path.getmtime)
+        for path in bundles[:-KEEP_BUNDLES]:
+            try: os.remove(path)
+            except OSError: pass
+
+def attach(refresh, out_dir=None, cadence=5):
+    """Registra la publicación como una fuente más del scheduler (mismo hilo de despacho)."""
+    publisher = BroadcastPublisher(out_dir)
+    refresh.register("broadcast", lambda: publisher.publish(refresh),
+                     cadence=cadence, jitter=0, timeout=60, priority=6, max_backoff=60)
+    return publisher
+
+# ==============================================================================
+# --- 4. SERVIDOR ESTÁTICO PARA LAS PANTALLAS ---
+# ==============================================================================
+class _BroadcastHandler(SimpleHTTPRequestHandler):
+    def translate_path(self, path):
+        if path.split("?")[0] in ("/", "/index.html"): return CLIENT_FILE
+        return super().translate_path(path)
+
+    def end_headers(self):
+        # current.json y live.json cambian; los bundles son inmutables (nombre = versión)
+        if "/bundle-" in self.path: self.send_header("Cache-Control", "public, max-age=86400, immutable")
+        else: self.send_header("Cache-Control", "no-cache")
+        super().end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def serve(out_dir=None, port=None):
+    """Sirve el cliente y los ficheros publicados (bloquea)."""
+    out_dir = out_dir or broadcast_dir()
+    port = int(port or os.getenv("VOLCANO_BROADCAST_PORT", DEFAULT_PORT))
+    server = ThreadingHTTPServer(("0.0.0.0", port), partial(_BroadcastHandler, directory=out_dir))
+    print(f"Broadcast serving {out_dir} on http://0.0.0.0:{port}/")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    import sources
+
+    parser = argparse.ArgumentParser(description="Volcano TV broadcast server")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--dir", default=None, help=f"Output directory (default {DEFAULT_DIR})")
+    args = parser.parse_args()
+
+    load_dotenv()
+    telemetry.configure()
+    if telemetry.is_enabled(): telemetry.start_metrics_server()
+
+    refresh = sources.build_refresh_scheduler()
+    attach(refresh, args.dir)
+    refresh.start()
+    serve(args.dir, args.port)
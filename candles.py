@@ -0,0 +1,113 @@
+import time
+import threading
+
+import numpy as np
+import pandas as pd
+import data_fetcher
+
+# ==============================================================================
+# --- VELA EN CURSO (Ticks -> OHLCV sobre el frame cacheado) ---
+# ==============================================================================
+# Cada tick de precio vivo actualiza la vela del día (UTC, igual que las barras
+# diarias de yfinance) y la escribe en la última fila del frame cacheado, junto
+# con los indicadores de esa fila. Si el tick abre un día nuevo se añade la fila.
+# Así el gráfico de velas, el High/Low 24h y los indicadores van con el precio
+# vivo sin volver a descargar histórico.
+# Copia en escritura: las sesiones y el broadcast leen el 'market' publicado sin
+# cerrojo, así que nunca se modifica. Cada tick crea frames y paneles nuevos y el
+# valor resultante se publica en el scheduler (RefreshScheduler.publish).
+OHLC = ['open', 'high', 'low', 'close']
+
+class CandleAggregator:
+    """
+    Vela en curso por activo: {'date', 'open', 'high', 'low', 'close'}.
+    - interval: solo "1d" (una vela por día UTC).
+    """
+    def __init__(self, interval="1d"):
+        self.interval = interval
+        self.bars = {}
+        self._lock = threading.Lock()
+
+    def tick(self, code, price, t=None):
+        """Añade un tick a la vela del activo. Devuelve la vela."""
+        day = pd.Timestamp(time.time() if t is None else t, unit='s').normalize()
+        bar = self.bars.get(code)
+        if bar is None or day > bar['date']:
+            bar = self.bars[code] = {'date': day, 'open': price, 'high': price, 'low': price, 'close': price}
+        elif day == bar['date']:
+            if price > bar['high']: bar['high'] = price
+            if price < bar['low']: bar['low'] = price
+            bar['close'] = price
+        return bar
+
+    def apply(self, multi, prices, t=None):
+        """
+        Fusiona los ticks de `prices` ({código: precio}) en una copia de `multi`.
+        `multi` no se toca; los frames y paneles de los activos sin tick se comparten.
+        """
+        if not multi or not prices: return multi
+        frames = multi.get('frames', {})
+        codes = [c for c, p in prices.items() if p and c in frames]
+        if not codes: return multi
+        out = {**multi, 'frames': dict(frames)}
+        for key in ('panel', 'indicators'):
+            if key in multi: out[key] = {field: wide.copy() for field, wide in multi[key].items()}
+        with self._lock:
+            for code in codes:
+                bar = self.tick(code, float(prices[code]), t)
+                out['frames'][code] = merge_bar(frames[code], bar, self.interval)
+                _merge_panel(out, code, out['frames'][code])
+        return out
+
+def merge_bar(df, bar, interval="1d"):
+    """
+    Frame nuevo con la vela en la última fila (o una fila añadida si la vela abre
+    un día nuevo) y los indicadores de esa fila recalculados. df no se modifica.
+    """
+    if df is None or df.empty: return df
+    last_date = df.index[-1]
+    if bar['date'] < last_date: return df          # Tick atrasado frente a una descarga más reciente
+
+    if bar['date'] == last_date:
+        n, col = len(df) - 1, df.columns.get_loc
+        o, h, l = (float(df.iat[n, col(c)]) for c in ('open', 'high', 'low'))
+        row = [o, max(h, bar['high']), min(l, bar['low']), bar['close']]
+        df = df.copy()
+    else:
+        # Día nuevo: el mercado cripto no cierra, la apertura es el cierre anterior
+        o = float(df['close'].iloc[-1])
+        row = [o, max(o, bar['high']), min(o, bar['low']), bar['close']]
+        new = pd.DataFrame(np.nan, index=pd.DatetimeIndex([bar['date']], name=df.index.name), columns=df.columns)
+        if 'volume' in new.columns: new['volume'] = 0.0
+        df = pd.concat([df, new.astype(df.dtypes.to_dict())])
+
+    # Indicadores con el cierre vivo y una sola escritura de la fila
+    close = df['close'].to_numpy(dtype=np.float64)   # Copia (float32 -> float64)
+    close[-1] = bar['close']
+    data_fetcher.set_last_row(df, {**dict(zip(OHLC, row)), **data_fetcher.last_row_indicators(close, interval)})
+    return df
+
+def _merge_panel(multi, code, df):
+    """Mantiene el panel (fecha x activo) y sus indicadores alineados con el frame (copias de apply)."""
+    date, last = df.index[-1], df.iloc[-1]
+    for table in (multi.get('panel', {}), multi.get('indicators', {})):
+        for field, wide in table.items():
+            if field not in last.index or code not in wide.columns: continue
+            if len(wide) and wide.index[-1] == date: wide.iat[-1, wide.columns.get_loc(code)] = last[field]
+            else: wide.loc[date, code] = last[field]      # Día nuevo: añade la fila
+
+def make_live_refresher(refresh, aggregator=None):
+    """Precio vivo para el scheduler + fusión de cada tick en un 'market' nuevo que se publica."""
+    aggregator = aggregator or CandleAggregator()
+
+    def refresh_live_prices():
+        prices = data_fetcher.fetch_live_prices()
+        if prices:
+            try:
+                market = refresh.value("market")
+                merged = aggregator.apply(market, prices)
+                # Si entretanto se publicó una descarga nueva, gana ella (el próximo tick se fusiona encima)
+                if merged is not market: refresh.publish("market", merged, expected=market)
+            except Exception as e: print(f"Candle Merge Error: {e}")
+        return prices
+    return refresh_live_prices
@@ -1,48 +1,103 @@
+import threading
+
+import numpy as np
+import plotly.io as pio
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import plotly.express as px
+import telemetry
+import hashrate
+import risk_math
 
 # ==============================================================================
-# --- 1. ESTRUCTURA DE PRECIO (FIBONACCI + VOLUMEN) ---
+# --- 0. PLANTILLA TV Y ESQUELETOS DE FIGURA ---
 # ==============================================================================
-def create_price_volume_chart(df):
+# Estilo común de la pantalla registrado una vez como plantilla de Plotly: cada
+# gráfico solo declara lo suyo. Se apila sobre la plantilla por defecto vigente
+# ("streamlit" dentro de la app, "plotly" en el modo broadcast).
+pio.templates["volcano"] = go.layout.Template(layout=dict(
+    paper_bgcolor='rgba(0,0,0,0)',
+    plot_bgcolor='rgba(0,0,0,0)',
+    font=dict(color='#e0e0e0'),
+))
+
+def tv_template():
+    base = pio.templates.default
+    return "volcano" if not base or "volcano" in base else f"{base}+volcano"
+
+def date_axis(index):
     """
-    Gráfico de Estructura de Precio CON VOLUMEN y AUTO-FIBONACCI.
+    Fechas como milisegundos (float64): se serializan como array binario y no como texto ISO por punto.
+    Se normaliza la unidad antes: con pandas >= 3 el índice puede venir en [s], [us] o [ns].
     """
-    if df.empty:
-        return go.Figure().update_layout(title="Waiting for Market Data...")
+    return index.as_unit("ms").asi8.astype(np.float64)
 
-    # 1. Definir datos visuales (Últimos 365 días)
-    plot_df = df.iloc[-365:].copy()
-    
-    # --- CÁLCULO AUTO-FIBONACCI ---
-    max_price = plot_df['high'].max()
-    min_price = plot_df['low'].min()
-    diff = max_price - min_price
-    
-    # (Nivel, Color, Grosor)
-    fib_levels = [
-        (0.236, 'rgba(255, 255, 255, 0.3)', 1),
-        (0.382, 'rgba(255, 255, 255, 0.3)', 1),
-        (0.5,   'rgba(255, 255, 255, 0.5)', 1),
-        (0.618, 'rgba(245, 158, 11, 0.8)', 2), # Golden Pocket
-        (0.786, 'rgba(255, 255, 255, 0.3)', 1),
-    ]
-    
+class FigureSkeleton:
+    """
+    Figura construida y validada una sola vez (trazas, ejes, líneas, plantilla).
+    render(key, fill): con datos nuevos solo cambia los arrays y posiciones que
+    toca `fill` dentro de batch_update; con la misma clave devuelve la última
+    figura sin trabajo. Cada render entrega una copia sin revalidar, así la
+    figura que recibe una sesión no cambia debajo de ella.
+    """
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._fig, self._key, self._last = None, None, None
+
+    def render(self, key, fill):
+        with self._lock:
+            if self._last is not None and key == self._key: return self._last
+            if self._fig is None: self._fig = self._build()
+            with self._fig.batch_update():
+                fill(self._fig)
+            self._last = go.Figure(self._fig.to_dict(), skip_invalid=True, _validate=False)
+            self._key = key
+            return self._last
+
+def frame_key(df, columns=None):
+    """Clave barata de un frame publicado: identidad, tamaño y última fila (cada tick publica un frame nuevo)."""
+    last = df.iloc[-1] if columns is None else df[columns].iloc[-1]
+    return (id(df), len(df), df.index[-1], tuple(last.to_numpy().tolist()))
+
+# ==============================================================================
+# --- 1. ESTRUCTURA DE PRECIO (FIBONACCI + VOLUMEN) ---
+# ==============================================================================
+# (Nivel, Color, Grosor)
+FIB_LEVELS = [
+    (0.236, 'rgba(255, 255, 255, 0.3)', 1),
+    (0.382, 'rgba(255, 255, 255, 0.3)', 1),
+    (0.5,   'rgba(255, 255, 255, 0.5)', 1),
+    (0.618, 'rgba(245, 158, 11, 0.8)', 2), # Golden Pocket
+    (0.786, 'rgba(255, 255, 255, 0.3)', 1),
+]
+# Volumen coloreado con un array 0/1 (bajista/alcista) y una escala de dos colores
+VOLUME_COLORSCALE = [[0, 'rgba(239, 83, 80, 0.3)'], [1, 'rgba(38, 166, 154, 0.3)']]
+
+def _price_volume_skeleton():
     # Crear figura con eje secundario para volumen
     fig = make_subplots(specs=[[{"secondary_y": True}]])
-    
-    # --- DIBUJAR NIVELES FIBONACCI (Al fondo) ---
-    fig.add_hline(y=min_price, line_dash="dot", line_color="rgba(255,255,255,0.2)", annotation_text="0.0 (Min)")
-    fig.add_hline(y=max_price, line_dash="dot", line_color="rgba(255,255,255,0.2)", annotation_text="1.0 (Max)")
-    
-    for level, color, width in fib_levels:
-        price_level = max_price - (diff * level)
+
+    # --- VELAS, VOLUMEN (Abajo) Y SMAs ---
+    fig.add_trace(go.Candlestick(name="Price"), secondary_y=False)
+    fig.add_trace(go.Bar(name="Volume", opacity=0.5, showlegend=False,
+                         marker=dict(colorscale=VOLUME_COLORSCALE, cmin=0, cmax=1)), secondary_y=True)
+    fig.add_trace(go.Scatter(line=dict(color='#3B82F6', width=1), name="SMA 50"), secondary_y=False)
+    fig.add_trace(go.Scatter(line=dict(color='#8B5CF6', width=2), name="SMA 200"), secondary_y=False)
+
+    # --- NIVELES FIBONACCI (la altura se rellena en cada render) ---
+    # Después de las trazas: add_hline ignora los subplots que aún no tienen datos
+    fig.add_hline(y=0, line_dash="dot", line_color="rgba(255,255,255,0.2)", annotation_text="0.0 (Min)")
+    fig.add_hline(y=1, line_dash="dot", line_color="rgba(255,255,255,0.2)", annotation_text="1.0 (Max)")
+    for level, color, width in FIB_LEVELS:
         fig.add_hline(
-            y=price_level, 
-            line_width=width, 
-            line_dash="dash" if width == 1 else "solid", 
+            y=0,
+            line_width=width,
+            line_dash="dash" if width == 1 else "solid",
             line_color=color,
             annotation_text=f"Fib {level}",
             annotation_position="right",
@@ -50,66 +105,75 @@ def create_price_volume_chart(df):
             annotation_font_color=color
         )
 
-    # --- VELAS ---
-    fig.add_trace(go.Candlestick(
-        x=plot_df.index,
-        open=plot_df['open'], high=plot_df['high'],
-        low=plot_df['low'], close=plot_df['close'],
-        name="Price"
-    ), secondary_y=False)
-    
-    # --- VOLUMEN (Abajo) ---
-    colors = ['rgba(38, 166, 154, 0.3)' if c >= o else 'rgba(239, 83, 80, 0.3)' 
-              for c, o in zip(plot_df['close'], plot_df['open'])]
-    
-    fig.add_trace(go.Bar(
-        x=plot_df.index,
-        y=plot_df['volume'],
-        marker_color=colors,
-        name="Volume",
-        opacity=0.5,
-        showlegend=False
-    ), secondary_y=True)
-
-    # --- SMAs ---
-    if 'sma_50' in plot_df.columns:
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['sma_50'], line=dict(color='#3B82F6', width=1), name="SMA 50"), secondary_y=False)
-    
-    if 'sma_200' in plot_df.columns:
-        fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['sma_200'], line=dict(color='#8B5CF6', width=2), name="SMA 200"), secondary_y=False)
-    
     # --- DISEÑO ---
     fig.update_layout(
         title="Price Structure & Volume (Auto-Fib)",
         height=550,
         margin=dict(l=0, r=0, t=30, b=0),
-        xaxis_rangeslider_visible=False,
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e0e0e0'),
+        xaxis=dict(type='date', rangeslider_visible=False),
         legend=dict(orientation="h", y=1, x=0),
-        hovermode='x unified'
+        hovermode='x unified',
+        template=tv_template(),
     )
-    # Escala volumen para que ocupe solo la parte baja
-    if not plot_df['volume'].empty:
-        max_vol = plot_df['volume'].max()
-        fig.update_yaxes(range=[0, max_vol * 4], secondary_y=True, showgrid=False, visible=False)
-    
+    # Volumen solo en la parte baja (el rango se ajusta en cada render)
+    fig.update_yaxes(secondary_y=True, showgrid=False, visible=False)
     fig.update_yaxes(gridcolor='rgba(255,255,255,0.05)', secondary_y=False)
-
     return fig
 
+# Un esqueleto por activo: la pantalla y el broadcast alternan BTC, ETH, SOL...
+# y cada uno conserva su última figura
+PRICE_VOLUME = {}
+_price_volume_lock = threading.Lock()
+
+def price_volume_skeleton(asset):
+    with _price_volume_lock:
+        if asset not in PRICE_VOLUME: PRICE_VOLUME[asset] = FigureSkeleton(_price_volume_skeleton)
+        return PRICE_VOLUME[asset]
+
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_price_volume_chart(df, asset="BTC"):
+    """
+    Gráfico de Estructura de Precio CON VOLUMEN y AUTO-FIBONACCI.
+    asset: código del activo (elige su esqueleto de figura).
+    """
+    if df.empty:
+        return go.Figure().update_layout(title="Waiting for Market Data...", template=tv_template())
+
+    # 1. Definir datos visuales (Últimos 365 días, vista sin copia)
+    plot_df = df.iloc[-365:]
+
+    def fill(fig):
+        x = date_axis(plot_df.index)
+        o, h, l, c = (plot_df[k].to_numpy() for k in ('open', 'high', 'low', 'close'))
+
+        # --- CÁLCULO AUTO-FIBONACCI ---
+        max_price, min_price = float(np.nanmax(h)), float(np.nanmin(l))
+        diff = max_price - min_price
+        levels = [min_price, max_price] + [max_price - diff * level for level, _, _ in FIB_LEVELS]
+        for shape, note, y in zip(fig.layout.shapes, fig.layout.annotations, levels):
+            shape.y0 = shape.y1 = note.y = y
+
+        fig.data[0].update(x=x, open=o, high=h, low=l, close=c)
+        volume = plot_df['volume'].to_numpy()
+        fig.data[1].update(x=x, y=volume, marker_color=(c >= o).astype(np.int8))
+        for trace, col in zip(fig.data[2:], ('sma_50', 'sma_200')):
+            trace.update(x=x, y=plot_df[col].to_numpy() if col in plot_df.columns else None, visible=col in plot_df.columns)
+        fig.layout.yaxis2.range = [0, float(np.nanmax(volume)) * 4 if len(volume) else 1]
+
+    return price_volume_skeleton(asset).render(frame_key(df), fill)
+
 # ==============================================================================
 # --- 2. HEATMAP DE LIQUIDEZ (HD) ---
 # ==============================================================================
 
+@telemetry.timed("volcano_chart_seconds", "chart")
 def create_liquidity_heatmap(ob_df, current_price):
     """
     Genera un Mapa de Densidad de Liquidez en Alta Definición (HD).
     """
     if ob_df.empty or 'price' not in ob_df.columns:
         fig = go.Figure()
-        fig.update_layout(title="Waiting for Liquidity Data feed...", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color='#666'), xaxis=dict(showgrid=False, showticklabels=False), yaxis=dict(showgrid=False, showticklabels=False))
+        fig.update_layout(title="Waiting for Liquidity Data feed...", template=tv_template(), font=dict(color='#666'), xaxis=dict(showgrid=False, showticklabels=False), yaxis=dict(showgrid=False, showticklabels=False))
         return fig
 
     # DETECTOR DE SIMULACIÓN
@@ -119,13 +183,13 @@ def create_liquidity_heatmap(ob_df, current_price):
 
     # Zoom ±2%
     range_mask = (ob_df['price'] > current_price * 0.98) & (ob_df['price'] < current_price * 1.02)
-    df = ob_df[range_mask].copy()
-    if df.empty: df = ob_df.copy()
+    df = ob_df[range_mask]
+    if df.empty: df = ob_df
 
-    # Binning
+    # Binning (clave calculada aparte, sin añadir columnas al libro)
     bin_size = 10 
-    df['price_bin'] = (df['price'] // bin_size) * bin_size
-    df_grouped = df.groupby(['price_bin', 'side'])['amount'].sum().reset_index()
+    price_bin = ((df['price'] // bin_size) * bin_size).rename('price_bin')
+    df_grouped = df['amount'].groupby([price_bin, df['side']]).sum().reset_index()
     
     bids = df_grouped[df_grouped['side']=='bid']
     asks = df_grouped[df_grouped['side']=='ask']
@@ -146,8 +210,8 @@ def create_liquidity_heatmap(ob_df, current_price):
     fig.update_layout(
         title=dict(text=main_title, font=dict(color=title_color)),
         xaxis_title="Volume Density (BTC)", yaxis_title="Price Level (USD)",
-        height=550, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e0e0e0', size=10), barmode='overlay', bargap=0.05, showlegend=False,
+        height=550, template=tv_template(),
+        font=dict(size=10), barmode='overlay', bargap=0.05, showlegend=False,
         yaxis=dict(range=[current_price*0.99, current_price*1.01], gridcolor='rgba(255,255,255,0.05)', tickformat=",.0f")
     )
     fig.update_xaxes(showgrid=False, zeroline=False)
@@ -157,35 +221,78 @@ def create_liquidity_heatmap(ob_df, current_price):
 # --- 3. GRÁFICOS ANALÍTICOS Y MACRO ---
 # ==============================================================================
 
-def create_volatility_chart(df):
+def turbulent_probability(regime, index):
+    """P(régimen turbulento) en las fechas de `index`; la vela en curso hereda la del último cierre."""
+    probs = regime['probs']
+    turbulent = probs[probs.columns[-1]].astype(np.float64)
+    days = index.tz_localize(None) if index.tz is not None else index
+    return turbulent.reindex(pd.DatetimeIndex(days).normalize(), method='ffill').to_numpy()
+
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_volatility_chart(df, surface=None, regime=None):
+    """
+    Volatilidad realizada 30D frente a la implícita. Con surface (ivsurface.build_surface)
+    se pinta la IV ATM 30D real de Deribit y su estructura temporal; si no, el proxy.
+    Con regime (regime.make_regime_refresher) se sombrea la probabilidad del régimen turbulento
+    y el proxy pasa a risk_math.simulate_implied_volatility con esa probabilidad como pánico.
+    """
     if df.empty: return go.Figure()
     plot_df = df.iloc[-180:]
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['volatility'], name='Realized Vol (30D)', line=dict(color='#10B981', width=2)))
-    if 'implied_vol' in plot_df.columns:
+    if surface:
+        hist = surface['history']
+        hist = hist[hist.index >= plot_df.index[0]]
+        fig.add_trace(go.Scatter(x=hist.index, y=hist.to_numpy(), name='Implied ATM 30D (Deribit)', mode='lines+markers', line=dict(color='#F59E0B', width=2), marker=dict(size=5)))
+        term = " · ".join(f"{d}D {v:.0%}" for d, v in surface['term_points'].items() if v == v)
+        fig.add_annotation(xref='paper', yref='paper', x=1, y=0.02, xanchor='right', yanchor='bottom', showarrow=False,
+                           text=f"Term {term} | Skew 30D {surface['skew_30d']:+.1%}", font=dict(size=12, color='#F59E0B'))
+    elif regime:
+        # Sobre el frame completo: la media de 10 días del spread necesita historia previa
+        iv = risk_math.simulate_implied_volatility(df['volatility'], crisis_prob=turbulent_probability(regime, df.index))
+        fig.add_trace(go.Scatter(x=plot_df.index, y=iv.iloc[-len(plot_df):], name='Implied Vol (Proxy · Regime)', line=dict(color='#F59E0B', width=2, dash='dot')))
+    elif 'implied_vol' in plot_df.columns:
         fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['implied_vol'], name='Implied Vol (Proxy)', line=dict(color='#F59E0B', width=2, dash='dot')))
-    fig.update_layout(title="Volatility Regime", height=300, margin=dict(l=0, r=0, t=30, b=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color='#e0e0e0'), legend=dict(orientation="h", y=1, x=0))
+    title = "Volatility Regime"
+    if regime:
+        probs = regime['probs']
+        start = plot_df.index[0]
+        if start.tz is not None: start = start.tz_localize(None)     # Las probabilidades van sin zona horaria
+        turbulent = probs[probs.columns[-1]]
+        turbulent = turbulent[turbulent.index >= start]
+        fig.add_trace(go.Scatter(x=turbulent.index, y=turbulent.to_numpy(), name=f'P({probs.columns[-1]})', yaxis='y2',
+                                 mode='lines', line=dict(color='rgba(255, 75, 75, 0.6)', width=1), fill='tozeroy', fillcolor='rgba(255, 75, 75, 0.12)'))
+        fig.update_layout(yaxis2=dict(overlaying='y', side='right', range=[0, 1], showgrid=False, tickformat='.0%'))
+        title = f"Volatility Regime · {regime['regime']} ({regime['current'][regime['regime']]:.0%})"
+    fig.update_layout(title=title, height=300, margin=dict(l=0, r=0, t=30, b=0), template=tv_template(), legend=dict(orientation="h", y=1, x=0))
     return fig
 
-def create_zscore_chart(df): # (Antes create_onchain_chart) - Mismo gráfico, nombre más preciso
-    if df.empty: return go.Figure()
-    plot_df = df.iloc[-730:]
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=plot_df.index, y=plot_df['z_score'], name='Z-Score (200D)', fill='tozeroy', line=dict(color='#8B5CF6')))
+def _zscore_skeleton():
+    fig = go.Figure(go.Scattergl(name='Z-Score (200D)', fill='tozeroy', line=dict(color='#8B5CF6')))
     fig.add_hline(y=3.0, line_dash="dash", line_color="#FF4B4B")
     fig.add_hline(y=0.0, line_dash="dash", line_color="#10B981")
     fig.add_hline(y=-3.0, line_dash="dash", line_color="#10B981")
-    fig.update_layout(title="Mean Reversion (Z-Score)", height=300, margin=dict(l=0, r=0, t=30, b=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font=dict(color='#e0e0e0'))
+    fig.update_layout(title="Mean Reversion (Z-Score)", height=300, margin=dict(l=0, r=0, t=30, b=0), xaxis=dict(type='date'), template=tv_template())
     return fig
 
+ZSCORE = FigureSkeleton(_zscore_skeleton)
+
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_zscore_chart(df): # (Antes create_onchain_chart) - Mismo gráfico, nombre más preciso
+    if df.empty: return go.Figure()
+    plot_df = df.iloc[-730:]
+    def fill(fig):
+        fig.data[0].update(x=date_axis(plot_df.index), y=plot_df['z_score'].to_numpy())
+    return ZSCORE.render(frame_key(df, ['z_score']), fill)
+
 def create_onchain_chart(df): # Alias para compatibilidad
     return create_zscore_chart(df)
 
+@telemetry.timed("volcano_chart_seconds", "chart")
 def create_macro_chart(df):
     """
     Gráfico comparativo de rendimientos normalizados (Base 0%).
     """
-    import plotly.express as px
     if df.empty: return go.Figure()
     
     fig = px.line(df, x=df.index, y=df.columns)
@@ -194,8 +301,7 @@ def create_macro_chart(df):
     fig.update_layout(
         title="Macro Correlations (Normalized Returns)",
         xaxis_title=None, yaxis_title="Performance %", legend_title=None,
-        height=350, plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e0e0e0'), hovermode="x unified",
+        height=350, template=tv_template(), hovermode="x unified",
         margin=dict(l=0, r=0, t=40, b=0)
     )
     # Colores específicos
@@ -207,6 +313,42 @@ def create_macro_chart(df):
             
     return fig
 
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_correlation_regime_chart(corr_hist):
+    """
+    Correlación móvil de BTC frente a cada activo macro, con bandas de régimen
+    (|ρ| > 0.5 = acoplado, |ρ| < 0.2 = desacoplado) y la beta actual en la leyenda.
+    """
+    if corr_hist.empty: return go.Figure()
+
+    corr = corr_hist['corr']
+    beta = corr_hist['beta']
+    fig = go.Figure()
+
+    # Bandas de régimen (al fondo)
+    fig.add_hrect(y0=0.5, y1=1, fillcolor='rgba(255, 75, 75, 0.08)', line_width=0)
+    fig.add_hrect(y0=-1, y1=-0.5, fillcolor='rgba(59, 130, 246, 0.08)', line_width=0)
+    fig.add_hrect(y0=-0.2, y1=0.2, fillcolor='rgba(16, 185, 129, 0.06)', line_width=0)
+    fig.add_hline(y=0, line_dash="dot", line_color="rgba(255,255,255,0.3)")
+
+    color_map = {'S&P 500': '#3B82F6', 'Gold': '#F59E0B', 'DXY (Dollar)': '#9CA3AF'}
+    for name in corr.columns:
+        fig.add_trace(go.Scatter(
+            x=corr.index, y=corr[name], mode='lines',
+            name=f"{name} (ρ {corr[name].iloc[-1]:+.2f} · β {beta[name].iloc[-1]:+.2f})",
+            line=dict(color=color_map.get(name, '#e0e0e0'), width=2)
+        ))
+
+    fig.update_layout(
+        title="BTC Correlation Regime (Rolling 30D)",
+        yaxis=dict(range=[-1, 1], title="Correlation"),
+        height=350, template=tv_template(), hovermode="x unified",
+        legend=dict(orientation="h", y=-0.15, x=0),
+        margin=dict(l=0, r=0, t=40, b=0)
+    )
+    return fig
+
+@telemetry.timed("volcano_chart_seconds", "chart")
 def create_forecast_chart(historical_df, forecast_df):
     """
     Gráfico de Profecía: Historia + Predicción + Cono de Incertidumbre
@@ -214,7 +356,7 @@ def create_forecast_chart(historical_df, forecast_df):
     fig = go.Figure()
 
     # 1. Datos Históricos
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=historical_df.index, y=historical_df['close'],
         mode='lines', name='Historical Price',
         line=dict(color='rgba(255,255,255,0.5)', width=1)
@@ -246,21 +388,19 @@ def create_forecast_chart(historical_df, forecast_df):
     fig.update_layout(
         title="🔮 AI Trend Forecast (Prophet Model)",
         yaxis_title="Price (USD)", height=450,
-        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e0e0e0'), hovermode="x unified"
+        template=tv_template(), hovermode="x unified"
     )
     return fig
 # --- 4. SEASONALITY HEATMAP (VISUAL IMPONENTE) ---
 # --- EN UTILS/CHARTS.PY ---
 
+@telemetry.timed("volcano_chart_seconds", "chart")
 def create_seasonality_heatmap(df):
     if df.empty: return go.Figure()
     
-    # 1. Preparación de Datos
-    df_seas = df.copy()
-    
+    # 1. Preparación de Datos (solo leemos 'close', sin copiar el frame)
     # Calculamos cambio mensual
-    monthly_data = df_seas.resample('ME').agg({'close': 'last'}) # 'ME' es Month End
+    monthly_data = df['close'].resample('ME').last().to_frame() # 'ME' es Month End
     monthly_data['pct_change'] = monthly_data['close'].pct_change()
     
     # Creamos columnas para el pivote
@@ -280,7 +420,7 @@ def create_seasonality_heatmap(df):
     # Creamos una copia donde los valores nulos sean strings vacíos ""
     text_matrix = heatmap_data.copy()
     # Formateamos a porcentaje sin decimales (ej: 12%) y quitamos los nulos
-    text_display = text_matrix.applymap(lambda x: f"{x:.0%}" if pd.notnull(x) else "")
+    text_display = text_matrix.map(lambda x: f"{x:.0%}" if pd.notnull(x) else "")
 
     # 3. CREACIÓN DEL HEATMAP
     fig = go.Figure(data=go.Heatmap(
@@ -306,8 +446,7 @@ def create_seasonality_heatmap(df):
         
         height=600, # Un poco más alto para que respire
         margin=dict(l=0, r=0, t=0, b=0), # Márgenes ajustados
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
+        template=tv_template(),
         font=dict(color='#888'), # Color de los ejes (años/meses) más sutil
         xaxis=dict(
             side="top", 
@@ -324,162 +463,135 @@ def create_seasonality_heatmap(df):
     
     return fig
     
-# --- 5. RAINBOW CHART (CORREGIDO) ---
-def create_rainbow_chart(df):
-    if df.empty: return go.Figure()
-    
-    import numpy as np
+# --- 5. RAINBOW CHART Y POWER LAW (REGRESIÓN LOG-LOG) ---
+GENESIS = pd.Timestamp("2009-01-03")
+
+def log_log_fit(df):
+    """
+    Regresión log10(precio) ~ log10(días desde el génesis), común al Rainbow y al Power Law.
+    Devuelve (x de fechas para el eje, log10(días), precios, pendiente, intercepto).
+    Las curvas se envían en float32: sobra precisión para pintar y el JSON pesa la mitad.
+    """
     from scipy import stats
-    
-    df_rain = df[df['close'] > 0].copy()
-    
-    # 1. Aseguramos que el índice no tenga zona horaria (para evitar choque con genesis)
-    if df_rain.index.tz is not None:
-        df_rain.index = df_rain.index.tz_localize(None)
 
-    genesis = pd.Timestamp("2009-01-03")
-    
-    # 2. CORRECCIÓN: Usamos .days directamente (sin .dt)
-    # Al restar el Index - Timestamp, obtenemos un TimedeltaIndex que tiene .days nativo
-    df_rain['days'] = (df_rain.index - genesis).days
-    
-    # Filtramos días negativos o cero (antes del génesis)
-    df_rain = df_rain[df_rain['days'] > 0]
-    
-    # --- MATEMÁTICA LOG-LOG ---
-    x = np.log10(df_rain['days'])
-    y = np.log10(df_rain['close'])
-    
-    slope, intercept, _, _, _ = stats.linregress(x, y)
-    
-    # Bandas del Arcoiris (Offsets logarítmicos calibrados)
-    bands = [
-        ("Bubble Territory",  1.0,  '#FF0000'), # Rojo
-        ("FOMO",              0.75, '#FF7F00'), # Naranja
-        ("HODL",              0.5,  '#FFFF00'), # Amarillo
-        ("Still Cheap",       0.25, '#00FF00'), # Verde
-        ("Fire Sale",         0.0,  '#0000FF'), # Azul
-    ]
-    
+    # Arrays de solo lectura (no copiamos el frame cacheado) y sin zona horaria
+    dates = df.index.tz_localize(None) if df.index.tz is not None else df.index
+    days = np.asarray((dates - GENESIS).days)
+    close = df['close'].to_numpy()
+    # Filtramos precios nulos y días negativos o cero (antes del génesis)
+    mask = (close > 0) & (days > 0)
+    x = np.log10(days[mask])
+    slope, intercept, _, _, _ = stats.linregress(x, np.log10(close[mask]))
+    return date_axis(dates[mask]), x, close[mask], slope, intercept
+
+# Bandas del Arcoiris (Offsets logarítmicos calibrados)
+RAINBOW_BANDS = [
+    ("Bubble Territory",  1.0,  '#FF0000'), # Rojo
+    ("FOMO",              0.75, '#FF7F00'), # Naranja
+    ("HODL",              0.5,  '#FFFF00'), # Amarillo
+    ("Still Cheap",       0.25, '#00FF00'), # Verde
+    ("Fire Sale",         0.0,  '#0000FF'), # Azul
+]
+
+def _rainbow_skeleton():
     fig = go.Figure()
-    
-    # Dibujamos bandas
-    for name, offset, color in bands:
-        y_band = 10 ** (intercept + slope * x + offset)
-        fig.add_trace(go.Scatter(
-            x=df_rain.index, y=y_band,
-            mode='lines', line=dict(color=color, width=2), name=name
-        ))
-
+    for name, _, color in RAINBOW_BANDS:
+        fig.add_trace(go.Scattergl(mode='lines', line=dict(color=color, width=2), name=name))
     # Precio Real
-    fig.add_trace(go.Scatter(
-        x=df_rain.index, y=df_rain['close'],
-        mode='lines', line=dict(color='white', width=3), name='BTC Price'
-    ))
-
+    fig.add_trace(go.Scattergl(mode='lines', line=dict(color='white', width=3), name='BTC Price'))
     fig.update_layout(
-        
         yaxis_type="log",
+        xaxis=dict(type='date'),
         height=550,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e0e0e0'),
+        template=tv_template(),
         hovermode="x unified",
         showlegend=True,
         legend=dict(orientation="h", y=0, x=0.5, xanchor="center")
     )
-    
     return fig
 
-# --- EN UTILS/CHARTS.PY ---
+RAINBOW = FigureSkeleton(_rainbow_skeleton)
 
-def create_power_law_chart(df):
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_rainbow_chart(df):
     if df.empty: return go.Figure()
-    
-    from scipy import stats
-    import numpy as np
-    
-    # 1. Preparación de Datos
-    # Copiamos y limpiamos zonas horarias
-    pl_df = df[df['close'] > 0].copy()
-    if pl_df.index.tz is not None: pl_df.index = pl_df.index.tz_localize(None)
-    
-    genesis_date = pd.Timestamp("2009-01-03")
-    pl_df['days_since'] = (pl_df.index - genesis_date).days
-    pl_df = pl_df[pl_df['days_since'] > 0]
 
-    # 2. Matemática Power Law (Log-Log Regression)
-    x = np.log10(pl_df['days_since'])
-    y = np.log10(pl_df['close'])
-    
-    slope, intercept, _, _, _ = stats.linregress(x, y)
-    
-    # Calculamos Fair Value y Bandas
-    pl_df['fair_value'] = 10 ** (intercept + slope * x)
-    pl_df['support'] = 10 ** (intercept - 0.35 + slope * x)    # Banda inferior
-    pl_df['resistance'] = 10 ** (intercept + 0.5 + slope * x)  # Banda superior
+    def fill(fig):
+        dates, x, close, slope, intercept = log_log_fit(df)
+        trend = intercept + slope * x
+        for trace, (_, offset, _) in zip(fig.data, RAINBOW_BANDS):
+            trace.update(x=dates, y=(10 ** (trend + offset)).astype(np.float32))
+        fig.data[-1].update(x=dates, y=close.astype(np.float32))
+    return RAINBOW.render(frame_key(df, ['close']), fill)
 
-    # 3. Graficado
+def _power_law_skeleton():
     fig = go.Figure()
-    
     # Bandas (Rellenos Sutiles)
-    fig.add_trace(go.Scatter(
-        x=pl_df.index, y=pl_df['resistance'], 
+    fig.add_trace(go.Scattergl(
         mode='lines', line=dict(color='#D946EF', width=2), # Morado
         name='Resistance (Top)'
     ))
-    
-    fig.add_trace(go.Scatter(
-        x=pl_df.index, y=pl_df['support'], 
+    fig.add_trace(go.Scattergl(
         mode='lines', line=dict(color='#FF0000', width=2), # Rojo
         fill='tonexty', fillcolor='rgba(255, 255, 255, 0.03)', # Relleno muy sutil
         name='Support (Bottom)'
     ))
-
     # Fair Value (La línea "imán")
-    fig.add_trace(go.Scatter(
-        x=pl_df.index, y=pl_df['fair_value'], 
+    fig.add_trace(go.Scattergl(
         mode='lines', line=dict(color='#00FF00', width=2), # Verde
         name='Fair Value'
     ))
-
     # Precio Real
-    fig.add_trace(go.Scatter(
-        x=pl_df.index, y=pl_df['close'], 
-        mode='lines', line=dict(color='#F59E0B', width=1), 
+    fig.add_trace(go.Scattergl(
+        mode='lines', line=dict(color='#F59E0B', width=1),
         name='BTC Price'
     ))
-
     fig.update_layout(
-         
         yaxis_type="log", # Escala Logarítmica obligatoria
         height=550,
         margin=dict(l=0, r=0, t=10, b=0), # Márgenes mínimos
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#e0e0e0'),
-        xaxis=dict(showgrid=False),
+        template=tv_template(),
+        xaxis=dict(showgrid=False, type='date'),
         yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
         hovermode="x unified",
         legend=dict(orientation="h", y=0, x=0.5, xanchor="center")
     )
-    
     return fig
-    
+
+POWER_LAW = FigureSkeleton(_power_law_skeleton)
+
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_power_law_chart(df):
+    if df.empty: return go.Figure()
+
+    def fill(fig):
+        dates, x, close, slope, intercept = log_log_fit(df)
+        # Fair Value y Bandas: resistencia +0.5, soporte -0.35 (log10)
+        trend = intercept + slope * x
+        for trace, offset in zip(fig.data, (0.5, -0.35, 0.0)):
+            trace.update(x=dates, y=(10 ** (trend + offset)).astype(np.float32))
+        fig.data[3].update(x=dates, y=close.astype(np.float32))
+    return POWER_LAW.render(frame_key(df, ['close']), fill)
+
+@telemetry.timed("volcano_chart_seconds", "chart")
 def create_miner_metrics_chart_tv(price_df, hash_df):
-    if price_df.empty or hash_df.empty: return go.Figure()
-    
-    # 1. Preparar Datos
-    p = price_df['close'].resample('D').mean()
-    h = hash_df['hash_rate'].resample('D').mean()
-    df = pd.concat([p, h], axis=1).dropna()
-    df.columns = ['price', 'hash']
-    
-    # Indicadores
-    df['ma30'] = df['hash'].rolling(30).mean()
-    df['ma60'] = df['hash'].rolling(60).mean()
-    # Ratio Normalizado para TV
-    df['val'] = df['price'] / (df['hash'] / 1000000)
+    """
+    Hash Ribbons (30/60D) con eventos de capitulación/recuperación + Price/Hash.
+    hash_df puede ser el frame de señales ya calculado por el scheduler
+    (hashrate.with_valuation) o un frame crudo ['hash_rate'].
+    """
+    if hash_df is None or hash_df.empty: return go.Figure()
+
+    # 1. Preparar Datos (sin recalcular medias si ya vienen del almacén incremental)
+    if 'ma_fast' in hash_df.columns:
+        df = hash_df
+    else:
+        if price_df is None or price_df.empty: return go.Figure()
+        daily_hash = hash_df['hash_rate'].resample('D').mean().dropna()
+        df = hashrate.with_valuation(hashrate.ribbon_signals(daily_hash), price_df['close'].resample('D').mean())
+    df = df[df['ma_slow'].notna()]
+    caps = df[df['capitulation']]
+    recs = df[df['recovery']]
 
     # 2. Configurar Subplots Verticales
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, 
@@ -487,21 +599,26 @@ def create_miner_metrics_chart_tv(price_df, hash_df):
 
     # --- ARRIBA: HASH RIBBONS (NEÓN) ---
     # Fast Line (Verde Neón)
-    fig.add_trace(go.Scatter(x=df.index, y=df['ma30'], mode='lines', 
+    fig.add_trace(go.Scattergl(x=df.index, y=df['ma_fast'], mode='lines', 
                              line=dict(color='#00FF00', width=3), name='Fast (30D)'), row=1, col=1)
     # Slow Line (Rojo Neón)
-    fig.add_trace(go.Scatter(x=df.index, y=df['ma60'], mode='lines', 
+    fig.add_trace(go.Scattergl(x=df.index, y=df['ma_slow'], mode='lines', 
                              line=dict(color='#FF0000', width=3), name='Slow (60D)'), row=1, col=1)
+    # Eventos de cruce
+    fig.add_trace(go.Scatter(x=caps.index, y=caps['ma_fast'], mode='markers',
+                             marker=dict(symbol='x', size=12, color='#FF4B4B'), name='Capitulation'), row=1, col=1)
+    fig.add_trace(go.Scatter(x=recs.index, y=recs['ma_fast'], mode='markers',
+                             marker=dict(symbol='triangle-up', size=14, color='#00C805'), name='Recovery'), row=1, col=1)
 
     # --- ABAJO: VALUATION (AMARILLO) ---
-    fig.add_trace(go.Scatter(x=df.index, y=df['val'], mode='lines', 
+    fig.add_trace(go.Scattergl(x=df.index, y=df['valuation'], mode='lines', 
                              line=dict(color='#F59E0B', width=2), fill='tozeroy', 
                              fillcolor='rgba(245, 158, 11, 0.1)', name='Price/Hash'), row=2, col=1)
 
     # 3. Estilo TV (Minimalista)
     fig.update_layout(
         height=500, margin=dict(l=0, r=0, t=10, b=0),
-        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        template=tv_template(),
         font=dict(color='white', size=14),
         showlegend=False, # Sin leyenda para más espacio
         hovermode="x unified"
@@ -510,3 +627,34 @@ def create_miner_metrics_chart_tv(price_df, hash_df):
     fig.update_yaxes(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
     
     return fig
+
+# ==============================================================================
+# --- 6. BACKTEST DE SEÑALES (CURVAS DE CAPITAL) ---
+# ==============================================================================
+BACKTEST_COLORS = {'trend': '#3B82F6', 'zscore': '#8B5CF6', 'power_law': '#00FF00', 'golden_pocket': '#F59E0B', 'buy_hold': '#888888'}
+
+@telemetry.timed("volcano_chart_seconds", "chart")
+def create_backtest_chart(result):
+    """Capital de 1$ siguiendo cada señal (backtest.run_backtests) frente a Buy & Hold, en escala log."""
+    if not result: return go.Figure()
+    equity, table = result['equity'], result['table']
+
+    fig = go.Figure()
+    for name in equity.columns:
+        hold = name == 'buy_hold'
+        fig.add_trace(go.Scattergl(
+            x=date_axis(equity.index), y=equity[name].to_numpy(), mode='lines',
+            line=dict(color=BACKTEST_COLORS.get(name, '#FFFFFF'), width=1 if hold else 2, dash='dot' if hold else 'solid'),
+            name=f"{table.at[name, 'label']} ({table.at[name, 'cagr']:+.0%}/yr)"
+        ))
+
+    fig.update_layout(
+        yaxis_type="log", height=550,
+        margin=dict(l=0, r=0, t=10, b=0),
+        template=tv_template(),
+        xaxis=dict(showgrid=False, type='date'),
+        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)', title="Equity (1$)"),
+        hovermode="x unified",
+        legend=dict(orientation="h", y=0, x=0.5, xanchor="center")
+    )
+    return fig
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+import warmstart
+
+# ==============================================================================
+# --- ALMACÉN COLUMNAR MAPEADO EN MEMORIA ---
+# ==============================================================================
+# Cada serie (DataFrame con índice de fechas) se guarda como un fichero .npy por
+# columna más el índice en int64 (ns). Los lectores abren los ficheros con
+# mmap en solo lectura: el sistema operativo comparte esas páginas entre
+# sesiones, hilos y procesos (Streamlit, broadcast...), así que la memoria no
+# crece con el número de pantallas ni de workers, y cualquier ventana por fecha
+# (iloc, window) es una vista sin copia.
+#
+# Escritura atómica: cada versión va en su carpeta <serie>/<versión>/ y el
+# fichero <serie>/CURRENT apunta a la vigente (os.replace). Las versiones viejas
+# se borran; en POSIX los mapeos abiertos siguen siendo válidos.
+#   VOLCANO_COLSTORE=0          -> desactiva el almacén
+#   VOLCANO_COLSTORE_DIR=path   -> carpeta (por defecto <snapshot dir>/columns)
+KEEP_VERSIONS = 2
+
+def default_dir():
+    return os.getenv("VOLCANO_COLSTORE_DIR",
+                     os.path.join(os.getenv("VOLCANO_SNAPSHOT_DIR", warmstart.DEFAULT_DIR), "columns"))
+
+class ColumnStore:
+    """
+    - directory: carpeta raíz (una subcarpeta por serie).
+    Mismo contrato que warmstart.SnapshotStore (save/load), así el scheduler
+    puede usarlo como snapshot de una fuente y servir directamente el frame mapeado.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or default_dir()
+        self._open = {}          # serie -> (versión, frame mapeado)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _series_dir(self, name):
+        return os.path.join(self.directory, name)
+
+    def _current(self, name):
+        try:
+            with open(os.path.join(self._series_dir(name), "CURRENT"), encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    # --- Escritura ---
+    def write(self, name, df):
+        """Guarda df como nueva versión de la serie y devuelve el frame mapeado."""
+        if df is None or not isinstance(df.index, pd.DatetimeIndex):
+            raise TypeError(f"ColumnStore: {name} needs a DataFrame with a DatetimeIndex")
+        version = str(time.time_ns())
+        path = os.path.join(self._series_dir(name), version)
+        os.makedirs(path)
+        index = df.index.tz_localize(None) if df.index.tz is not None else df.index
+        np.save(os.path.join(path, "index.npy"), index.to_numpy(dtype="datetime64[ns]").view(np.int64))
+        # Ficheros por posición: los nombres de columna pueden tener espacios ('stock splits')
+        for i, col in enumerate(df.columns):
+            np.save(os.path.join(path, f"{i}.npy"), np.ascontiguousarray(df[col].to_numpy()))
+        meta = {"columns": [str(c) for c in df.columns], "index_name": df.index.name, "saved_at": time.time(), "rows": len(df)}
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        pointer = os.path.join(self._series_dir(name), "CURRENT")
+        tmp = f"{pointer}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        with self._lock:
+            os.replace(tmp, pointer)
+            self._prune(name)
+        return self.frame(name)
+
+    def _prune(self, name):
+        versions = sorted(v for v in os.listdir(self._series_dir(name)) if v.isdigit())
+        for old in versions[:-KEEP_VERSIONS]:
+            shutil.rmtree(os.path.join(self._series_dir(name), old), ignore_errors=True)
+
+    # --- Lectura ---
+    def frame(self, name):
+        """DataFrame completo respaldado por mmap (o None si la serie no existe). Se reabre al cambiar de versión."""
+        version = self._current(name)
+        if version is None: return None
+        with self._lock:
+            cached = self._open.get(name)
+            if cached and cached[0] == version: return cached[1]
+        path = os.path.join(self._series_dir(name), version)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        index = np.load(os.path.join(path, "index.npy"), mmap_mode="r")
+        columns = {col: np.load(os.path.join(path, f"{i}.npy"), mmap_mode="r") for i, col in enumerate(meta["columns"])}
+        df = pd.DataFrame(columns, index=pd.DatetimeIndex(index.view("datetime64[ns]"), name=meta["index_name"], copy=False), copy=False)
+        df.attrs["saved_at"] = meta["saved_at"]
+        with self._lock:
+            self._open[name] = (version, df)
+        return df
+
+    def window(self, name, start=None, end=None, last=None, columns=None):
+        """
+        Vista sin copia de la serie entre start y end (inclusive) o de las
+        últimas `last` filas, opcionalmente solo con `columns`.
+        """
+        df = self.frame(name)
+        if df is None: return None
+        if columns is not None: df = df[list(columns)]
+        if last is not None: return df.iloc[-last:]
+        idx = df.index
+        lo = 0 if start is None else idx.searchsorted(pd.Timestamp(start), side="left")
+        hi = len(idx) if end is None else idx.searchsorted(pd.Timestamp(end), side="right")
+        return df.iloc[lo:hi]
+
+    # --- Contrato de snapshot (scheduler) ---
+    def save(self, name, value):
+        return self.write(name, value)
+
+    def load(self, name):
+        try:
+            df = self.frame(name)
+        except Exception as e:
+            print(f"ColumnStore Load Error ({name}): {e}")
+            return None
+        if df is None: return None
+        return df, df.attrs.get("saved_at", time.time())
+
+def get_store():
+    """Almacén configurado por entorno o None si está desactivado."""
+    if os.getenv("VOLCANO_COLSTORE", "1").lower() in ("0", "false", "no"): return None
+    try: return ColumnStore(default_dir())
+    except OSError as e:
+        print(f"ColumnStore Dir Error: {e}")
+        return None
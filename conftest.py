@@ -0,0 +1 @@
+# pytest: los módulos del dashboard viven en la raíz (se importan como en main.py)
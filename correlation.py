@@ -0,0 +1,147 @@
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# --- 1. ALINEACIÓN DE CALENDARIOS (Cripto 24/7 vs Bolsa L-V) ---
+# ==============================================================================
+def align_calendars(prices):
+    """
+    Lleva todas las series a fechas sin hora ni zona y se queda con los días en
+    que TODAS cotizan (el calendario más lento manda). El movimiento de BTC del
+    fin de semana se acumula en el retorno del lunes en vez de perderse.
+    """
+    df = prices.copy()
+    if getattr(df.index, "tz", None) is not None: df.index = df.index.tz_localize(None)
+    df.index = pd.DatetimeIndex(df.index).normalize()
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna(how="any")
+
+def completed_days(aligned, today=None):
+    """
+    Quita la fila del día en curso (UTC): yfinance sirve la barra diaria de hoy
+    mientras se mueve y el motor no vuelve a leer una fecha ya procesada, así que
+    el cierre definitivo se perdería. Igual que regime.completed_bars.
+    """
+    today = pd.Timestamp.now(tz="UTC").tz_localize(None).normalize() if today is None else today
+    return aligned[aligned.index < today]
+
+def log_returns(aligned):
+    return np.log(aligned / aligned.shift(1)).iloc[1:]
+
+# ==============================================================================
+# --- 2. MOTOR DE CORRELACIÓN Y BETA (Covarianza móvil incremental) ---
+# ==============================================================================
+class RollingCorrelationEngine:
+    """
+    Mantiene sumas de la ventana (Σr y Σr·rᵀ) para actualizar la matriz de
+    covarianza en O(k²) por barra nueva, sin recalcular ventanas completas.
+    - window: barras comunes de la ventana móvil.
+    - base: serie de referencia para la beta y el gráfico de régimen.
+    """
+    def __init__(self, window=30, base="Bitcoin", max_history=750):
+        self.window = window
+        self.base = base
+        self.max_history = max_history
+        self.columns = None
+        self.last_date = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._buffer = deque()
+        self._s1 = None
+        self._s2 = None
+        self.dates = deque(maxlen=self.max_history)
+        self.corr_history = deque(maxlen=self.max_history)
+        self.beta_history = deque(maxlen=self.max_history)
+
+    # --- Actualización ---
+    def update(self, prices, today=None):
+        """
+        Procesa solo las fechas nuevas y ya cerradas de `prices` (fecha x serie,
+        precios crudos). La barra de hoy entra en el refresco de mañana.
+        """
+        if prices is None or prices.empty: return self
+        returns = log_returns(completed_days(align_calendars(prices), today))
+        with self._lock:
+            if self.columns != list(returns.columns):
+                self.columns = list(returns.columns)
+                self.last_date = None
+                self._reset()
+            if self.last_date is not None:
+                returns = returns[returns.index > self.last_date]
+            if returns.empty: return self
+
+            values = returns.to_numpy(dtype=np.float64)
+            if self._s1 is None: self._bootstrap(returns.index, values)
+            else:
+                for date, r in zip(returns.index, values): self._push(date, r)
+            self.last_date = returns.index[-1]
+        return self
+
+    def _bootstrap(self, dates, values):
+        """Primera carga: todas las ventanas a la vez con sumas acumuladas."""
+        k, w = values.shape[1], self.window
+        outer = values[:, :, None] * values[:, None, :]
+        c1 = np.cumsum(values, axis=0)
+        c2 = np.cumsum(outer, axis=0)
+        s1 = c1.copy(); s1[w:] -= c1[:-w]
+        s2 = c2.copy(); s2[w:] -= c2[:-w]
+
+        for i in range(w - 1, len(values)):
+            corr, beta = self._stats(s1[i], s2[i])
+            self.dates.append(dates[i]); self.corr_history.append(corr); self.beta_history.append(beta)
+
+        self._buffer.extend(values[-w:])
+        self._s1 = values[-w:].sum(axis=0) if len(values) >= w else values.sum(axis=0)
+        self._s2 = np.einsum("ti,tj->ij", values[-w:], values[-w:]) if len(values) >= w else outer.sum(axis=0)
+
+    def _push(self, date, r):
+        self._buffer.append(r)
+        self._s1 = self._s1 + r
+        self._s2 = self._s2 + np.outer(r, r)
+        if len(self._buffer) > self.window:
+            old = self._buffer.popleft()
+            self._s1 = self._s1 - old
+            self._s2 = self._s2 - np.outer(old, old)
+        if len(self._buffer) == self.window:
+            corr, beta = self._stats(self._s1, self._s2)
+            self.dates.append(date); self.corr_history.append(corr); self.beta_history.append(beta)
+
+    def _stats(self, s1, s2):
+        w = self.window
+        cov = (s2 - np.outer(s1, s1) / w) / (w - 1)
+        var = np.clip(np.diag(cov), 1e-18, None)
+        corr = cov / np.sqrt(np.outer(var, var))
+        beta = cov / var[None, :]          # beta[i, j] = cov(i, j) / var(j)
+        return np.clip(corr, -1, 1), beta
+
+    # --- Lectura ---
+    def matrix(self):
+        """Matriz de correlación actual (DataFrame k x k) o None."""
+        if not self.corr_history: return None
+        return pd.DataFrame(self.corr_history[-1], index=self.columns, columns=self.columns)
+
+    def beta_matrix(self):
+        if not self.beta_history: return None
+        return pd.DataFrame(self.beta_history[-1], index=self.columns, columns=self.columns)
+
+    def base_history(self):
+        """
+        Correlación y beta de cada serie frente a `base` en el tiempo:
+        DataFrame con columnas MultiIndex ('corr'|'beta', serie).
+        """
+        if not self.corr_history or self.base not in self.columns: return pd.DataFrame()
+        b = self.columns.index(self.base)
+        others = [i for i in range(len(self.columns)) if i != b]
+        corr = np.array(self.corr_history)[:, b, others]
+        beta = np.array(self.beta_history)[:, b, others]   # beta de la base frente a cada serie
+        names = [self.columns[i] for i in others]
+        idx = pd.DatetimeIndex(list(self.dates), name="Date")
+        return pd.concat({
+            'corr': pd.DataFrame(corr, index=idx, columns=names),
+            'beta': pd.DataFrame(beta, index=idx, columns=names),
+        }, axis=1)
@@ -1,9 +1,11 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
+import os
 import requests
 import streamlit as st
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import upstream
 
 # ==============================================================================
 # --- CONFIGURACIÓN ---
@@ -12,6 +14,22 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
+# Activos soportados. 'kraken_key' es el nombre que devuelve Kraken en 'result'.
+# Otros símbolos se añaden con VOLCANO_ASSETS (ej: "BTC,ETH,SOL,DOGE").
+ASSETS = {
+    'BTC': {'name': 'Bitcoin',  'yf': 'BTC-USD', 'kraken': 'XBTUSD', 'kraken_key': 'XXBTZUSD', 'bitstamp': 'btcusd'},
+    'ETH': {'name': 'Ethereum', 'yf': 'ETH-USD', 'kraken': 'ETHUSD', 'kraken_key': 'XETHZUSD', 'bitstamp': 'ethusd'},
+    'SOL': {'name': 'Solana',   'yf': 'SOL-USD', 'kraken': 'SOLUSD', 'kraken_key': 'SOLUSD',   'bitstamp': 'solusd'},
+}
+
+def configured_assets():
+    """{código: spec} en el orden de VOLCANO_ASSETS (por defecto BTC, ETH, SOL)."""
+    codes = [c.strip().upper() for c in os.getenv("VOLCANO_ASSETS", "BTC,ETH,SOL").split(",") if c.strip()]
+    return {
+        c: ASSETS.get(c, {'name': c, 'yf': f"{c}-USD", 'kraken': f"{c}USD", 'kraken_key': f"{c}USD", 'bitstamp': f"{c.lower()}usd"})
+        for c in codes
+    }
+
 # ==============================================================================
 # --- 1. DATOS DE MERCADO (OHLCV) ---
 # ==============================================================================
@@ -20,8 +38,7 @@ def fetch_market_data(ticker="BTC-USD", period="2y", interval="1d"):
     Descarga individual segura para evitar MultiIndex.
     """
     try:
-        dat = yf.Ticker(ticker)
-        df = dat.history(period=period, interval=interval)
+        df = upstream.yf_history(ticker, period=period, interval=interval)
         
         if df.empty: return pd.DataFrame()
 
@@ -31,35 +48,216 @@ def fetch_market_data(ticker="BTC-USD", period="2y", interval="1d"):
 
         if 'close' not in df.columns: return pd.DataFrame()
 
-        # Indicadores
-        df['sma_50'] = df['close'].rolling(window=50).mean()
-        df['sma_200'] = df['close'].rolling(window=200).mean()
-        df['log_ret'] = np.log(df['close'] / df['close'].shift(1))
-        
-        annual_factor = np.sqrt(365) if interval == "1d" else np.sqrt(365 * 24)
-        window_size = 30 if interval == "1d" else (30 * 24) 
-        df['volatility'] = df['log_ret'].rolling(window=window_size).std() * annual_factor
-        df['implied_vol'] = df['volatility'] * 1.1 + (df['volatility'] ** 2) * 2
-        
-        std_200 = df['close'].rolling(window=200).std()
-        df['z_score'] = (df['close'] - df['sma_200']) / std_200.replace(0, np.nan)
-        
-        df = df.fillna(0)
-        return df
+        return compute_indicators(df, interval)
 
     except Exception as e:
         print(f"Error Market Data: {e}")
         return pd.DataFrame()
 
+# Columnas que se guardan en cache (el resto de yfinance, como dividends o
+# stock splits, y los intermedios como log_ret, se descartan)
+MARKET_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'sma_50', 'sma_200', 'volatility', 'implied_vol', 'z_score']
+
+def compact_frame(df):
+    """
+    Representación compacta compartida: solo MARKET_COLUMNS y en float32.
+    Las filas de calentamiento de los indicadores quedan como NaN (no 0).
+    """
+    cols = [c for c in MARKET_COLUMNS if c in df.columns]
+    return df[cols].astype(np.float32)
+
+def frame_nbytes(df):
+    """Bytes que ocupa un frame en memoria (índice incluido)."""
+    return int(df.memory_usage(index=True, deep=True).sum()) if df is not None else 0
+
+def compute_indicators(df, interval="1d"):
+    """
+    Añade SMA, volatilidad, IV proxy y Z-Score al frame OHLCV (columnas en minúsculas).
+    Se calcula en float64 y se devuelve compacto (float32, NaN en el calentamiento).
+    """
+    close = df['close'].astype(np.float64)
+    df['sma_50'] = close.rolling(window=50).mean()
+    df['sma_200'] = close.rolling(window=200).mean()
+    log_ret = np.log(close / close.shift(1))
+    
+    annual_factor = np.sqrt(365) if interval == "1d" else np.sqrt(365 * 24)
+    window_size = 30 if interval == "1d" else (30 * 24) 
+    df['volatility'] = log_ret.rolling(window=window_size).std() * annual_factor
+    df['implied_vol'] = df['volatility'] * 1.1 + (df['volatility'] ** 2) * 2
+    
+    std_200 = close.rolling(window=200).std()
+    df['z_score'] = (close - df['sma_200']) / std_200.replace(0, np.nan)
+    
+    return compact_frame(df)
+
+def last_row_indicators(close, interval="1d"):
+    """
+    Indicadores de la última fecha (mismas fórmulas que compute_indicators) a
+    partir de los cierres recientes, sin recalcular la serie completa.
+    """
+    annual_factor = np.sqrt(365) if interval == "1d" else np.sqrt(365 * 24)
+    window_size = 30 if interval == "1d" else (30 * 24)
+    close = np.asarray(close, dtype=np.float64)[-max(201, window_size + 1):]
+
+    tail = lambda n: close[-n:] if len(close) >= n else np.full(n, np.nan)
+    last_200 = tail(200)
+    sma_200, std_200 = last_200.mean(), last_200.std(ddof=1)
+    volatility = np.diff(np.log(tail(window_size + 1))).std(ddof=1) * annual_factor
+    return {
+        'sma_50': tail(50).mean(),
+        'sma_200': sma_200,
+        'volatility': volatility,
+        'implied_vol': volatility * 1.1 + (volatility ** 2) * 2,
+        'z_score': (close[-1] - sma_200) / std_200 if std_200 else np.nan,
+    }
+
+def set_last_row(df, values):
+    """Escribe {columna: valor} en la última fila, en sitio y con el dtype de cada columna (float32 en cache)."""
+    # iat escalar a escalar: el frame tiene varios bloques y .iloc con lista es ~5x más lento
+    row, dtypes = len(df) - 1, df.dtypes
+    for c, v in values.items():
+        i = df.columns.get_loc(c) if c in df.columns else None
+        if i is not None: df.iat[row, i] = dtypes.iloc[i].type(v)
+    return df
+
+# ==============================================================================
+# --- 1.1 PANEL MULTI-ACTIVO (Fecha x Activo, indicadores vectorizados) ---
+# ==============================================================================
+PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+def fetch_price_panel(assets=None, period="2y", interval="1d"):
+    """
+    Descarga OHLCV de cada activo en paralelo y lo reorganiza como panel:
+    {campo: DataFrame(fecha x activo)}.
+    """
+    assets = assets or configured_assets()
+
+    def download(item):
+        code, spec = item
+        try:
+            df = upstream.yf_history(spec['yf'], period=period, interval=interval)
+            if df.empty: return code, None
+            df.columns = [c.lower() for c in df.columns]
+            if df.index.tz is not None: df.index = df.index.tz_localize(None)
+            return code, df
+        except Exception as e:
+            print(f"Error Panel {code}: {e}")
+            return code, None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(assets))) as pool:
+        frames = {code: df for code, df in pool.map(download, assets.items()) if df is not None and 'close' in df.columns}
+    if not frames: return {}
+
+    return {field: pd.DataFrame({code: df[field] for code, df in frames.items() if field in df.columns}) for field in PANEL_FIELDS}
+
+def rolling_mean_std(values, window):
+    """
+    Media y desviación (ddof=1) móviles sobre un array 2D (fecha x activo) en
+    una sola pasada con sumas acumuladas. Los NaN (activos con menos historia)
+    invalidan solo las ventanas que los contienen.
+    """
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+
+    def window_sum(a):
+        c = np.cumsum(a, axis=0)
+        out = c.copy()
+        out[window:] = c[window:] - c[:-window]
+        return out
+
+    n = window_sum(valid.astype(np.float64))
+    s1 = window_sum(x)
+    s2 = window_sum(x * x)
+
+    full = n == window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(full, s1 / window, np.nan)
+        var = np.where(full, (s2 - s1 * s1 / window) / (window - 1), np.nan)
+    return mean, np.sqrt(np.clip(var, 0, None))
+
+def compute_panel_indicators(close, interval="1d"):
+    """
+    Mismos indicadores que compute_indicators pero para todos los activos a la
+    vez: {indicador: DataFrame(fecha x activo)}.
+    """
+    values = close.to_numpy(dtype=np.float64)
+    annual_factor = np.sqrt(365) if interval == "1d" else np.sqrt(365 * 24)
+    window_size = 30 if interval == "1d" else (30 * 24)
+
+    sma_50, _ = rolling_mean_std(values, 50)
+    sma_200, std_200 = rolling_mean_std(values, 200)
+
+    log_ret = np.full_like(values, np.nan)
+    log_ret[1:] = np.log(values[1:] / values[:-1])
+    _, vol_std = rolling_mean_std(log_ret, window_size)
+    volatility = vol_std * annual_factor
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_score = (values - sma_200) / np.where(std_200 == 0, np.nan, std_200)
+
+    wrap = lambda a: pd.DataFrame(a, index=close.index, columns=close.columns)
+    return {
+        'sma_50': wrap(sma_50),
+        'sma_200': wrap(sma_200),
+        'volatility': wrap(volatility),
+        'implied_vol': wrap(volatility * 1.1 + (volatility ** 2) * 2),
+        'z_score': wrap(z_score),
+    }
+
+def asset_frame(panel, indicators, asset):
+    """Frame de un activo con el mismo esquema que fetch_market_data."""
+    cols = {field: panel[field][asset] for field in PANEL_FIELDS if asset in panel[field]}
+    cols.update({name: ind[asset] for name, ind in indicators.items()})
+    df = pd.DataFrame(cols)
+    return compact_frame(df[df['close'].notna()])
+
+def fetch_multi_asset_data(assets=None, period="2y", interval="1d"):
+    """
+    Panel + indicadores + frames por activo en una sola llamada (para el scheduler).
+    """
+    assets = assets or configured_assets()
+    panel = fetch_price_panel(assets, period=period, interval=interval)
+    if not panel: return {}
+    indicators = compute_panel_indicators(panel['close'], interval)
+    codes = list(panel['close'].columns)
+    return {
+        'assets': codes,
+        'names': {c: assets[c]['name'] for c in codes},
+        'panel': panel,
+        'indicators': indicators,
+        'frames': {c: asset_frame(panel, indicators, c) for c in codes},
+    }
+
+def latest_snapshot(multi, live_prices=None):
+    """
+    Última fila de todos los activos como un solo DataFrame (activo x métrica),
+    con el precio vivo si está disponible.
+    """
+    close = multi['panel']['close'].ffill()
+    last = close.iloc[-1]
+    prev = close.iloc[-2]
+    if live_prices:
+        last = last.copy()
+        for code, price in live_prices.items():
+            if code in last.index and price: last[code] = price
+    ind = {name: df.ffill().iloc[-1] for name, df in multi['indicators'].items()}
+    return pd.DataFrame({
+        'price': last,
+        'change': (last - prev) / prev,
+        'trend_up': last > ind['sma_50'],
+        'volatility': ind['volatility'],
+        'z_score': ind['z_score'],
+    })
+
 # ==============================================================================
 # --- 2. LIBRO DE ÓRDENES (Binance/Kraken/Simulado) ---
 # ==============================================================================
 def fetch_order_book_ccxt(symbol='BTC/USD', limit=100):
     try:
         # Intentamos Bitstamp primero
-        url = "https://www.bitstamp.net/api/v2/order_book/btcusd/"
-        response = requests.get(url, timeout=5)
-        data = response.json()
+        pair = symbol.replace('/', '').lower()
+        url = f"https://www.bitstamp.net/api/v2/order_book/{pair}/"
+        data = upstream.get_json(url, timeout=5)
         
         if 'bids' in data:
             bids = pd.DataFrame(data['bids'], columns=['price', 'amount']).astype(float)
@@ -71,13 +269,13 @@ def fetch_order_book_ccxt(symbol='BTC/USD', limit=100):
             return df
     except:
         pass
-    return generate_mock_order_book()
+    return generate_mock_order_book(symbol.replace('/', '-'))
 
-def generate_mock_order_book():
+def generate_mock_order_book(ticker="BTC-USD"):
+    default_price = 96000 if ticker == "BTC-USD" else 100
     try:
-        ticker = yf.Ticker("BTC-USD")
-        base_price = ticker.fast_info['last_price'] or 96000
-    except: base_price = 96000 
+        base_price = upstream.yf_last_price(ticker) or default_price
+    except: base_price = default_price
     
     bids = pd.DataFrame({'price': [base_price*(1-i/1000) for i in range(1,150)], 'amount': np.random.uniform(0.1, 5, 149), 'side': 'bid'})
     asks = pd.DataFrame({'price': [base_price*(1+i/1000) for i in range(1,150)], 'amount': np.random.uniform(0.1, 5, 149), 'side': 'ask'})
@@ -88,74 +286,150 @@ def generate_mock_order_book():
 # ==============================================================================
 # --- 3. MACRO DATA (CORREGIDO) ---
 # ==============================================================================
-@st.cache_data(ttl=3600)
-def fetch_macro_data(period="3mo"):
+MACRO_TICKERS = {
+    'BTC-USD': 'Bitcoin',
+    'SPY': 'S&P 500',
+    'GC=F': 'Gold',
+    'DX-Y.NYB': 'DXY (Dollar)'
+}
+
+def fetch_macro_prices(period="6mo"):
     """
-    Descarga datos normalizados de BTC vs Macro (SPY, Gold, DXY).
+    Cierres crudos de BTC y Macro (SPY, Gold, DXY), cada uno con su propio
+    calendario (NaN donde una serie no cotiza).
     """
-    tickers = {
-        'BTC-USD': 'Bitcoin',
-        'SPY': 'S&P 500',
-        'GC=F': 'Gold',
-        'DX-Y.NYB': 'DXY (Dollar)'
-    }
-    
-    df_combined = pd.DataFrame()
+    series = {}
     
-    for symbol, name in tickers.items():
+    for symbol, name in MACRO_TICKERS.items():
         try:
             # Descargamos solo cierre
-            data = yf.Ticker(symbol).history(period=period)['Close']
+            data = upstream.yf_history(symbol, period=period)['Close']
             if not data.empty:
-                # Normalizamos a porcentaje (Base 0%)
-                # (Precio / Precio_Inicial) - 1
-                normalized = (data / data.iloc[0]) - 1
-                
-                # Ajuste de timezone
-                if normalized.index.tz is not None:
-                    normalized.index = normalized.index.tz_localize(None)
-                    
-                df_combined[name] = normalized
+                # Ajuste de timezone (y a fecha: SPY cierra en NY, BTC en UTC)
+                if data.index.tz is not None:
+                    data.index = data.index.tz_localize(None)
+                data.index = data.index.normalize()
+                series[name] = data[~data.index.duplicated(keep='last')]
         except:
             continue
             
-    return df_combined
+    return pd.concat(series, axis=1) if series else pd.DataFrame()
+
+def normalize_returns(prices):
+    """
+    Normalizamos a porcentaje (Base 0%): (Precio / Precio_Inicial) - 1
+    usando el primer cierre válido de cada serie.
+    """
+    first = prices.bfill().iloc[0]
+    return prices / first - 1
+
+def fetch_macro_data(period="3mo"):
+    """
+    Descarga datos normalizados de BTC vs Macro (SPY, Gold, DXY).
+    La cadencia de refresco la gestiona el scheduler central (main.py).
+    """
+    prices = fetch_macro_prices(period)
+    if prices.empty: return prices
+    return normalize_returns(prices)
 
 # ==============================================================================
 # --- 4. DERIVADOS Y OTROS ---
 # ==============================================================================
-def fetch_derivatives_data():
-    risk_data = {'funding_rate': 0.01, 'open_interest': 22.5, 'oi_change': 1.2, 'pc_ratio': 0.75}
+COINGECKO_DERIVATIVES_URL = "https://api.coingecko.com/api/v3/derivatives"
+DERIBIT_OPTIONS_URL = "https://www.deribit.com/api/v2/public/get_book_summary_by_currency?currency={asset}&kind=option"
+
+def parse_derivatives(rows, asset="BTC"):
+    """
+    Respuesta de CoinGecko /derivatives -> (funding medio ponderado por OI en %,
+    open interest total en USD, nº de mercados) de los perpetuos del activo.
+    Una sola conversión a columnas y operaciones vectorizadas, sin bucles.
+    """
+    df = pd.DataFrame.from_records(rows, columns=['index_id', 'contract_type', 'funding_rate', 'open_interest'])
+    if df.empty: return None
+    mask = (df['index_id'].astype(str).str.upper() == asset.upper()) & (df['contract_type'] == 'perpetual')
+    funding = pd.to_numeric(df['funding_rate'][mask], errors='coerce').to_numpy()
+    oi = pd.to_numeric(df['open_interest'][mask], errors='coerce').to_numpy()
+    valid = ~np.isnan(funding) & ~np.isnan(oi) & (oi > 0)
+    if not valid.any(): return None
+    oi_total = oi[valid].sum()
+    return float((funding[valid] * oi[valid]).sum() / oi_total), float(oi_total), int(valid.sum())
+
+def fetch_option_chain(asset="BTC"):
+    """Resumen de todas las opciones de Deribit (precio, forward, mark_iv, OI). None si falla."""
     try:
-        # Intento CoinGecko para Funding Rate real (si funciona)
-        r = requests.get("https://api.coingecko.com/api/v3/derivatives", timeout=5)
-        data = r.json()
-        total_oi_btc = sum([float(x.get('open_interest_btc',0) or 0) for x in data if 'btc' in x['symbol'].lower()][:15])
-        
-        t = yf.Ticker("BTC-USD")
-        price = t.fast_info['last_price'] or 96000
-        oi_usd = (total_oi_btc * price) / 1e9
-        
-        if oi_usd > 1:
-            risk_data['open_interest'] = round(oi_usd, 2)
-            risk_data['funding_rate'] = 0.0102 # Placeholder si API falla
-    except: pass
-    return risk_data
+        return upstream.get_json(DERIBIT_OPTIONS_URL.format(asset=asset), timeout=5)['result']
+    except Exception as e:
+        print(f"Option Chain Error: {e}")
+        return None
+
+def fetch_put_call_ratio(asset="BTC"):
+    """Put/Call por open interest de todas las opciones de Deribit (una petición)."""
+    try:
+        rows = fetch_option_chain(asset)
+        if not rows: return None
+        names = np.array([r['instrument_name'] for r in rows])
+        oi = np.fromiter((r.get('open_interest') or 0 for r in rows), dtype=np.float64, count=len(rows))
+        puts = oi[np.char.endswith(names, '-P')].sum()
+        calls = oi[np.char.endswith(names, '-C')].sum()
+        return float(puts / calls) if calls > 0 else None
+    except Exception as e:
+        print(f"Put/Call Error: {e}")
+        return None
+
+def fetch_derivatives_data(asset="BTC", price=None):
+    """
+    Foto actual de derivados: funding (%), open interest (USD y en BTC con el
+    precio vivo que ya publica el scheduler) y put/call. None si CoinGecko falla.
+    """
+    try:
+        parsed = parse_derivatives(upstream.get_json(COINGECKO_DERIVATIVES_URL, timeout=10), asset)
+    except Exception as e:
+        print(f"Derivatives Error: {e}")
+        return None
+    if parsed is None: return None
+    funding, oi_usd, markets = parsed
+    return {
+        't': datetime.now().timestamp(),
+        'funding_rate': funding,
+        'open_interest_usd': oi_usd,
+        'open_interest_btc': oi_usd / price if price else None,
+        'markets': markets,
+        'pc_ratio': fetch_put_call_ratio(asset),
+    }
+
+_http_session = None
+
+def http_session():
+    """Sesión HTTP compartida (keep-alive + cabeceras) para todas las descargas de ETFs."""
+    global _http_session
+    if _http_session is None:
+        _http_session = requests.Session()
+        _http_session.headers.update(HEADERS)
+    return _http_session
+
+def fetch_etf_history(ticker, period="5d"):
+    """Barras diarias ['close', 'volume'] de un ETF, con fechas sin zona horaria."""
+    h = upstream.yf_history(ticker, session=http_session(), period=period, interval="1d")
+    if h.empty: return pd.DataFrame(columns=['close', 'volume'])
+    df = h[['Close', 'Volume']].rename(columns={'Close': 'close', 'Volume': 'volume'})
+    if df.index.tz is not None: df.index = df.index.tz_localize(None)
+    df.index = pd.DatetimeIndex(df.index.normalize(), name='Date')
+    return df[~df.index.duplicated(keep='last')]
 
 def fetch_etf_data(ticker="IBIT"):
+    """Un solo ETF (compatibilidad). Para la cesta completa usar etfs.ETFBasketMonitor."""
     try:
-        etf = yf.Ticker(ticker)
-        etf.session = requests.Session(); etf.session.headers.update(HEADERS)
-        h = etf.history(period="5d")
-        if h.empty: return None
-        curr = h.iloc[-1]
-        return {'symbol': ticker, 'price': curr['Close'], 'rvol': curr['Volume']/h['Volume'].mean(), 'change': (curr['Close']-h.iloc[-2]['Close'])/h.iloc[-2]['Close']}
+        import etfs
+        table = etfs.basket_table({ticker: fetch_etf_history(ticker, period=etfs.HISTORY_PERIOD)})
+        if table.empty: return None
+        row = table.iloc[0]
+        # basket_table da el cambio en %; este contrato siempre fue en fracción
+        return {'symbol': ticker, 'price': row['price'], 'rvol': row['rvol'], 'change': row['change'] / 100}
     except: return None
 
 def fetch_fear_and_greed_index():
     try:
-        r = requests.get("https://api.alternative.me/fng/?limit=1", headers=HEADERS, timeout=5)
-        d = r.json()['data'][0]
+        d = upstream.get_json("https://api.alternative.me/fng/?limit=1", headers=HEADERS, timeout=5)['data'][0]
         return int(d['value']), d['value_classification']
     except: return 50, "Neutral"
 
@@ -175,8 +449,7 @@ def fetch_live_price():
         url = "https://api.kraken.com/0/public/Ticker?pair=XBTUSD"
         
         # Timeout de 1 segundo. Si tarda más, abortamos y usamos el precio cacheado.
-        response = requests.get(url, headers=headers, timeout=1)
-        data = response.json()
+        data = upstream.get_json(url, headers=headers, timeout=1)
         
         # Si Kraken devuelve error, salimos
         if data.get('error'): return None
@@ -188,17 +461,37 @@ def fetch_live_price():
         return price
     except:
         return None
-        # --- AGREGAR AL FINAL DE data_fetcher.py ---
 
-@st.cache_data(ttl=3600*12) # Cache de 12 horas para no saturar
+def fetch_live_prices(assets=None):
+    """
+    Precios REAL-TIME de todos los activos en UNA sola petición a Kraken.
+    Devuelve {código: precio}; los pares que falten simplemente no aparecen.
+    """
+    assets = assets or configured_assets()
+    try:
+        pairs = ",".join(spec['kraken'] for spec in assets.values())
+        url = f"https://api.kraken.com/0/public/Ticker?pair={pairs}"
+        data = upstream.get_json(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=2)
+        if data.get('error') or 'result' not in data: return None
+
+        result = data['result']
+        prices = {}
+        for code, spec in assets.items():
+            row = result.get(spec['kraken_key']) or result.get(spec['kraken'])
+            if row: prices[code] = float(row['c'][0])
+        return prices or None
+    except:
+        return None
+
 def fetch_full_history():
     """
     Descarga TODO el historial de precios de Bitcoin (Max history).
     Necesario para modelos Macro (Power Law, Seasonality, Rainbow).
+    Se refresca cada 12 horas desde el scheduler central (main.py).
     """
     try:
         # Descargamos el máximo histórico disponible
-        df = yf.Ticker("BTC-USD").history(period="max", interval="1d")
+        df = upstream.yf_history("BTC-USD", period="max", interval="1d")
         
         if df.empty: return pd.DataFrame()
 
@@ -215,3 +508,26 @@ def fetch_full_history():
         return pd.DataFrame()
         
  
+
+# ==============================================================================
+# --- 5. MINERÍA (HASH RATE) ---
+# ==============================================================================
+HASH_RATE_URL = "https://api.blockchain.info/charts/hash-rate"
+
+def fetch_hash_rate(timespan="all"):
+    """
+    Hash rate diario (TH/s) de blockchain.com -> DataFrame ['hash_rate'] por fecha.
+    timespan: 'all' para la carga inicial, '90days' para las actualizaciones.
+    """
+    try:
+        url = f"{HASH_RATE_URL}?timespan={timespan}&format=json&sampled=false"
+        values = upstream.get_json(url, headers=HEADERS, timeout=15)['values']
+        # Parseo vectorizado: dos arrays en vez de un DataFrame de dicts
+        x = np.fromiter((v['x'] for v in values), dtype=np.int64, count=len(values))
+        y = np.fromiter((v['y'] for v in values), dtype=np.float64, count=len(values))
+        idx = pd.DatetimeIndex(pd.to_datetime(x, unit='s').normalize(), name='Date')
+        df = pd.DataFrame({'hash_rate': y}, index=idx)
+        return df[~df.index.duplicated(keep='last')].sort_index()
+    except Exception as e:
+        print(f"Hash Rate Error: {e}")
+        return pd.DataFrame()
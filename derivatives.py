@@ -0,0 +1,143 @@
+import os
+import json
+import math
+import bisect
+import threading
+from collections import deque
+
+import pandas as pd
+import data_fetcher, warmstart
+
+# ==============================================================================
+# --- HISTÓRICO DE FUNDING Y OPEN INTEREST (Incremental) ---
+# ==============================================================================
+# Cada foto de data_fetcher.fetch_derivatives_data() se añade a un log JSON Lines
+# (append, sin reescribir) y a unas sumas móviles, así el z-score del funding y
+# el cambio de OI salen en O(1) por muestra en lugar de recalcular el histórico.
+FIELDS = ('funding_rate', 'open_interest_usd', 'open_interest_btc', 'pc_ratio')
+OI_LOOKBACK = 24 * 3600     # oi_change: frente a la muestra de hace 24h
+Z_WINDOW = 1008             # Muestras del z-score del funding (una semana a un refresco cada 10 min)
+
+def default_store_path():
+    return os.getenv("VOLCANO_DERIVATIVES_STORE",
+                     os.path.join(os.getenv("VOLCANO_SNAPSHOT_DIR", warmstart.DEFAULT_DIR), "derivatives.jsonl"))
+
+class DerivativesStore:
+    """
+    - path: log JSON Lines en disco (None = solo memoria).
+    - z_window: muestras de la ventana del z-score del funding.
+    - max_rows: muestras que se conservan en memoria.
+    """
+    def __init__(self, path=None, z_window=Z_WINDOW, max_rows=20_000):
+        self.path = path
+        self.z_window = z_window
+        self.max_rows = max_rows
+        self.times = []
+        self.rows = []
+        self._funding = deque()
+        self._s1 = 0.0
+        self._s2 = 0.0
+        self._file_rows = 0
+        self._lock = threading.Lock()
+        if path: self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    self._push(json.loads(line))
+                    self._file_rows += 1
+        except FileNotFoundError: pass
+        except Exception as e: print(f"Derivatives Store Load Error: {e}")
+
+    def _push(self, snap):
+        self.times.append(snap['t'])
+        self.rows.append(snap)
+        funding = snap.get('funding_rate')
+        if funding is not None:
+            self._funding.append(funding)
+            self._s1 += funding
+            self._s2 += funding * funding
+            if len(self._funding) > self.z_window:
+                old = self._funding.popleft()
+                self._s1 -= old
+                self._s2 -= old * old
+        # Recorte amortizado: solo cuando sobra un 10%
+        if len(self.times) > self.max_rows * 1.1:
+            cut = len(self.times) - self.max_rows
+            del self.times[:cut], self.rows[:cut]
+
+    def append(self, snap):
+        """Añade una foto (ignora duplicados o muestras más antiguas que la última)."""
+        if snap is None: return False
+        with self._lock:
+            if self.times and snap['t'] <= self.times[-1]: return False
+            self._push(snap)
+            if self.path: self._write(snap)
+            return True
+
+    def _write(self, snap):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self._file_rows >= 2 * self.max_rows:
+            # Compactación: el log se reescribe con las muestras que siguen en memoria
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(_line(r) for r in self.rows)
+            os.replace(tmp, self.path)
+            self._file_rows = len(self.rows)
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(_line(snap))
+        self._file_rows += 1
+
+    # --- Lectura ---
+    def funding_zscore(self):
+        n = len(self._funding)
+        if n < 2: return None
+        var = (self._s2 - self._s1 * self._s1 / n) / (n - 1)
+        if var <= 0: return 0.0
+        return (self._funding[-1] - self._s1 / n) / math.sqrt(var)
+
+    def oi_change(self, lookback=OI_LOOKBACK):
+        """Cambio % del OI (en BTC si hay precio; si no, en USD) frente a hace `lookback` s."""
+        if len(self.times) < 2: return None
+        i = bisect.bisect_right(self.times, self.times[-1] - lookback) - 1
+        if i < 0: return None      # Aún no hay 24h de histórico
+        last, ref = self.rows[-1], self.rows[i]
+        key = 'open_interest_btc' if last.get('open_interest_btc') and ref.get('open_interest_btc') else 'open_interest_usd'
+        if not ref.get(key): return None
+        return (last[key] / ref[key] - 1) * 100
+
+    def summary(self):
+        """Mismo contrato que el antiguo fetch_derivatives_data + z-score e histórico."""
+        with self._lock:
+            if not self.rows: return None
+            last = self.rows[-1]
+            return {
+                'funding_rate': last['funding_rate'],
+                'funding_z': self.funding_zscore(),
+                'open_interest': last['open_interest_usd'] / 1e9,   # Miles de millones USD
+                'oi_change': self.oi_change(),
+                'pc_ratio': last.get('pc_ratio'),
+                'updated_at': last['t'],
+            }
+
+    def history(self):
+        """DataFrame (fecha x campo) para gráficos."""
+        with self._lock:
+            idx = pd.to_datetime(self.times, unit='s')
+            return pd.DataFrame([{k: r.get(k) for k in FIELDS} for r in self.rows], index=pd.DatetimeIndex(idx, name='Date'))
+
+def _line(snap):
+    return json.dumps({k: snap.get(k) for k in ('t',) + FIELDS}) + "\n"
+
+def make_derivatives_refresher(store=None, asset="BTC"):
+    """Función para el scheduler: una foto nueva por refresco, con el precio vivo ya cacheado."""
+    store = store or DerivativesStore(default_store_path())
+
+    def refresh_derivatives(price=None):
+        snap = data_fetcher.fetch_derivatives_data(asset, price=price)
+        if snap is None: raise RuntimeError("No derivatives data")   # El scheduler conserva el último resumen
+        store.append(snap)
+        return store.summary()
+    return refresh_derivatives
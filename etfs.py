@@ -0,0 +1,122 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import data_fetcher
+
+# ==============================================================================
+# --- MONITOR DE FLUJOS ETF (Cesta concurrente) ---
+# ==============================================================================
+# Cada ETF se descarga una vez con HISTORY_PERIOD y después solo se sondea su
+# última barra (period="1d"). Si no cambia, no se toca; si es la misma sesión
+# se sustituye la fila y si es una sesión nueva se fusionan los últimos 5 días.
+# RVOL y cambio diario salen de una sola operación sobre la matriz fecha x ETF.
+#   VOLCANO_ETF_BASKET=IBIT,FBTC,...   -> cesta a vigilar
+DEFAULT_BASKET = ("IBIT", "FBTC", "ARKB", "GBTC", "BITB", "HODL")
+RVOL_WINDOW = 20            # Sesiones de la media de volumen
+HISTORY_PERIOD = "2mo"      # Primera descarga: cubre la ventana del RVOL con margen
+TABLE_COLUMNS = ['price', 'change', 'rvol', 'dollar_volume', 'share', 'date']
+
+def configured_basket():
+    raw = os.getenv("VOLCANO_ETF_BASKET", "")
+    tickers = [t.strip().upper() for t in raw.split(",") if t.strip()]
+    return tuple(dict.fromkeys(tickers)) or DEFAULT_BASKET
+
+def basket_table(frames, window=RVOL_WINDOW):
+    """
+    frames: {ticker: DataFrame ['close', 'volume']}. Devuelve un DataFrame por ticker
+    con precio, cambio diario (%), RVOL, volumen en USD y cuota del volumen de la cesta.
+    """
+    frames = {t: f for t, f in frames.items() if f is not None and len(f)}
+    if not frames: return pd.DataFrame(columns=TABLE_COLUMNS)
+    tickers = list(frames)
+    closes = pd.concat([frames[t]['close'] for t in tickers], axis=1, keys=tickers).sort_index()
+    volumes = pd.concat([frames[t]['volume'] for t in tickers], axis=1, keys=tickers).reindex(closes.index)
+
+    c = closes.to_numpy(dtype=np.float64)
+    v = volumes.to_numpy(dtype=np.float64)
+    # Última barra válida de cada columna (un ETF puede ir una sesión por detrás)
+    valid = ~np.isnan(c)
+    last = len(c) - 1 - np.argmax(valid[::-1], axis=0)
+    cols = np.arange(len(tickers))
+    prev = np.clip(last - 1, 0, None)
+
+    price = c[last, cols]
+    vol = v[last, cols]
+    # Media de volumen de las `window` sesiones anteriores a la última (sumas acumuladas)
+    vv = np.where(np.isnan(v), 0.0, v)
+    cs = np.vstack([np.zeros(len(tickers)), np.cumsum(vv, axis=0)])
+    cn = np.vstack([np.zeros(len(tickers)), np.cumsum(~np.isnan(v), axis=0)])
+    lo = np.clip(last - window, 0, None)
+    n = cn[last, cols] - cn[lo, cols]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg = (cs[last, cols] - cs[lo, cols]) / n
+        rvol = vol / avg
+        change = np.where(last > 0, (price / c[prev, cols] - 1) * 100, np.nan)
+        dollar = price * vol
+        share = dollar / np.nansum(dollar) * 100
+
+    return pd.DataFrame({
+        'price': price, 'change': change, 'rvol': rvol,
+        'dollar_volume': dollar, 'share': share, 'date': closes.index[last],
+    }, index=pd.Index(tickers, name='ticker'))
+
+class ETFBasketMonitor:
+    """
+    Cache de barras por ETF compartida entre refrescos.
+    - tickers: cesta (por defecto configured_basket()).
+    - max_workers: descargas simultáneas.
+    """
+    def __init__(self, tickers=None, max_workers=6, window=RVOL_WINDOW):
+        self.tickers = tuple(tickers or configured_basket())
+        self.window = window
+        self.frames = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="etf")
+        self._lock = threading.Lock()
+        self._table = pd.DataFrame(columns=TABLE_COLUMNS)
+
+    def _sync(self, ticker):
+        """Actualiza la cache de un ticker. Devuelve True si cambió algo."""
+        cached = self.frames.get(ticker)
+        if cached is None or cached.empty:
+            fresh = data_fetcher.fetch_etf_history(ticker, period=HISTORY_PERIOD)
+        else:
+            probe = data_fetcher.fetch_etf_history(ticker, period="1d")
+            if probe.empty: return False
+            day, bar = probe.index[-1], probe.iloc[-1]
+            last_day = cached.index[-1]
+            if day < last_day: return False
+            if day == last_day:
+                if np.allclose(bar.to_numpy(dtype=np.float64), cached.iloc[-1].to_numpy(dtype=np.float64), equal_nan=True):
+                    return False
+                fresh = probe
+            else:
+                # Sesión nueva: 5 días cubren huecos (fines de semana, festivos, caídas)
+                fresh = data_fetcher.fetch_etf_history(ticker, period="5d")
+        if fresh.empty: return False
+        merged = fresh if cached is None else fresh.combine_first(cached)
+        self.frames[ticker] = merged.iloc[-(self.window + 5):]
+        return True
+
+    def refresh(self):
+        """Sondea la cesta en paralelo y recalcula la tabla solo si alguna barra cambió."""
+        with self._lock:
+            changed = False
+            for ticker, future in [(t, self._pool.submit(self._sync, t)) for t in self.tickers]:
+                try: changed |= future.result()
+                except Exception as e: print(f"ETF Error ({ticker}): {e}")
+            if changed or self._table.empty:
+                self._table = basket_table(self.frames, self.window)
+            return self._table
+
+def make_etf_refresher(monitor=None):
+    """Función para el scheduler: tabla de la cesta o error si no hay ningún ETF."""
+    monitor = monitor or ETFBasketMonitor()
+
+    def refresh_etfs():
+        table = monitor.refresh()
+        if table.empty: raise RuntimeError("No ETF data")   # El scheduler conserva la última tabla
+        return table
+    return refresh_etfs
@@ -0,0 +1,160 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import data_fetcher, warmstart
+
+# ==============================================================================
+# --- 1. HASH RIBBONS (Vectorizado) ---
+# ==============================================================================
+# Medias de 30 y 60 días del hash rate. Cuando la rápida cae bajo la lenta los
+# mineros capitulan (apagan máquinas); el cruce de vuelta marca la recuperación.
+FAST = 30
+SLOW = 60
+SIGNAL_COLUMNS = ['hash_rate', 'ma_fast', 'ma_slow', 'ribbon', 'capitulating', 'capitulation', 'recovery']
+
+def _crossings(capitulating, ma_slow, prev_capitulating=False):
+    """Días en que empieza la capitulación y días en que termina (cruce de vuelta)."""
+    prev = np.concatenate(([prev_capitulating], capitulating[:-1]))
+    return capitulating & ~prev, ~capitulating & prev & ~np.isnan(ma_slow)
+
+def ribbon_signals(hash_rate, prev_capitulating=False, fast=FAST, slow=SLOW):
+    """
+    Ribbons y eventos de cruce para una serie diaria de hash rate.
+    - prev_capitulating: estado del día anterior al primero de la serie.
+    Devuelve un DataFrame con SIGNAL_COLUMNS (NaN hasta completar cada ventana).
+    """
+    values = hash_rate.to_numpy(dtype=np.float64)[:, None]
+    ma_fast = data_fetcher.rolling_mean_std(values, fast)[0][:, 0]
+    ma_slow = data_fetcher.rolling_mean_std(values, slow)[0][:, 0]
+
+    with np.errstate(invalid='ignore'):
+        capitulating = ma_fast < ma_slow          # NaN -> False
+        ribbon = ma_fast / ma_slow - 1
+    capitulation, recovery = _crossings(capitulating, ma_slow, prev_capitulating)
+    return pd.DataFrame({
+        'hash_rate': values[:, 0],
+        'ma_fast': ma_fast,
+        'ma_slow': ma_slow,
+        'ribbon': ribbon,
+        'capitulating': capitulating,
+        'capitulation': capitulation,
+        'recovery': recovery,
+    }, index=hash_rate.index)
+
+def with_valuation(signals, price):
+    """Añade precio diario y Price/Hash (USD por EH/s) alineados con el hash rate."""
+    out = signals.copy()
+    if price is None or price.empty:
+        out['price'] = np.nan
+    else:
+        daily = price.copy()
+        if getattr(daily.index, "tz", None) is not None: daily.index = daily.index.tz_localize(None)
+        daily.index = pd.DatetimeIndex(daily.index).normalize()
+        out['price'] = daily[~daily.index.duplicated(keep='last')].reindex(out.index).to_numpy()
+    out['valuation'] = out['price'] / (out['hash_rate'] / 1_000_000)
+    return out
+
+def latest_status(signals):
+    """Resumen para las tarjetas de la vista de minería."""
+    if signals is None or signals.empty: return None
+    last = signals.iloc[-1]
+    events = signals.index[signals['capitulation'] | signals['recovery']]
+    last_event = events[-1] if len(events) else None
+    return {
+        'hash_eh': last['hash_rate'] / 1_000_000,
+        'ribbon': last['ribbon'],
+        'regime': "CAPITULATION" if last['capitulating'] else "HEALTHY",
+        'last_event': None if last_event is None else ("Capitulation" if signals.at[last_event, 'capitulation'] else "Recovery"),
+        'last_event_date': last_event,
+        'days_since_event': None if last_event is None else (signals.index[-1] - last_event).days,
+        'valuation': last.get('valuation', np.nan),
+    }
+
+# ==============================================================================
+# --- 2. ALMACÉN INCREMENTAL PERSISTENTE ---
+# ==============================================================================
+def default_store_path():
+    return os.getenv("VOLCANO_HASH_STORE",
+                     os.path.join(os.getenv("VOLCANO_SNAPSHOT_DIR", warmstart.DEFAULT_DIR), "hash_rate_store.pkl"))
+
+class HashRibbonEngine:
+    """
+    Guarda en disco la serie diaria y sus señales. Cada actualización solo
+    recalcula desde el primer día nuevo o corregido (con SLOW-1 días de contexto),
+    en vez de rehacer años de medias móviles.
+    - path: fichero pickle del almacén (None = solo en memoria).
+    """
+    def __init__(self, path=None, fast=FAST, slow=SLOW):
+        self.path = path
+        self.fast = fast
+        self.slow = slow
+        self.frame = pd.DataFrame(columns=SIGNAL_COLUMNS)
+        self._lock = threading.Lock()
+        if path: self._load()
+
+    @property
+    def empty(self):
+        return self.frame.empty
+
+    def _load(self):
+        try: self.frame = pd.read_pickle(self.path)
+        except FileNotFoundError: pass
+        except Exception as e: print(f"Hash Store Load Error: {e}")
+
+    def _save(self):
+        if not self.path: return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        self.frame.to_pickle(tmp)
+        os.replace(tmp, self.path)
+
+    def update(self, new):
+        """Fusiona un DataFrame ['hash_rate'] (fechas nuevas o revisadas). Devuelve las filas recalculadas."""
+        if new is None or new.empty: return self.frame.iloc[0:0]
+        with self._lock:
+            incoming = new['hash_rate'].dropna()
+            if self.frame.empty:
+                self.frame = ribbon_signals(incoming, fast=self.fast, slow=self.slow)
+                self._save()
+                return self.frame
+
+            # Días nuevos o revisados (get_indexer = -1 si la fecha no está guardada)
+            stored = self.frame['hash_rate']
+            pos = stored.index.get_indexer(incoming.index)
+            known = pos >= 0
+            same = np.zeros(len(incoming), dtype=bool)
+            same[known] = np.isclose(incoming.to_numpy()[known], stored.to_numpy()[pos[known]])
+            if same.all(): return self.frame.iloc[0:0]
+            start = incoming.index[~same][0]
+
+            # Solo se fusiona y recalcula la cola: SLOW-1 días de contexto + lo nuevo
+            cut = stored.index.searchsorted(start)
+            tail = stored.iloc[max(0, cut - self.slow + 1):]
+            merged = incoming[incoming.index >= start].combine_first(tail)
+            fresh = ribbon_signals(merged, fast=self.fast, slow=self.slow)
+            fresh = fresh[fresh.index >= start]
+
+            # El cruce del primer día nuevo se compara con el estado guardado del día anterior
+            before = self.frame.iloc[:cut]
+            prev_cap = bool(before['capitulating'].iloc[-1]) if len(before) else False
+            fresh['capitulation'], fresh['recovery'] = _crossings(
+                fresh['capitulating'].to_numpy(), fresh['ma_slow'].to_numpy(), prev_cap)
+            self.frame = pd.concat([before, fresh])
+            self._save()
+            return fresh
+
+def make_hash_refresher(engine=None):
+    """Función para el scheduler: descarga incremental + valoración con el precio dado."""
+    engine = engine or HashRibbonEngine(default_store_path())
+
+    def refresh_hash(price_df=None):
+        new = data_fetcher.fetch_hash_rate("all" if engine.empty else "90days")
+        engine.update(new)
+        if engine.empty: return None
+        # Sin precio la valoración saldría toda NaN y se publicaría durante 6 h:
+        # se falla para reintentar con el backoff corto (el almacén ya quedó al día)
+        if price_df is None or price_df.empty: raise RuntimeError("Full history not loaded yet")
+        return with_valuation(engine.frame, price_df['close'])
+    return refresh_hash
@@ -0,0 +1,86 @@
+import os
+import time
+
+# ==============================================================================
+# --- HEARTBEAT ADAPTATIVO (Rerun completo solo cuando hay algo nuevo) ---
+# ==============================================================================
+# Antes cada pantalla hacía un rerun completo cada 5 segundos aunque no cambiara
+# nada. Ahora hay dos relojes:
+#   - Programado: el rerun completo se agenda para el próximo evento de hora
+#     conocida (cambio de vista o de titulares, caducidad de una alerta o de la
+#     interrupción). Entre eventos la sesión duerme.
+#   - Vigía: comprobación barata (sin pintar nada) de lo que no tiene hora: el
+#     precio se mueve más que el umbral, o una fuente visible publica un valor
+#     distinto (changed_at del scheduler; una ejecución que devuelve lo mismo no
+#     cuesta un rerun). Solo entonces pide el rerun completo.
+#   VOLCANO_PRICE_THRESHOLD=0.001   -> movimiento relativo mínimo para repintar (0.1%)
+#   VOLCANO_WATCH_INTERVAL=5        -> segundos entre comprobaciones del vigía
+#   VOLCANO_MAX_SLEEP=120           -> tope de espera entre reruns completos
+PRICE_THRESHOLD = 0.001
+WATCH_INTERVAL = 5
+MAX_SLEEP = 120
+MIN_SLEEP = 0.25
+# Cabecera, ticker e interrupciones: se ven en todas las vistas
+ALWAYS_WATCHED = ("news", "fng", "alerts", "breaking")
+# Publica un valor nuevo en cada tick: se compara con el umbral, no por cambio
+PRICE_SOURCE = "live_prices"
+
+class Heartbeat:
+    """
+    - clock: rotation.PlaylistClock (vistas y titulares).
+    - refresh: scheduler.RefreshScheduler (changed_at de cada fuente).
+    """
+    def __init__(self, clock, refresh, price_threshold=PRICE_THRESHOLD, watch_every=WATCH_INTERVAL, max_sleep=MAX_SLEEP):
+        self.clock, self.refresh = clock, refresh
+        self.price_threshold = price_threshold
+        self.watch_every = watch_every
+        self.max_sleep = max_sleep
+
+    def watched(self, sources):
+        names = dict.fromkeys((*sources, *ALWAYS_WATCHED))
+        return tuple(n for n in names if n in self.refresh.jobs and n != PRICE_SOURCE)
+
+    def next_wake(self, deadlines=(), now=None):
+        """
+        (segundos, motivo) hasta el próximo evento de hora conocida.
+        deadlines: [(instante unix, motivo)] extra, p. ej. la caducidad de una alerta.
+        """
+        now = time.time() if now is None else now
+        events = [(self.clock.next_change(now), "rotation"), (self.max_sleep, "idle")]
+        events += [(t - now, reason) for t, reason in deadlines if t and t > now]
+        seconds, reason = min(events)
+        return max(seconds, MIN_SLEEP), reason
+
+    def stamp(self, sources, prices):
+        """Lo que muestra este rerun: cuándo cambió cada fuente visible y los precios vivos."""
+        return {
+            'changed': {n: self.refresh.jobs[n].changed_at for n in self.watched(sources)},
+            'prices': dict(prices),
+        }
+
+    def due(self, stamp, prices):
+        """Motivo del rerun si lo que hay publicado ya no coincide con lo pintado; si no, None."""
+        for name, changed_at in stamp['changed'].items():
+            if self.refresh.jobs[name].changed_at != changed_at: return name
+        shown = stamp['prices']
+        if shown.keys() != prices.keys(): return "price"
+        for code, price in prices.items():
+            before = shown[code]
+            if before and price and abs(price / before - 1) >= self.price_threshold: return "price"
+        return None
+
+def from_env(clock, refresh):
+    """Heartbeat configurado por entorno (valores inválidos -> por defecto)."""
+    def read(name, default):
+        raw = os.getenv(name)
+        try:
+            value = float(raw) if raw else default
+            if value <= 0: raise ValueError
+            return value
+        except ValueError:
+            print(f"Heartbeat Config Error: {name}={raw!r} must be a positive number")
+            return default
+    return Heartbeat(clock, refresh,
+                     price_threshold=read("VOLCANO_PRICE_THRESHOLD", PRICE_THRESHOLD),
+                     watch_every=read("VOLCANO_WATCH_INTERVAL", WATCH_INTERVAL),
+                     max_sleep=read("VOLCANO_MAX_SLEEP", MAX_SLEEP))
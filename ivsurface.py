@@ -0,0 +1,176 @@
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+import data_fetcher
+
+# ==============================================================================
+# --- 1. BLACK-76 E INVERSIÓN VECTORIZADA ---
+# ==============================================================================
+# Deribit cotiza sobre el futuro de cada vencimiento (underlying_price) y sin
+# descuento, así que se trabaja en unidades del forward: f = 1, k = K/F y la
+# prima en BTC (mark_price). Todas las opciones se invierten a la vez.
+SIGMA_MIN, SIGMA_MAX = 1e-3, 5.0       # Horquilla de búsqueda (0.1% - 500% anual)
+EXPIRY_HOUR = 8                         # Deribit vence a las 08:00 UTC
+YEAR = 365 * 24 * 3600
+
+def black76(k, t, sigma, is_call):
+    """Prima en unidades del forward (f = 1) y vega. Arrays del mismo tamaño."""
+    sqrt_t = np.sqrt(t)
+    sig_t = sigma * sqrt_t
+    d1 = (-np.log(k) + 0.5 * sig_t * sig_t) / sig_t
+    call = ndtr(d1) - k * ndtr(d1 - sig_t)
+    price = np.where(is_call, call, call - (1 - k))
+    vega = np.exp(-0.5 * d1 * d1) / np.sqrt(2 * np.pi) * sqrt_t
+    return price, vega
+
+def implied_vol(price, k, t, is_call, tol=1e-9, max_iter=60):
+    """
+    IV de cada opción con Newton protegido por bisección: cada paso de Newton que
+    sale de la horquilla [lo, hi] (o con vega ~0) se sustituye por el punto medio.
+    Las que convergen (error relativo de prima < tol o horquilla < tol) salen del
+    lote, así cada iteración solo trabaja con las pendientes.
+    Primas fuera de los límites de no arbitraje -> NaN.
+    """
+    price, k, t = (np.asarray(a, dtype=np.float64) for a in (price, k, t))
+    is_call = np.asarray(is_call, dtype=bool)
+    intrinsic = np.where(is_call, np.maximum(1 - k, 0), np.maximum(k - 1, 0))
+    upper = np.where(is_call, 1.0, k)
+    ok = (t > 0) & (k > 0) & (price > intrinsic) & (price < upper)
+
+    out = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(ok)
+    if not len(idx): return out
+    p, kk, tt, cc = price[idx], k[idx], t[idx], is_call[idx]
+    # Arranque de Brenner-Subrahmanyam (ATM) acotado a la horquilla
+    sigma = np.clip(np.sqrt(2 * np.pi / tt) * (p - intrinsic[idx] * 0.5), 0.05, 3.0)
+    lo = np.full(len(idx), SIGMA_MIN)
+    hi = np.full(len(idx), SIGMA_MAX)
+
+    for _ in range(max_iter):
+        model, vega = black76(kk, tt, sigma, cc)
+        diff = model - p
+        done = (np.abs(diff) < tol * p) | (hi - lo < tol)
+        out[idx[done]] = sigma[done]
+        keep = ~done
+        if not keep.any(): break
+        idx, p, kk, tt, cc, sigma, lo, hi, diff, vega = (a[keep] for a in (idx, p, kk, tt, cc, sigma, lo, hi, diff, vega))
+        # La prima crece con sigma: diff > 0 -> sigma demasiado alta
+        hi = np.where(diff > 0, sigma, hi)
+        lo = np.where(diff > 0, lo, sigma)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = sigma - diff / vega
+        sigma = np.where((newton > lo) & (newton < hi), newton, 0.5 * (lo + hi))
+    else:
+        # Sin converger tras max_iter: se acepta si la horquilla ya es estrecha
+        narrow = hi - lo < 1e-4
+        out[idx[narrow]] = sigma[narrow]
+    return out
+
+# ==============================================================================
+# --- 2. CADENA DE OPCIONES -> SUPERFICIE ---
+# ==============================================================================
+MONEYNESS_GRID = np.round(np.linspace(-0.5, 0.5, 21), 2)     # log(K/F)
+MIN_PRICE = 1e-4                                              # Tick de Deribit (BTC): por debajo la IV es ruido
+TERM_DAYS = (7, 30, 90, 180)
+
+def parse_option_chain(rows, now=None):
+    """
+    Filas de Deribit get_book_summary_by_currency(kind=option) -> DataFrame con
+    expiry, t (años), strike, is_call, k (K/F), price (BTC), forward, mark_iv y oi.
+    """
+    now = time.time() if now is None else now
+    df = pd.DataFrame.from_records(rows, columns=['instrument_name', 'mark_price', 'underlying_price', 'mark_iv', 'open_interest'])
+    if df.empty: return df
+    parts = df['instrument_name'].str.split('-', expand=True)
+    if parts.shape[1] < 4: return df.iloc[0:0]
+    expiry = pd.to_datetime(parts[1], format="%d%b%y", errors='coerce') + pd.Timedelta(hours=EXPIRY_HOUR)
+    strike = pd.to_numeric(parts[2], errors='coerce')
+    forward = pd.to_numeric(df['underlying_price'], errors='coerce')
+    out = pd.DataFrame({
+        'expiry': expiry,
+        't': (expiry - pd.Timestamp(now, unit='s')).dt.total_seconds() / YEAR,
+        'strike': strike,
+        'is_call': (parts[3] == 'C').to_numpy(),
+        'k': strike / forward,
+        'price': pd.to_numeric(df['mark_price'], errors='coerce'),
+        'forward': forward,
+        'mark_iv': pd.to_numeric(df['mark_iv'], errors='coerce') / 100,
+        'oi': pd.to_numeric(df['open_interest'], errors='coerce').fillna(0),
+    })
+    return out[(out['t'] > 0) & out['k'].notna() & out['price'].notna()].reset_index(drop=True)
+
+def build_surface(chain, grid=MONEYNESS_GRID):
+    """
+    Invierte toda la cadena y arma la superficie:
+    - smile: DataFrame (vencimiento x log-moneyness) con la IV de las opciones OTM.
+    - term: IV ATM por vencimiento; atm_30d y skew_30d interpolados en varianza total.
+    """
+    if chain is None or chain.empty: return None
+    # Solo OTM (calls sobre el forward, puts bajo): son las más líquidas y mejor condicionadas
+    chain = chain[(chain['is_call'].to_numpy() == (chain['k'].to_numpy() >= 1)) & (chain['price'].to_numpy() >= MIN_PRICE)]
+    iv = implied_vol(chain['price'], chain['k'], chain['t'], chain['is_call'])
+    valid = ~np.isnan(iv)
+    if not valid.any(): return None
+    chain = chain[valid].assign(iv=iv[valid], m=np.log(chain['k'].to_numpy()[valid]))
+
+    rows, atm, tenors, expiries = [], [], [], []
+    for expiry, g in chain.sort_values(['expiry', 'm']).groupby('expiry', sort=True):
+        if len(g) < 3: continue
+        m, v = g['m'].to_numpy(), g['iv'].to_numpy()
+        smile = np.interp(grid, m, v, left=np.nan, right=np.nan)    # Sin extrapolar fuera de los strikes
+        rows.append(smile)
+        atm.append(float(np.interp(0.0, m, v)))
+        tenors.append(float(g['t'].iloc[0]))
+        expiries.append(expiry)
+    if not rows: return None
+
+    tenors = np.array(tenors)
+    smile = pd.DataFrame(np.vstack(rows), index=pd.DatetimeIndex(expiries, name='expiry'), columns=grid)
+    term = pd.Series(atm, index=smile.index, name='atm_iv')
+    at = lambda days, col=0.0: _interp_tenor(tenors, smile[col].to_numpy() if col else term.to_numpy(), days / 365)
+    mispricing = np.abs(chain['iv'] - chain['mark_iv']).median() if chain['mark_iv'].notna().any() else np.nan
+    return {
+        't': time.time(),
+        'forward': float(chain['forward'].median()),
+        'smile': smile,
+        'term': term,
+        'tenor_days': tenors * 365,
+        'atm_30d': at(30),
+        'term_points': {d: at(d) for d in TERM_DAYS},
+        'skew_30d': at(30, -0.1) - at(30, 0.1),     # Puts -10% vs calls +10% (miedo > 0)
+        'options': int(len(chain)),
+        'mark_iv_error': float(mispricing),          # Mediana |IV propia - mark_iv de Deribit|
+    }
+
+def _interp_tenor(tenors, iv, t):
+    """IV a plazo t interpolando linealmente la varianza total (iv² · t) entre vencimientos."""
+    ok = ~np.isnan(iv)
+    if ok.sum() == 0: return np.nan
+    tenors, iv = tenors[ok], iv[ok]
+    if len(tenors) == 1 or t <= tenors[0]: return float(iv[0])
+    if t >= tenors[-1]: return float(iv[-1])
+    w = np.interp(t, tenors, iv * iv * tenors)
+    return float(np.sqrt(w / t))
+
+# ==============================================================================
+# --- 3. FUENTE PARA EL SCHEDULER ---
+# ==============================================================================
+HISTORY_DAYS = 365
+
+def make_iv_refresher(refresh, asset="BTC"):
+    """Superficie nueva en cada refresco + histórico diario de la IV ATM 30D (se conserva del snapshot)."""
+    def refresh_iv():
+        rows = data_fetcher.fetch_option_chain(asset)
+        if not rows: raise RuntimeError("No option chain")    # El scheduler conserva la última superficie
+        surface = build_surface(parse_option_chain(rows))
+        if surface is None: raise RuntimeError("Empty IV surface")
+
+        previous = refresh.value("iv_surface") or {}
+        history = previous.get('history', pd.Series(dtype=np.float64, name='atm_30d'))
+        day = pd.Timestamp(surface['t'], unit='s').normalize()
+        history = pd.concat([history[history.index != day], pd.Series([surface['atm_30d']], index=[day], name='atm_30d')])
+        surface['history'] = history.iloc[-HISTORY_DAYS:]
+        return surface
+    return refresh_iv
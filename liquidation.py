@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.special import ndtr
+import risk_math
+
+# ==============================================================================
+# --- PROBABILIDAD DE MARGIN CALL Y LIQUIDACIÓN (Primer paso por barrera) ---
+# ==============================================================================
+# ¿Qué probabilidad hay de que el precio TOQUE la barrera (margin call o
+# liquidación) en algún momento antes de cada plazo, de 1 a 365 días?
+#   - Fórmula cerrada (GBM, barrera continua) para todos los plazos a la vez.
+#   - Montecarlo con colas gruesas (t de Student) o saltos (Merton). Los caminos
+#     se simulan una vez por nivel de volatilidad en log-precio normalizado
+#     (S0 = 1) y se guarda el mínimo acumulado ordenado de cada día: con un
+#     precio vivo nuevo solo cambia el nivel ln(B/S), y la probabilidad de cada
+#     plazo sale de una búsqueda binaria. Así se recalcula en cada tick.
+HORIZON_DAYS = 365
+SHOW_HORIZONS = (7, 30, 90, 365)
+MODELS = ("gbm", "student_t", "jump")
+BG_BETA = 0.5826            # Corrección de Broadie-Glasserman (vigilancia diaria -> continua)
+
+def closed_form_hit_prob(spot, barriers, sigma, days=HORIZON_DAYS, mu=0.0):
+    """
+    P(mín S_t <= B, t <= T) para un GBM: matriz (barrera x plazo 1..days).
+    Barreras por encima del precio -> 1 (ya tocada).
+    """
+    barriers = np.atleast_1d(np.asarray(barriers, dtype=np.float64))[:, None]
+    t = np.arange(1, days + 1, dtype=np.float64)[None, :] / 365
+    nu = mu - 0.5 * sigma * sigma
+    b = np.log(barriers / spot)
+    sig_t = sigma * np.sqrt(t)
+    with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+        p = ndtr((b - nu * t) / sig_t) + np.exp(2 * nu * b / (sigma * sigma)) * ndtr((b + nu * t) / sig_t)
+    return np.where(b >= 0, 1.0, np.clip(p, 0.0, 1.0))
+
+class PathEnsemble:
+    """
+    Caminos diarios de log-precio normalizado para un sigma y un modelo.
+    - model: "gbm", "student_t" (colas gruesas, varianza igual a sigma²) o
+      "jump" (Merton: saltos bajistas + difusión, misma varianza total).
+    - n_paths: caminos simulados. Solo se guarda el mínimo acumulado en float32
+      (10k x 365 ≈ 15 MB); los pasos se simulan en bloques de chunk_days días
+      (float64, ~2.4 MB por array con 10k caminos), así el pico de memoria de la
+      construcción queda en ~25 MB en vez de ~150 MB con la matriz completa.
+    """
+    def __init__(self, sigma, model="jump", n_paths=10_000, days=HORIZON_DAYS, seed=7,
+                 dof=4, jump_intensity=6.0, jump_mean=-0.04, jump_std=0.08, chunk_days=30):
+        if model not in MODELS: raise ValueError(f"Unknown path model: {model}")
+        self.sigma, self.model, self.days = sigma, model, days
+        self.dof, self.jump_intensity, self.jump_mean, self.jump_std = dof, jump_intensity, jump_mean, jump_std
+        if model == "jump":
+            jump_var = jump_intensity * (jump_mean ** 2 + jump_std ** 2)
+            self.step_sigma = np.sqrt(max(sigma * sigma - jump_var, 0.25 * sigma * sigma))
+        else:
+            self.step_sigma = sigma
+        rng = np.random.default_rng(seed)
+
+        # Mínimo acumulado de cada camino, bloque a bloque arrastrando nivel y mínimo
+        running_min = np.empty((days, n_paths), dtype=np.float32)
+        level = np.zeros(n_paths)
+        low = np.full(n_paths, np.inf)
+        for start in range(0, days, chunk_days):
+            steps = self._steps(rng, (min(chunk_days, days - start), n_paths))
+            path = np.cumsum(steps, axis=0, out=steps)
+            path += level
+            level = path[-1].copy()
+            mins = np.minimum.accumulate(path, axis=0, out=path)
+            np.minimum(mins, low, out=mins)
+            low = mins[-1].copy()
+            running_min[start:start + len(mins)] = mins
+        # Ordenado por día: una búsqueda binaria por plazo
+        running_min.sort(axis=1)
+        self.running_min = running_min
+        self.n_paths = n_paths
+
+    def _steps(self, rng, shape):
+        """Incrementos diarios de log-precio (días x caminos) en float64."""
+        dt = 1 / 365
+        if self.model == "jump":
+            lam, mean, std, diff_sigma = self.jump_intensity, self.jump_mean, self.jump_std, self.step_sigma
+            counts = rng.poisson(lam * dt, shape)
+            jumps = counts * mean + np.sqrt(counts) * std * rng.standard_normal(shape)
+            # Martingala: el drift compensa la convexidad de la difusión y de los saltos
+            drift = -0.5 * diff_sigma ** 2 - lam * (np.exp(mean + 0.5 * std ** 2) - 1)
+            return drift * dt + diff_sigma * np.sqrt(dt) * rng.standard_normal(shape) + jumps
+        dof = self.dof
+        shocks = rng.standard_normal(shape) if self.model == "gbm" else rng.standard_t(dof, shape) / np.sqrt(dof / (dof - 2))
+        return -0.5 * self.sigma * self.sigma * dt + self.sigma * np.sqrt(dt) * shocks
+
+    def hit_prob(self, spot, barriers):
+        """Matriz (barrera x plazo 1..days) con la probabilidad de tocar cada barrera."""
+        barriers = np.atleast_1d(np.asarray(barriers, dtype=np.float64))
+        # La barrera discreta equivalente a la continua queda un poco por encima
+        level = np.log(barriers / spot) + BG_BETA * self.step_sigma * np.sqrt(1 / 365)
+        queries = level.astype(np.float32)
+        counts = np.array([np.searchsorted(day, queries, side="right") for day in self.running_min]).T
+        return np.where(level[:, None] >= 0, 1.0, counts / self.n_paths)
+
+_ensembles = OrderedDict()
+_lock = threading.Lock()
+
+def get_ensemble(sigma, model="jump", bucket=0.01, keep=4):
+    """
+    Ensemble cacheado por (modelo, sigma redondeada a `bucket`): se simula solo al
+    cambiar de régimen. Lo llama la fuente 'credit_paths' del scheduler, nunca el render.
+    """
+    key = (model, round(round(sigma / bucket) * bucket, 6))
+    with _lock:
+        if key in _ensembles:
+            _ensembles.move_to_end(key)
+            return _ensembles[key]
+    ensemble = PathEnsemble(max(key[1], bucket), model=model)
+    with _lock:
+        _ensembles[key] = ensemble
+        while len(_ensembles) > keep: _ensembles.popitem(last=False)
+    return ensemble
+
+def reference_sigma(surface, market_df):
+    """Volatilidad para las barreras: IV ATM 30D de Deribit si hay superficie; si no, la realizada 30D."""
+    iv = (surface or {}).get('atm_30d')
+    if iv and iv == iv: return float(iv)
+    if market_df is None or market_df.empty: return None
+    return float(market_df['volatility'].iloc[-1])
+
+def credit_barrier_risk(spot, sigma, sim=None, ensemble=None):
+    """
+    Probabilidades de margin call y liquidación para la línea de crédito
+    (risk_math.simulate_credit_line) en todos los plazos: fórmula cerrada y Montecarlo.
+    - ensemble: PathEnsemble publicado por la fuente 'credit_paths'. En el render
+      solo se consulta (hit_prob); si aún no hay, 'mc' queda en None.
+    """
+    if not spot or not sigma or sigma != sigma: return None
+    sim = sim or risk_math.simulate_credit_line(spot)
+    barriers = [sim['margin_call_price'], sim['liq_price']]
+    closed = closed_form_hit_prob(spot, barriers, sigma)
+    mc = ensemble.hit_prob(spot, barriers) if ensemble is not None else None
+    pick = np.asarray(SHOW_HORIZONS) - 1
+    row = lambda curve, i: None if curve is None else curve[i, pick].tolist()
+    return {
+        'sigma': sigma,
+        'model': ensemble.model if ensemble is not None else None,
+        'horizons': list(SHOW_HORIZONS),
+        'margin_call': {'closed': row(closed, 0), 'mc': row(mc, 0)},
+        'liquidation': {'closed': row(closed, 1), 'mc': row(mc, 1)},
+        'curve_mc': mc,              # (barrera x 365 días) para gráficos
+        'curve_closed': closed,
+    }
+
+# ==============================================================================
+# --- FUENTE PARA EL SCHEDULER ---
+# ==============================================================================
+def make_paths_refresher(refresh, model="jump"):
+    """
+    Simula (o reutiliza) el ensemble para el sigma de referencia actual. El render
+    lee el publicado y solo hace búsquedas binarias: cruzar un bucket de sigma con
+    un tick vivo ya no cuesta una simulación en el hilo de una sesión.
+    """
+    def refresh_paths():
+        market = (refresh.value("market") or {}).get('frames', {}).get('BTC')
+        sigma = reference_sigma(refresh.value("iv_surface"), market)
+        if not sigma or sigma != sigma: raise RuntimeError("No reference volatility yet")
+        return get_ensemble(sigma, model)
+    return refresh_paths
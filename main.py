@@ -4,137 +4,170 @@ import numpy as np
 import time
 from datetime import datetime
 from dotenv import load_dotenv
-import data_fetcher, news_fetcher, risk_math, charts
+import data_fetcher, risk_math, charts, telemetry, sources, broadcast, rotation, hashrate, liquidation, heartbeat, slippage
 from streamlit_autorefresh import st_autorefresh
 
+# Copy-on-Write: los frames compartidos entre sesiones se leen como vistas y
+# nunca se modifican por accidente (en pandas >= 3 ya viene activado)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 # ==============================================================================
 # --- 1. CONFIGURACIÓN E INICIALIZACIÓN ---
 # ==============================================================================
 st.set_page_config(page_title="Volcano TV", page_icon="📺", layout="wide", initial_sidebar_state="collapsed")
 load_dotenv()
 
+# TELEMETRÍA: tiempos por sección de cada rerun (VOLCANO_METRICS=1 para activar)
+telemetry.configure()
+
+@st.cache_resource
+def start_telemetry_exporters():
+    if not telemetry.is_enabled(): return None
+    telemetry.start_metrics_log()
+    return telemetry.start_metrics_server()
+
+start_telemetry_exporters()
+trace = telemetry.RerunTrace()
+trace.mark("clock")
 
+# RELOJ DE ROTACIÓN: la vista la decide el reloj del servidor (rotation.py), igual
+# para todas las pantallas. No hay cronómetros por sesión.
+clock = rotation.get_playlist_clock()
+position = clock.position()
 
-# HEARBEAT: Recarga la página cada 1 segundo para verificar cronómetros de rotación
-st_autorefresh(interval=1000, key="tv_heartbeat")
+trace.mark("scheduler")
 
-# GESTIÓN DE ESTADO (Session State)
-if 'tv_start_time' not in st.session_state:
-    st.session_state.tv_start_time = time.time()
-    st.session_state.page_index = 0      
-    st.session_state.news_offset = 0     
-    st.session_state.last_tab_change = time.time()
-    st.session_state.last_news_change = time.time()
-    # Cache para el modelo AI (para no re-entrenar cada segundo)
-    st.session_state.forecast_cache = None 
-    # ==============================================================================
-# --- 1.1 WATCHDOG & INTERRUPT MODE (NUEVO) ---
 # ==============================================================================
+# --- 1.1 SCHEDULER CENTRAL DE REFRESCO (Compartido por todas las pantallas) ---
+# ==============================================================================
+# Las fuentes (cadencia, jitter, timeout, prioridad) viven en sources.py para que
+# el modo broadcast (broadcast.py) use exactamente las mismas.
+@st.cache_resource
+def get_refresh_scheduler():
+    refresh = sources.build_refresh_scheduler()
+    # VOLCANO_BROADCAST=1: esta instancia además publica los bundles para las pantallas
+    if broadcast.is_enabled(): broadcast.attach(refresh)
+    return refresh.start()
 
-# 1. Inicializar variables de interrupción si no existen
-if 'breaking_active' not in st.session_state:
-    st.session_state.breaking_active = False
-    st.session_state.breaking_data = {}
-    st.session_state.breaking_start_time = 0
-    st.session_state.last_breaking_check = 0
+refresh = get_refresh_scheduler()
 
-# 2. Watchdog: Revisar YouTube cada 5 minutos (300 segs)
-current_ts_watchdog = time.time()
-if current_ts_watchdog - st.session_state.last_breaking_check > 300:
-    # Usamos try/except para que si falla YouTube no rompa el dashboard
-    try:
-        alert = news_fetcher.check_for_breaking_video()
-        if alert and alert.get('is_breaking'):
-            st.session_state.breaking_active = True
-            st.session_state.breaking_data = alert
-            st.session_state.breaking_start_time = current_ts_watchdog
-    except Exception as e:
-        print(f"Watchdog Error: {e}")
-    
-    st.session_state.last_breaking_check = current_ts_watchdog
+trace.mark("heartbeat")
+
+# ==============================================================================
+# --- 1.2 HEARTBEAT ADAPTATIVO (heartbeat.py) ---
+# ==============================================================================
+# Fuentes que pinta cada vista (también la versión de datos del pie de página)
+VIEW_SOURCES = {0: ["market", "live_prices", "etf"], 1: ["market", "macro", "derivatives", "iv_surface", "regime"], 2: ["market", "live_prices", "iv_surface", "order_book", "credit_paths"], 3: ["full_history"], 4: ["hash_rate", "full_history"], 5: ["backtest", "full_history"]}
+
+@st.cache_resource
+def get_heartbeat():
+    return heartbeat.from_env(clock, refresh)
+
+beat = get_heartbeat()
+watch_sources = VIEW_SOURCES[position.page]
+
+# Cuánto durmió esta sesión y qué la despertó (rotación, una fuente, el precio...)
+last_beat = st.session_state.get('heartbeat')
+if last_beat: telemetry.observe("volcano_heartbeat_seconds", "reason", last_beat['reason'], time.time() - last_beat['at'])
+
+# 1. Reloj programado: próximo evento de hora conocida (vista, titulares, caducidades)
+pending_alert = refresh.value("alerts") or {}
+breaking_job = refresh.job("breaking")
+deadlines = [(pending_alert.get('expires'), "alerts")]
+if (breaking_job.value or {}).get('is_breaking'): deadlines.append((breaking_job.changed_at + broadcast.BREAKING_WINDOW, "breaking"))
+wake_in, wake_reason = beat.next_wake(deadlines)
+st.session_state.heartbeat = {'at': time.time(), 'reason': wake_reason}
+st_autorefresh(interval=int(wake_in * 1000) + 50, key="tv_heartbeat")
+
+# 2. Vigía: cada pocos segundos compara lo publicado (precios, fuentes visibles)
+#    con lo pintado en este rerun, sin dibujar nada, y solo entonces pide el rerun
+shown = beat.stamp(watch_sources, refresh.value("live_prices", max_age=30) or {})
+
+@st.fragment(run_every=beat.watch_every)
+def watch_for_changes():
+    reason = beat.due(shown, refresh.value("live_prices", max_age=30) or {})
+    if reason:
+        st.session_state.heartbeat['reason'] = reason
+        st.rerun(scope="app")
+
+watch_for_changes()
+
+trace.mark("watchdog")
+
+# ==============================================================================
+# --- 1.3 WATCHDOG & INTERRUPT MODE (NUEVO) ---
+# ==============================================================================
+
+# 1. Watchdog compartido: el scheduler revisa YouTube cada 5 minutos (300 segs)
+#    para todas las pantallas. Ninguna sesión espera la búsqueda.
+watchdog = refresh.job("breaking")
+breaking_data = watchdog.value or {}
+
+# 2. Cada pantalla solo recuerda si el usuario cerró manualmente este video
+if 'dismissed_breaking_id' not in st.session_state:
+    st.session_state.dismissed_breaking_id = None
 
 # 3. Lógica de Interrupción (Broadcast Mode)
-if st.session_state.breaking_active:
-    # Verificamos duración (Máximo 15 minutos = 900s de interrupción)
-    if current_ts_watchdog - st.session_state.breaking_start_time > 900:
-        st.session_state.breaking_active = False
+# Activa en todas las pantallas a la vez. Máximo 15 minutos (900s) desde la detección.
+current_ts_watchdog = time.time()
+breaking_active = (
+    breaking_data.get('is_breaking', False)
+    and breaking_data.get('id') != st.session_state.dismissed_breaking_id
+    and current_ts_watchdog - watchdog.changed_at <= broadcast.BREAKING_WINDOW
+)
+
+if breaking_active:
+    # --- PANTALLA DE INTERRUPCIÓN ---
+    # Estilos específicos para esta pantalla
+    st.markdown("""
+    <style>
+        .stApp { background-color: #000000 !important; }
+        header, footer {visibility: hidden;}
+        /* Animación de pulso rojo */
+        @keyframes pulse {
+            0% { box-shadow: 0 0 0 0 rgba(220, 38, 38, 0.7); }
+            70% { box-shadow: 0 0 0 20px rgba(220, 38, 38, 0); }
+            100% { box-shadow: 0 0 0 0 rgba(220, 38, 38, 0); }
+        }
+    </style>
+    """, unsafe_allow_html=True)
+    
+    # Banner Gigante
+    st.markdown(f"""
+    <div style="background-color: #7f1d1d; color: white; padding: 40px; text-align: center; border-radius: 15px; margin-bottom: 30px; animation: pulse 2s infinite;">
+        <h1 style="margin:0; font-size: 50px; text-transform: uppercase; font-weight: 900;">🚨 BREAKING NEWS INTERRUPT</h1>
+        <h2 style="margin:15px 0 0 0; color: #fca5a5; font-size: 30px;">{breaking_data.get('channel', 'Live Feed')} • {breaking_data.get('title', 'Broadcast')}</h2>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Video en Autoplay
+    st.video(breaking_data['url'], autoplay=True)
+    
+    # Botón manual de salida (por si te aburres del video)
+    st.markdown("<br>", unsafe_allow_html=True)
+    if st.button("🔙 RETURN TO DASHBOARD (End Broadcast)", type="primary", use_container_width=True):
+        st.session_state.dismissed_breaking_id = breaking_data.get('id')
         st.rerun()
-    else:
-        # --- PANTALLA DE INTERRUPCIÓN ---
-        # Estilos específicos para esta pantalla
-        st.markdown("""
-        <style>
-            .stApp { background-color: #000000 !important; }
-            header, footer {visibility: hidden;}
-            /* Animación de pulso rojo */
-            @keyframes pulse {
-                0% { box-shadow: 0 0 0 0 rgba(220, 38, 38, 0.7); }
-                70% { box-shadow: 0 0 0 20px rgba(220, 38, 38, 0); }
-                100% { box-shadow: 0 0 0 0 rgba(220, 38, 38, 0); }
-            }
-        </style>
-        """, unsafe_allow_html=True)
-        
-        # Banner Gigante
-        st.markdown(f"""
-        <div style="background-color: #7f1d1d; color: white; padding: 40px; text-align: center; border-radius: 15px; margin-bottom: 30px; animation: pulse 2s infinite;">
-            <h1 style="margin:0; font-size: 50px; text-transform: uppercase; font-weight: 900;">🚨 BREAKING NEWS INTERRUPT</h1>
-            <h2 style="margin:15px 0 0 0; color: #fca5a5; font-size: 30px;">{st.session_state.breaking_data.get('channel', 'Live Feed')} • {st.session_state.breaking_data.get('title', 'Broadcast')}</h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Video en Autoplay
-        st.video(st.session_state.breaking_data['url'], autoplay=True)
         
-        # Botón manual de salida (por si te aburres del video)
-        st.markdown("<br>", unsafe_allow_html=True)
-        if st.button("🔙 RETURN TO DASHBOARD (End Broadcast)", type="primary", use_container_width=True):
-            st.session_state.breaking_active = False
+    # DETENEMOS EL SCRIPT AQUÍ
+    # Esto es vital: evita que cargue Prophet, gráficos o tickers debajo del video.
+    st.stop()
+
+# 4. Interrupción de mercado (alerts.py): "critical" toma la pantalla, "warning" es un banner
+market_alert = refresh.value("alerts")
+if market_alert and market_alert['expires'] > current_ts_watchdog and market_alert['id'] != st.session_state.get('dismissed_alert_id'):
+    st.markdown(broadcast.alert_banner_html(market_alert), unsafe_allow_html=True)
+    if market_alert['severity'] == "critical":
+        st.markdown("""<style>.stApp { background-color: #000000 !important; } header, footer {visibility: hidden;}
+        @keyframes pulse { 0% { box-shadow: 0 0 0 0 rgba(220, 38, 38, 0.7); } 70% { box-shadow: 0 0 0 20px rgba(220, 38, 38, 0); } 100% { box-shadow: 0 0 0 0 rgba(220, 38, 38, 0); } }
+        </style>""", unsafe_allow_html=True)
+        if st.button("🔙 RETURN TO DASHBOARD (Acknowledge Alert)", type="primary", use_container_width=True):
+            st.session_state.dismissed_alert_id = market_alert['id']
             st.rerun()
-            
-        # DETENEMOS EL SCRIPT AQUÍ
-        # Esto es vital: evita que cargue Prophet, gráficos o tickers debajo del video.
         st.stop()
-    st.session_state.last_forecast_time = 0
-
-# --- LÓGICA DE PROPHET (AI FORECAST) ---
-# Intentamos importar Prophet. Si falla (por errores de C++ en Mac), usamos fallback.
-HAS_PROPHET = False
-try:
-    from prophet import Prophet
-    HAS_PROPHET = True
-except ImportError:
-    pass
-
-def get_or_train_forecast(df):
-    """Entrena el modelo solo si ha pasado 1 hora o no existe"""
-    if not HAS_PROPHET: return None
-    
-    current_t = time.time()
-    # Re-entrenar cada 1 hora (3600s)
-    if st.session_state.forecast_cache is not None and (current_t - st.session_state.last_forecast_time < 3600):
-        return st.session_state.forecast_cache
-
-    try:
-        # Preparamos datos
-        ph_df = df.reset_index()[['Date', 'close']].rename(columns={'Date': 'ds', 'close': 'y'})
-        if ph_df['ds'].dt.tz is not None: ph_df['ds'] = ph_df['ds'].dt.tz_localize(None)
-        
-        # Entrenamos (Rápido)
-        m = Prophet(daily_seasonality=True, changepoint_prior_scale=0.15)
-        m.fit(ph_df)
-        
-        # Predicción 30 días
-        future = m.make_future_dataframe(periods=30)
-        forecast = m.predict(future)
-        
-        # Guardamos en cache
-        st.session_state.forecast_cache = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
-        st.session_state.last_forecast_time = current_t
-        return st.session_state.forecast_cache
-    except Exception as e:
-        print(f"Prophet Error: {e}")
-        return None
+
+trace.mark("css")
 
 # ==============================================================================
 # --- 2. CSS & ESTILOS DE TV ---
@@ -174,29 +207,30 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+trace.mark("data_read")
+
 # ==============================================================================
 # --- 3. CARGA DE DATOS ---
 # ==============================================================================
-@st.cache_data(ttl=600)
-def get_tv_data():
-    m_df = data_fetcher.fetch_market_data(period="2y", interval="1d")
-    # News y Macro
-    news = news_fetcher.fetch_sentinel_news(limit=40) 
-    macro = data_fetcher.fetch_macro_data(period="6mo") # Traemos 6 meses para el gráfico macro
-    fng_val, fng_lbl = data_fetcher.fetch_fear_and_greed_index()
-    return m_df, news, macro, fng_val, fng_lbl
-
-market_df, all_news, macro_df, fg_value, fg_label = get_tv_data()
-
-# Safety Check
-if market_df.empty or 'close' not in market_df.columns:
+# Lectura instantánea del último dato publicado por el scheduler (nunca bloquea)
+multi_asset = refresh.value("market") or {}
+market_df = multi_asset.get('frames', {}).get('BTC')
+all_news = refresh.value("news") or []
+macro = refresh.value("macro") or {}
+macro_df = macro.get('normalized', pd.DataFrame())
+corr_hist = macro.get('corr_history', pd.DataFrame())
+fg_value, fg_label = refresh.value("fng") or (50, "Neutral")
+
+# Safety Check (solo si no hay snapshot en disco y aún no llegó la primera descarga).
+# No bloqueamos el hilo: el vigía del heartbeat relanza el rerun cuando llegue.
+if market_df is None or market_df.empty or 'close' not in market_df.columns:
     st.warning("⚠️ Market Data Feed Reconnecting...")
-    time.sleep(2)
-    st.rerun()
+    st.stop()
 
-# 1. Intentamos obtener precio en vivo (Kraken)
-# (Asegúrate de haber agregado la función fetch_live_price en data_fetcher.py)
-live_price = data_fetcher.fetch_live_price()
+# 1. Precios en vivo (Kraken) publicados por el scheduler cada ~5s.
+# Si tienen más de 30s los descartamos y usamos el cierre cacheado.
+live_prices = refresh.value("live_prices", max_age=30) or {}
+live_price = live_prices.get('BTC')
 
 # 2. Decidimos qué precio usar
 if live_price:
@@ -213,101 +247,93 @@ curr = {
     'close': current_price, # <--- USAMOS EL PRECIO VIVO
     'volatility': market_df['volatility'].iloc[-1],
     'z_score': market_df['z_score'].iloc[-1] if 'z_score' in market_df.columns else 0,
-    # Ajustamos High/Low dinámicamente si el precio vivo rompe los rangos del día
-    'high': max(market_df['high'].iloc[-1], current_price),
-    'low': min(market_df['low'].iloc[-1], current_price),
+    # La vela del día ya incluye los ticks vivos (candles.py fusiona cada precio en el frame)
+    'high': market_df['high'].iloc[-1],
+    'low': market_df['low'].iloc[-1],
     'vwap': market_df['sma_50'].iloc[-1] 
 }
-# Entrenar AI Forecast (Si Prophet está disponible)
-forecast_df = get_or_train_forecast(market_df)
+# AI Forecast (Si Prophet está disponible, entrenado en segundo plano)
+forecast_df = refresh.value("forecast")
+
+trace.mark("rotation")
 
 # ==============================================================================
 # --- 4. CONTROL DE TIEMPO Y ROTACIÓN ---
 # ==============================================================================
-current_time = time.time()
-
-# Rotación de Pestañas (Tiempos personalizados por vista)
-# Vista 0: 30s | Vista 1: 15s | Vista 2: 15s
-cycle_times = [25, 25, 25, 25 ] 
-current_duration = cycle_times[st.session_state.page_index]
-
-if current_time - st.session_state.last_tab_change > current_duration:
-    st.session_state.page_index = (st.session_state.page_index + 1) % 4
-    st.session_state.last_tab_change = current_time
-
-# Rotación de Noticias (Cada 2 mins avanzamos 10 noticias)
-if current_time - st.session_state.last_news_change > 120:
-    st.session_state.news_offset += 10
-    st.session_state.last_news_change = current_time
+# Posición común de la playlist (ver rotation.py y VOLCANO_CYCLE_TIMES)
+page_index = position.page
+news_offset = position.news_offset        # Cada 2 mins avanzamos 10 noticias
+# Cada vuelta completa, la Vista 1 pasa al siguiente activo (BTC -> ETH -> SOL...)
+asset_index = position.lap
 
 # ==============================================================================
 # --- 5. COMPONENTES VISUALES (HEADER & TICKER) ---
 # ==============================================================================
+trace.mark("header")
 # HEADER
-is_pos = price_delta >= 0
-color = "#00C805" if is_pos else "#FF4B4B"
-arrow = "▲" if is_pos else "▼"
-
-st.markdown(f"""
-<div style="padding: 10px 0px; border-bottom: 1px solid #333; display: flex; justify-content: space-between; align-items: flex-end;">
-    <div>
-        <div style="font-size: 14px; color: #888; letter-spacing: 2px;">VOLCANO BANK TV</div>
-        <div style="font-size: 60px; font-weight: 700; color: {color}; line-height: 1;">${curr['close']:,.2f}</div>
-    </div>
-    <div style="text-align: right;">
-        <div style="font-size: 24px; color: {color};">{arrow} {price_delta:.2%}</div>
-        <div style="font-size: 14px; color: #666;">24H CHANGE</div>
-    </div>
-    <div style="text-align: right; padding-left: 20px; border-left: 1px solid #333;">
-        <div style="font-size: 20px; color: #e0e0e0; font-weight: bold;">{fg_value}</div>
-        <div style="font-size: 14px; color: #888;">{fg_label}</div>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(broadcast.header_html(curr['close'], price_delta, fg_value, fg_label), unsafe_allow_html=True)
 
+trace.mark("ticker")
 # TICKER DE NOTICIAS
 if all_news:
     total_news = len(all_news)
-    start_idx = st.session_state.news_offset % total_news
+    start_idx = news_offset % total_news
     batch = [all_news[(start_idx + i) % total_news] for i in range(10)]
     
-    ticker_html = ""
-    for n in batch:
-        tag = " | ".join(n.get('tags', ['NEWS'])[:1]).upper()
-        ticker_html += f"""<div class="ticker-item"><span class="ticker-tag">⚡ {tag}</span>{n['title']}</div>"""
-    
-    st.markdown(f"""<div class="ticker-wrap"><div class="ticker">{ticker_html}{ticker_html}</div></div>""", unsafe_allow_html=True)
+    st.markdown(broadcast.ticker_html(batch), unsafe_allow_html=True)
 
 # Indicador de Página (Puntos)
-dots = "".join(["● " if i == st.session_state.page_index else "○ " for i in range(3)])
-st.caption(f"LIVE FEED: {dots} (View {st.session_state.page_index + 1}/3)")
+dots = "".join(["● " if i == page_index else "○ " for i in range(clock.views)])
+
+# Versión de datos que muestra esta vista (fuente vN · antigüedad)
+data_versions = " · ".join(
+    f"{name} v{ver} ({age/60:.0f}m)" if ver else f"{name} loading"
+    for name, (ver, age) in refresh.versions(VIEW_SOURCES[page_index]).items()
+)
+st.caption(f"LIVE FEED: {dots} (View {page_index + 1}/{clock.views}) | DATA: {data_versions}")
 
 # ==============================================================================
 # --- 6. VISTAS PRINCIPALES ---
 # ==============================================================================
 
+trace.mark(f"view_{page_index + 1}")
+
 # --- VISTA 1: MARKET OVERVIEW (0-30s) ---
-if st.session_state.page_index == 0:
-    st.subheader("📈 Market Structure & Volume")
-    st.plotly_chart(charts.create_price_volume_chart(market_df), use_container_width=True)
+if page_index == 0:
+    # Activo en pantalla (rota en cada vuelta completa)
+    asset_codes = multi_asset['assets']
+    view_asset = asset_codes[asset_index % len(asset_codes)]
+    view_df = multi_asset['frames'][view_asset]
+    view_price = live_prices.get(view_asset) or view_df['close'].iloc[-1]
+
+    st.subheader(f"📈 {multi_asset['names'][view_asset]} Market Structure & Volume")
+    st.plotly_chart(charts.create_price_volume_chart(view_df, view_asset), use_container_width=True)
     
     # Métricas inferiores rápidas
     m1, m2, m3, m4 = st.columns(4)
-    m1.metric("24h High", f"${curr['high']:,.0f}")
-    m2.metric("24h Low", f"${curr['low']:,.0f}")
-    m3.metric("Trend (SMA50)", "BULLISH" if curr['close'] > curr['vwap'] else "BEARISH")
-    m4.metric("Volatility", f"{curr['volatility']:.1%}")
+    m1.metric("24h High", f"${view_df['high'].iloc[-1]:,.0f}")
+    m2.metric("24h Low", f"${view_df['low'].iloc[-1]:,.0f}")
+    m3.metric("Trend (SMA50)", "BULLISH" if view_price > view_df['sma_50'].iloc[-1] else "BEARISH")
+    m4.metric("Volatility", f"{view_df['volatility'].iloc[-1]:.1%}")
+
+    # Comparativa de todos los activos (última fila del panel, una sola operación)
+    snapshot = data_fetcher.latest_snapshot(multi_asset, live_prices)
+    st.markdown(broadcast.asset_strip_html(snapshot, highlight=view_asset), unsafe_allow_html=True)
+
+    # Flujos de los ETFs spot (cesta concurrente de etfs.py)
+    if view_asset == 'BTC':
+        st.markdown(broadcast.etf_strip_html(refresh.value("etf")), unsafe_allow_html=True)
 
 
 # --- VISTA 2: RISK TRINITY (30s-45s) ---
-elif st.session_state.page_index == 1:
+elif page_index == 1:
     st.subheader("⚠️ Risk Radar & Macro Correlations")
     
     c1, c2, c3 = st.columns(3)
     
     with c1:
-        st.caption("Historical Volatility (30D)")
-        st.plotly_chart(charts.create_volatility_chart(market_df), use_container_width=True)
+        st.caption("Realized vs Implied Volatility")
+        st.plotly_chart(charts.create_volatility_chart(market_df, refresh.value("iv_surface"), refresh.value("regime")), use_container_width=True)
         
     with c2:
         st.caption("Mean Reversion (Z-Score)")
@@ -315,130 +341,43 @@ elif st.session_state.page_index == 1:
         
     with c3:
         st.caption("Macro Correlations (vs S&P500 / Gold)")
-        # Usamos la nueva función Macro
-        if not macro_df.empty:
+        # Régimen de correlación móvil; si aún no hay ventana completa, rendimientos normalizados
+        if not corr_hist.empty:
+            st.plotly_chart(charts.create_correlation_regime_chart(corr_hist), use_container_width=True)
+        elif not macro_df.empty:
             st.plotly_chart(charts.create_macro_chart(macro_df), use_container_width=True)
         else:
             st.info("Loading Macro Data...")
 
+    # Derivados: funding ponderado por OI, z-score, open interest y put/call (derivatives.py)
+    st.markdown(broadcast.derivatives_strip_html(refresh.value("derivatives")), unsafe_allow_html=True)
+    # Régimen de volatilidad (HMM de regime.py) y VaR con la volatilidad esperada por régimen
+    st.markdown(broadcast.regime_strip_html(refresh.value("regime")), unsafe_allow_html=True)
+
 
 # --- VISTA 3: INSTITUTIONAL CREDIT SIMULATOR (SOLO SIMULACIÓN) ---
 # ** HIGH CONTRAST MODE (PURE HTML) **
-elif st.session_state.page_index == 2:
+elif page_index == 2:
     
     st.subheader("🛡️ Live Credit Stress Test (Institutional)")
     
-    # --- 1. PARÁMETROS ---
-    SIM_LOAN = 5_000_000   
-    SIM_HAIRCUT = 30       
-    SIM_LTV = 0.65         
-    SIM_LIQ_THRESH = 0.85  
-    
-    # --- 2. CÁLCULOS ---
-    lending_price = curr['close'] * (1 - (SIM_HAIRCUT / 100))
-    collateral_btc = SIM_LOAN / (lending_price * SIM_LTV)
-    collateral_usd_market = collateral_btc * curr['close']
-    liq_price = SIM_LOAN / (collateral_btc * (1 - SIM_HAIRCUT/100) * SIM_LIQ_THRESH)
-    buffer_pct = (curr['close'] - liq_price) / curr['close']
-    
-    # --- 3. FUNCIÓN DE RENDERIZADO (TARJETA TV) ---
-    # Esta función crea HTML puro, igual que el Header, para garantizar nitidez
-    def render_tv_card(title, value, subvalue, color="#FFFFFF", bg_color="#111"):
-        return f"""
-        <div style="
-            background-color: {bg_color};
-            border: 1px solid #333;
-            border-radius: 10px;
-            padding: 15px;
-            margin-bottom: 10px;
-            height: 100%;
-        ">
-            <div style="color: #888; font-size: 16px; font-weight: 500; letter-spacing: 1px; text-transform: uppercase; margin-bottom: 5px;">
-                {title}
-            </div>
-            <div style="color: {color}; font-size: 42px; font-weight: 800; line-height: 1.1;">
-                {value}
-            </div>
-            <div style="color: #ccc; font-size: 18px; margin-top: 5px; font-weight: 400;">
-                {subvalue}
-            </div>
-        </div>
-        """
-
-    # --- 4. DISEÑO VISUAL ---
-    c1, c2, c3 = st.columns([1, 1, 1])
-    
-    with c1:
-        st.markdown("#### 💼 Deal Structure")
-        st.markdown(render_tv_card(
-            "Principal Loan", 
-            f"${SIM_LOAN/1_000_000:.1f}M", 
-            "USD Currency"
-        ), unsafe_allow_html=True)
-        
-        st.markdown(render_tv_card(
-            "Risk Policy", 
-            f"{SIM_HAIRCUT}% HC", 
-            f"Effective LTV: {SIM_LTV:.0%}"
-        ), unsafe_allow_html=True)
+    # Cálculos en risk_math y HTML compartido con el modo broadcast (mismo aspecto en ambos)
+    sim = risk_math.simulate_credit_line(curr['close'])
+    # Coste de vender el colateral recorriendo el libro de órdenes (slippage.py), junto a Liquidation Price
+    cost = slippage.collateral_liquidation(refresh.value("order_book", max_age=300), sim)
+    for col, html in zip(st.columns([1, 1, 1]), broadcast.credit_columns_html(sim, cost)):
+        col.markdown(html, unsafe_allow_html=True)
+
+    # Probabilidad de tocar margin call / liquidación por plazo (liquidation.py, con la IV de Deribit si existe)
+    sigma = liquidation.reference_sigma(refresh.value("iv_surface"), market_df)
+    risk = liquidation.credit_barrier_risk(curr['close'], sigma, sim, refresh.value("credit_paths"))
+    st.markdown(broadcast.barrier_risk_html(risk, sim), unsafe_allow_html=True)
 
-    with c2:
-        st.markdown("#### 🔐 Collateral Required")
-        # Tarjeta Especial Destacada (Dorado)
-        st.markdown(f"""
-        <div style="
-            background-color: #1a1a1a;
-            border: 2px solid #F59E0B;
-            border-radius: 10px;
-            padding: 20px;
-            text-align: center;
-            margin-bottom: 15px;
-        ">
-            <div style="color: #F59E0B; font-size: 18px; letter-spacing: 2px; font-weight: bold; margin-bottom: 10px;">
-                REQUIRED COLLATERAL
-            </div>
-            <div style="color: #FFFFFF; font-size: 65px; font-weight: 900; line-height: 1;">
-                {collateral_btc:.2f} <span style="font-size: 30px; color: #888;">BTC</span>
-            </div>
-            <div style="color: #fff; font-size: 22px; margin-top: 10px;">
-                Market Value: ${collateral_usd_market:,.0f}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Barra de progreso manual (HTML)
-        rec_pct = 100 - SIM_HAIRCUT
-        st.markdown(f"""
-        <div style="color:#aaa; font-size:14px; margin-bottom:5px;">Bank Recognition Rate: {rec_pct}%</div>
-        <div style="width:100%; background:#333; height:10px; border-radius:5px;">
-            <div style="width:{rec_pct}%; background:#10B981; height:100%; border-radius:5px;"></div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with c3:
-        st.markdown("#### 📉 Risk Analysis")
-        
-        liq_color = "#FF4B4B" if buffer_pct < 0.15 else "#10B981"
-        buffer_status = "CRITICAL" if buffer_pct < 0.15 else "SAFE ZONE"
-        
-        st.markdown(render_tv_card(
-            "Liquidation Price", 
-            f"${liq_price:,.0f}", 
-            f"Threshold: {SIM_LIQ_THRESH:.0%}",
-            color=liq_color
-        ), unsafe_allow_html=True)
-        
-        st.markdown(render_tv_card(
-            "Safety Buffer", 
-            f"{buffer_pct:.2%}", 
-            f"Status: {buffer_status}",
-            color=liq_color
-        ), unsafe_allow_html=True)
-        
      # --- VISTA 4: VISUAL ALPHA (POWER LAW & SEASONALITY) ---
-elif st.session_state.page_index == 3:
+elif page_index == 3:
     
-    full_history = data_fetcher.fetch_full_history()
+    full_history = refresh.value("full_history")
+    if full_history is None: full_history = pd.DataFrame()
     
     c1, c2 = st.columns([3, 2]) # 60% Power Law | 40% Seasonality
     
@@ -470,3 +409,36 @@ elif st.session_state.page_index == 3:
         else:
             st.warning("Loading...")
 
+# --- VISTA 5: MINER HEALTH (HASH RIBBONS & PRICE/HASH) ---
+elif page_index == 4:
+    st.subheader("⛏️ Miner Health: Hash Ribbons & Valuation")
+
+    # Señales ya calculadas por el scheduler sobre el almacén incremental (hashrate.py)
+    hash_signals = refresh.value("hash_rate")
+    if hash_signals is not None and not hash_signals.empty:
+        c1, c2 = st.columns([3, 1])
+        with c1:
+            st.plotly_chart(charts.create_miner_metrics_chart_tv(refresh.value("full_history"), hash_signals), use_container_width=True)
+            st.caption("Capitulation = 30D MA crosses below 60D MA · Recovery = crosses back above.")
+        with c2:
+            st.markdown(broadcast.miner_cards_html(hashrate.latest_status(hash_signals)), unsafe_allow_html=True)
+    else:
+        st.warning("Loading Hash Rate...")
+
+# --- VISTA 6: SIGNAL BACKTEST (CÓMO HABRÍAN RENDIDO LAS SEÑALES) ---
+elif page_index == 5:
+    st.subheader("📊 Signal Backtest: How the Dashboard's Signals Performed")
+
+    # Backtest y barridos ya calculados por el scheduler sobre el historial completo (backtest.py)
+    results = refresh.value("backtest")
+    if results:
+        c1, c2 = st.columns([3, 2])
+        with c1:
+            st.plotly_chart(charts.create_backtest_chart(results), use_container_width=True)
+            st.caption("Growth of $1 following each signal (long/flat, next-day execution).")
+        with c2:
+            st.markdown(broadcast.backtest_cards_html(results), unsafe_allow_html=True)
+    else:
+        st.warning("Running Backtest...")
+
+trace.end()
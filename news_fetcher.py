@@ -1,8 +1,11 @@
-import feedparser
 import time
+import os
+import re
+import json
+from functools import lru_cache
 from datetime import datetime
 import random
-from youtubesearchpython import VideosSearch
+import upstream
 
 # --- CONFIGURACIÓN DE FUENTES ---
 RSS_FEEDS = [
@@ -23,25 +26,81 @@ RSS_FEEDS = [
     }
 ]
 
+# Reglas de tags y keywords VIP (editables sin tocar código)
+TAG_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tag_rules.json")
+
+# ==============================================================================
+# --- MOTOR DE TAGS (Regex compilada una sola vez) ---
+# ==============================================================================
+def _normalize_keyword(text):
+    return " ".join(text.lower().split())
+
+class KeywordMatcher:
+    """
+    Compila todas las listas de keywords en UNA sola regex con límites de palabra.
+    Un solo recorrido del título devuelve todas las etiquetas ('rate' ya no
+    coincide con 'pirate', ni 'ban' con 'bank'). Acepta plural simple ('rates').
+    """
+    def __init__(self, rules):
+        # rules: {etiqueta: [keywords]} -> el orden de las etiquetas es la prioridad
+        self.labels = list(rules)
+        self._lookup = {}
+        for label, words in rules.items():
+            for w in words:
+                key = _normalize_keyword(w)
+                if key and label not in self._lookup.setdefault(key, []):
+                    self._lookup[key].append(label)
+
+        # Más largas primero para que 'rate cut' gane a 'rate'
+        keys = sorted(self._lookup, key=len, reverse=True)
+        pattern = "|".join(r"\s+".join(re.escape(part) for part in k.split()) for k in keys)
+        self._regex = re.compile(rf"\b({pattern})s?\b", re.IGNORECASE) if keys else None
+
+    def match(self, text):
+        """Todas las etiquetas presentes en el texto, en orden de prioridad."""
+        if self._regex is None or not text: return []
+        found = set()
+        for m in self._regex.finditer(text):
+            key = _normalize_keyword(m.group(1))
+            found.update(self._lookup.get(key, ()))
+            # Una frase larga ('rate cut') también activa sus palabras sueltas ('rate')
+            if " " in key:
+                for part in key.split():
+                    found.update(self._lookup.get(part, ()))
+        return [label for label in self.labels if label in found]
+
+    def search(self, text):
+        """True si aparece al menos una keyword."""
+        return bool(self._regex is not None and text and self._regex.search(text))
+
+@lru_cache(maxsize=1)
+def load_tag_rules(path=None):
+    """Lee las reglas desde JSON (ruta por defecto o TAG_RULES_FILE del entorno)."""
+    path = path or os.getenv("TAG_RULES_FILE", TAG_RULES_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            rules = json.load(f)
+        return rules.get("tags", {}), rules.get("vip_keywords", [])
+    except Exception as e:
+        print(f"Error loading tag rules ({path}): {e}")
+        return {}, []
+
+@lru_cache(maxsize=1)
+def get_tag_matcher():
+    tags, _ = load_tag_rules()
+    return KeywordMatcher(tags)
+
+@lru_cache(maxsize=1)
+def get_vip_matcher():
+    _, vip_keywords = load_tag_rules()
+    return KeywordMatcher({"VIP": vip_keywords})
+
 def get_smart_tags(title, category_default):
     """
     Analiza el título para asignar tags específicos, 
     o usa la categoría por defecto del feed.
     """
-    t = title.lower()
-    tags = []
-    
-    # Tags Prioritarios (Keywords)
-    if any(x in t for x in ['bitcoin', 'btc', 'satoshi', 'etf', 'halving']):
-        tags.append("Bitcoin")
-    if any(x in t for x in ['gold', 'silver', 'commodity', 'oil']):
-        tags.append("Commodities")
-    if any(x in t for x in ['fed', 'powell', 'rate', 'inflation', 'cpi', 'recession']):
-        tags.append("Macro")
-    if any(x in t for x in ['war', 'missile', 'army', 'treaty', 'china', 'russia']):
-        tags.append("Conflict")
-    if any(x in t for x in ['sec', 'gensler', 'lawsuit', 'ban', 'regulation', 'tax']):
-        tags.append("Regulation")
+    tags = get_tag_matcher().match(title)
         
     # Si no encontró keywords específicas, usa la categoría del feed (ej: Crypto)
     if not tags:
@@ -59,10 +118,10 @@ def fetch_sentinel_news(limit=15):
     for source in RSS_FEEDS:
         try:
             # Parsear el RSS
-            feed = feedparser.parse(source["url"])
+            entries = upstream.rss_entries(source["url"])
             
             # Extraer las 5 mejores de cada fuente para tener variedad
-            for entry in feed.entries[:5]: 
+            for entry in entries[:5]: 
                 
                 # Gestión de Tiempos (A veces RSS no trae published_parsed)
                 if hasattr(entry, 'published_parsed') and entry.published_parsed:
@@ -134,10 +193,11 @@ def generate_mock_news():
         }
     ]
     
-def check_for_breaking_video():
+def check_for_breaking_video(raise_errors=False):
     """
     Busca transmisiones en vivo o videos urgentes de fuentes confiables.
     Retorna un diccionario con la info del video si encuentra algo, o None.
+    Con raise_errors=True propaga los fallos (el scheduler aplica backoff).
     """
     try:
         # 1. LISTA VIP (Solo interrumpimos por estos canales)
@@ -147,19 +207,12 @@ def check_for_breaking_video():
         ]
         
         # 2. PALABRAS CLAVE DE ALTO IMPACTO (Protagonistas y Eventos)
-        # Si el título no tiene uno de estos, lo ignoramos.
-        vip_keywords = [
-            "Kevin Warsh", "Fed Chair", "FOMC", "Rate Hike", "Rate Cut", # FED
-            "Gary Gensler", "SEC Approval", "ETF Approval", # Regulación
-            "El Salvador Bitcoin", # Relevancia Local
-            "Michael Saylor", "BlackRock", "Larry Fink", # Institucional
-            "Bitcoin Crash", "Bitcoin ATH", "All Time High", "Binance" # Mercado
-        ]
+        # Si el título no tiene una de estas (ver tag_rules.json), lo ignoramos.
+        vip_matcher = get_vip_matcher()
 
         # 3. BUSCAMOS "LIVE" O "BREAKING"
         # Buscamos específicamente noticias de Bitcoin/Finanzas
-        search = VideosSearch('Bitcoin Breaking News Finance', limit=10)
-        results = search.result()['result']
+        results = upstream.youtube_search('Bitcoin Breaking News Finance', limit=10)
         
         for video in results:
             title = video['title']
@@ -173,8 +226,7 @@ def check_for_breaking_video():
 
             # --- FILTRO 2: PALABRA CLAVE VIP ---
             # Verificamos si alguna palabra VIP está en el título
-            is_vip = any(vip.lower() in title.lower() for vip in vip_keywords)
-            if not is_vip:
+            if not vip_matcher.search(title):
                 continue
 
             # --- FILTRO 3: URGENCIA (TIEMPO) ---
@@ -195,5 +247,6 @@ def check_for_breaking_video():
         return {"is_breaking": False}
 
     except Exception as e:
+        if raise_errors: raise
         print(f"Error checking breaking news: {e}")
         return {"is_breaking": False}
@@ -0,0 +1,194 @@
+import copy
+import time
+
+import numpy as np
+import pandas as pd
+
+# ==============================================================================
+# --- 1. MODELO DE REGÍMENES DE VOLATILIDAD (HMM gaussiano) ---
+# ==============================================================================
+# Los rendimientos diarios salen de K regímenes ocultos (de menor a mayor
+# varianza) que cambian según una cadena de Markov. Se ajusta una vez con todo
+# el historial (Baum-Welch: forward-backward escalado) y después cada barra
+# nueva solo actualiza la probabilidad filtrada: alpha' = norm((alpha · A) * b(r)),
+# O(K²) por barra. Sustituye al umbral fijo del 60% de volatilidad.
+N_STATES = 3
+LABELS = {2: ("Calm", "Turbulent"), 3: ("Calm", "Normal", "Turbulent")}
+VAR_FLOOR = 1e-8            # Varianza mínima de un régimen (evita colapsos en EM)
+ANNUAL = 365
+
+class GaussianHMM:
+    """
+    - n_states: regímenes (se ordenan por varianza: 0 = el más tranquilo).
+    - n_iter / tol: iteraciones de EM y mejora relativa mínima de la verosimilitud.
+    Tras fit(), `alpha` es la probabilidad filtrada del último dato y
+    `last_date` su fecha: update() continúa desde ahí.
+    """
+    def __init__(self, n_states=N_STATES, n_iter=60, tol=1e-6):
+        self.n_states, self.n_iter, self.tol = n_states, n_iter, tol
+        self.labels = LABELS.get(n_states, tuple(f"State {i}" for i in range(n_states)))
+        self.alpha = None
+        self.last_date = None
+        self.fitted_at = None
+        self.loglik = None
+
+    def _log_emissions(self, x):
+        d = x[:, None] - self.mean[None, :]
+        return -0.5 * (d * d / self.var + np.log(2 * np.pi * self.var))
+
+    def _emissions(self, x):
+        """Densidades escaladas por fila (sin underflow en días extremos) y el log del factor."""
+        logb = self._log_emissions(x)
+        shift = logb.max(axis=1)
+        return np.exp(logb - shift[:, None]), shift
+
+    def _forward(self, b):
+        alpha = np.empty_like(b)
+        scale = np.empty(len(b))
+        a = self.start * b[0]
+        scale[0] = a.sum(); alpha[0] = a / scale[0]
+        A = self.transmat
+        for t in range(1, len(b)):
+            a = (alpha[t - 1] @ A) * b[t]
+            scale[t] = a.sum(); alpha[t] = a / scale[t]
+        return alpha, scale
+
+    def _backward(self, b, scale):
+        beta = np.empty_like(b)
+        beta[-1] = 1.0
+        A = self.transmat
+        for t in range(len(b) - 2, -1, -1):
+            beta[t] = A @ (b[t + 1] * beta[t + 1]) / scale[t + 1]
+        return beta
+
+    def _init_params(self, x):
+        # Cuantiles de la volatilidad móvil: regímenes de partida ordenados por varianza
+        vol = pd.Series(x).rolling(20, min_periods=5).std().bfill().to_numpy()
+        edges = np.quantile(vol, np.linspace(0, 1, self.n_states + 1))
+        groups = np.clip(np.searchsorted(edges, vol, side="right") - 1, 0, self.n_states - 1)
+        self.mean = np.array([x[groups == k].mean() if (groups == k).any() else 0.0 for k in range(self.n_states)])
+        self.var = np.array([max(x[groups == k].var(), VAR_FLOOR) if (groups == k).sum() > 1 else x.var() for k in range(self.n_states)])
+        self.transmat = np.full((self.n_states, self.n_states), 0.02 / max(self.n_states - 1, 1))
+        np.fill_diagonal(self.transmat, 0.98)
+        self.start = np.full(self.n_states, 1 / self.n_states)
+
+    def fit(self, returns):
+        """EM sobre una Serie de rendimientos logarítmicos diarios (índice de fechas)."""
+        returns = returns.dropna()
+        x = returns.to_numpy(dtype=np.float64)
+        if len(x) < 50 * self.n_states: raise ValueError("Not enough returns to fit the regime model")
+        self._init_params(x)
+
+        previous = -np.inf
+        for _ in range(self.n_iter):
+            b, shift = self._emissions(x)
+            alpha, scale = self._forward(b)
+            beta = self._backward(b, scale)
+            loglik = np.log(scale).sum() + shift.sum()
+
+            gamma = alpha * beta
+            gamma /= gamma.sum(axis=1, keepdims=True)
+            # Transiciones esperadas de todos los pasos a la vez
+            xi = np.einsum('ti,ij,tj->ij', alpha[:-1], self.transmat, b[1:] * beta[1:] / scale[1:, None])
+            self.transmat = xi / xi.sum(axis=1, keepdims=True)
+            self.start = gamma[0]
+            weight = gamma.sum(axis=0)
+            self.mean = gamma.T @ x / weight
+            self.var = np.maximum((gamma * (x[:, None] - self.mean) ** 2).sum(axis=0) / weight, VAR_FLOOR)
+
+            if loglik - previous < self.tol * abs(loglik): break
+            previous = loglik
+
+        self._sort_states()
+        b, _ = self._emissions(x)
+        alpha, _ = self._forward(b)
+        self.alpha = alpha[-1]
+        self.last_date = returns.index[-1]
+        self.fitted_at = time.time()
+        self.loglik = float(loglik)
+        return pd.DataFrame(alpha, index=returns.index, columns=list(self.labels))
+
+    def _sort_states(self):
+        order = np.argsort(self.var)
+        self.mean, self.var, self.start = self.mean[order], self.var[order], self.start[order]
+        self.transmat = self.transmat[np.ix_(order, order)]
+
+    def update(self, returns):
+        """Filtra solo las barras posteriores a last_date. Devuelve sus probabilidades (fecha x régimen)."""
+        new = returns[returns.index > self.last_date].dropna()
+        if new.empty: return pd.DataFrame(columns=list(self.labels), dtype=np.float64)
+        b, _ = self._emissions(new.to_numpy(dtype=np.float64))
+        out = np.empty_like(b)
+        alpha = self.alpha
+        for t in range(len(b)):
+            a = (alpha @ self.transmat) * b[t]
+            alpha = out[t] = a / a.sum()
+        self.alpha, self.last_date = alpha, new.index[-1]
+        return pd.DataFrame(out, index=new.index, columns=list(self.labels))
+
+    def predict(self, days=1):
+        """Probabilidad de cada régimen dentro de `days` días."""
+        return self.alpha @ np.linalg.matrix_power(self.transmat, days)
+
+    @property
+    def volatilities(self):
+        """Volatilidad anualizada de cada régimen."""
+        return np.sqrt(self.var * ANNUAL)
+
+    def horizon_volatility(self, days):
+        """
+        Volatilidad anualizada para un horizonte: media de la varianza diaria
+        esperada en cada día según la probabilidad prevista de cada régimen.
+        """
+        p, step, total = self.alpha, self.transmat, 0.0
+        for _ in range(int(days)):
+            p = p @ step
+            total += p @ self.var
+        return float(np.sqrt(total / max(int(days), 1) * ANNUAL))
+
+# ==============================================================================
+# --- 2. FUENTE PARA EL SCHEDULER ---
+# ==============================================================================
+REFIT_DAYS = 7              # El modelo se re-ajusta con el historial completo cada semana
+HISTORY_DAYS = 730          # Probabilidades que se publican para el gráfico
+
+def log_returns(close):
+    close = close.astype(np.float64)
+    return np.log(close / close.shift(1)).dropna()
+
+def completed_bars(df):
+    """Cierres de días ya terminados (la última fila es la vela en curso, candles.py)."""
+    today = pd.Timestamp.now(tz="UTC").normalize()
+    if df.index.tz is None: today = today.tz_localize(None)
+    return df['close'][df.index < today]
+
+def make_regime_refresher(refresh):
+    """Ajuste sobre full_history (semanal) + filtrado incremental con las barras diarias del mercado."""
+    def refresh_regime():
+        full_history = refresh.value("full_history")
+        market = (refresh.value("market") or {}).get('frames', {}).get('BTC')
+        previous = refresh.value("regime") or {}
+        model, probs = previous.get('model'), previous.get('probs')
+
+        stale = model is None or time.time() - model.fitted_at > REFIT_DAYS * 86400
+        if not stale: model = copy.copy(model)        # El modelo publicado no se toca
+        else:
+            if full_history is None or full_history.empty: raise RuntimeError("Full history not loaded yet")
+            model = GaussianHMM()
+            probs = model.fit(log_returns(completed_bars(full_history)))
+        if market is not None and not market.empty:
+            close = completed_bars(market)
+            if close.index.tz is not None: close = close.tz_localize(None)
+            new = model.update(log_returns(close))
+            if not new.empty: probs = pd.concat([probs, new])
+
+        current = model.predict(0)
+        return {
+            'model': model,
+            'probs': probs.iloc[-HISTORY_DAYS:].astype(np.float32),
+            'current': dict(zip(model.labels, current.tolist())),
+            'regime': model.labels[int(current.argmax())],
+            'vols': dict(zip(model.labels, model.volatilities.tolist())),
+            'as_of': model.last_date,
+        }
+    return refresh_regime
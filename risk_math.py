@@ -7,11 +7,14 @@ def calculate_volatility(prices, window=30):
     vol = log_returns.rolling(window=window).std() * np.sqrt(365)
     return vol
 
-def simulate_implied_volatility(realized_vol):
+def simulate_implied_volatility(realized_vol, crisis_prob=None):
     """
     Simula IV basándose en RV con un Factor de Pánico Adaptativo.
     - Mercado Normal: Spread moderado.
     - Mercado Crisis (Vol > 60%): Spread exponencial (Liquidity Crunch).
+    - crisis_prob: probabilidad del régimen turbulento (regime.py), alineada con
+      realized_vol. Si se indica, el factor pasa de 0.15 a 0.40 de forma gradual
+      en lugar de con el umbral fijo (los días sin probabilidad usan el umbral).
     """
     # Calculamos el promedio de volatilidad reciente (suavizado)
     vol_avg = realized_vol.rolling(window=10).mean()
@@ -20,6 +23,9 @@ def simulate_implied_volatility(realized_vol):
     # Si la volatilidad promedio supera el 60% (0.6), el factor de miedo sube de 0.15 a 0.40
     # Usamos np.where para aplicarlo a toda la serie de datos eficientemente
     panic_multiplier = np.where(vol_avg > 0.60, 0.40, 0.15)
+    if crisis_prob is not None:
+        p = np.asarray(crisis_prob, dtype=np.float64)
+        panic_multiplier = np.where(np.isnan(p), panic_multiplier, 0.15 + 0.25 * np.clip(p, 0, 1))
     
     # Fórmula: (Volatilidad * Multiplicador Dinámico) + Piso Mínimo (5%)
     spread = (vol_avg * panic_multiplier) + 0.05
@@ -36,10 +42,13 @@ def calculate_mvrv_proxy(df, window=120):
 
 # --- NUEVAS FUNCIONES PARA EL SIMULADOR VaR ---
 
-def calculate_var_metrics(spot_price, volatility, days, confidence_level, loan_amount):
+def calculate_var_metrics(spot_price, volatility, days, confidence_level, loan_amount, regime=None):
     """
     Calcula el Value at Risk (VaR) paramétrico.
+    - regime: modelo de regímenes ajustado (regime.GaussianHMM). Si se indica,
+      la volatilidad es la esperada en el horizonte según la probabilidad de cada régimen.
     """
+    if regime is not None: volatility = regime.horizon_volatility(days)
     # 1. Mapear nivel de confianza a Z-Score estándar
     z_scores = {
         "95.0%": 1.645,
@@ -61,4 +70,44 @@ def calculate_var_metrics(spot_price, volatility, days, confidence_level, loan_a
     # Pero para simplificar, mostramos cuánto valor perdería el BTC
     var_loss_pct = price_drop_pct
     
-    return price_at_var, var_loss_pct
\ No newline at end of file
+    return price_at_var, var_loss_pct
+# --- SIMULADOR DE CRÉDITO (Vista 3) ---
+
+CREDIT_SIM = {
+    'loan': 5_000_000,     # Principal en USD
+    'haircut': 30,         # % de descuento sobre el precio de mercado
+    'ltv': 0.65,           # LTV efectivo
+    'liq_thresh': 0.85,    # Umbral de liquidación
+    'margin_call': 0.75,   # LTV al que se pide más colateral
+}
+CRITICAL_BUFFER = 0.15     # Colchón por debajo del cual la línea está en zona CRÍTICA
+
+def simulate_credit_line(spot_price, loan=None, haircut=None, ltv=None, liq_thresh=None, margin_call=None):
+    """
+    Colateral requerido, precio de liquidación y colchón para un préstamo
+    respaldado por BTC al precio actual.
+    """
+    loan = CREDIT_SIM['loan'] if loan is None else loan
+    haircut = CREDIT_SIM['haircut'] if haircut is None else haircut
+    ltv = CREDIT_SIM['ltv'] if ltv is None else ltv
+    liq_thresh = CREDIT_SIM['liq_thresh'] if liq_thresh is None else liq_thresh
+    margin_call = CREDIT_SIM['margin_call'] if margin_call is None else margin_call
+
+    lending_price = spot_price * (1 - (haircut / 100))
+    collateral_btc = loan / (lending_price * ltv)
+    liq_price = loan / (collateral_btc * (1 - haircut / 100) * liq_thresh)
+    return {
+        'loan': loan, 'haircut': haircut, 'ltv': ltv, 'liq_thresh': liq_thresh, 'margin_call': margin_call,
+        'collateral_btc': collateral_btc,
+        'collateral_usd': collateral_btc * spot_price,
+        'liq_price': liq_price,
+        'margin_call_price': loan / (collateral_btc * (1 - haircut / 100) * margin_call),
+        'buffer_pct': (spot_price - liq_price) / spot_price,
+    }
+
+def credit_buffer(price, line):
+    """
+    Colchón de una línea ya concedida (simulate_credit_line al precio de entrada):
+    el colateral queda fijo y el colchón cae con el precio.
+    """
+    return (price - line['liq_price']) / price
@@ -0,0 +1,69 @@
+import os
+import time
+from functools import lru_cache
+from collections import namedtuple
+
+# ==============================================================================
+# --- RELOJ DE ROTACIÓN COMPARTIDO (Todas las pantallas en paralelo) ---
+# ==============================================================================
+# La posición de la playlist se deriva del reloj de pared del servidor, no de
+# contadores por sesión: dos pantallas que abren en momentos distintos muestran
+# la misma vista en el mismo segundo.
+#   VOLCANO_CYCLE_TIMES="25,25,25,25,25,25"  -> segundos por vista
+#   VOLCANO_ROTATION_EPOCH=0           -> instante (unix) en que empieza la vuelta 0
+DEFAULT_CYCLE_TIMES = (25, 25, 25, 25, 25, 25)
+NEWS_STEP = 10       # Titulares que avanza el ticker en cada paso
+NEWS_PERIOD = 120    # Segundos entre pasos del ticker
+
+Position = namedtuple("Position", "page lap elapsed remaining news_offset")
+
+class PlaylistClock:
+    """
+    - cycle_times: duración de cada vista (una entrada por vista).
+    - epoch: origen común; la vuelta n empieza en epoch + n * sum(cycle_times).
+    """
+    def __init__(self, cycle_times=DEFAULT_CYCLE_TIMES, epoch=0.0, news_step=NEWS_STEP, news_period=NEWS_PERIOD):
+        if not cycle_times or min(cycle_times) <= 0: raise ValueError("cycle_times must be positive")
+        self.cycle_times = tuple(cycle_times)
+        self.epoch = epoch
+        self.news_step = news_step
+        self.news_period = news_period
+        self.total = sum(self.cycle_times)
+
+    @property
+    def views(self):
+        return len(self.cycle_times)
+
+    def position(self, now=None):
+        """Vista actual, vuelta (rota el activo de la Vista 1) y offset del ticker."""
+        t = (now if now is not None else time.time()) - self.epoch
+        lap, into = divmod(t, self.total)
+        page = 0
+        while into >= self.cycle_times[page]:
+            into -= self.cycle_times[page]
+            page += 1
+        news_offset = int(t // self.news_period) * self.news_step
+        return Position(page, int(lap), into, self.cycle_times[page] - into, news_offset)
+
+    def next_change(self, now=None):
+        """Segundos hasta el próximo evento visible (cambio de vista o de titulares)."""
+        now = now if now is not None else time.time()
+        to_news = self.news_period - ((now - self.epoch) % self.news_period)
+        return min(self.position(now).remaining, to_news)
+
+    def config(self):
+        """Parámetros para los clientes del modo broadcast (mismo cálculo en JS)."""
+        return {"cycle_times": list(self.cycle_times), "epoch": self.epoch,
+                "news_step": self.news_step, "news_period": self.news_period}
+
+@lru_cache(maxsize=1)
+def get_playlist_clock():
+    """Reloj configurado por entorno. Debe haber un tiempo por vista del dashboard."""
+    raw = os.getenv("VOLCANO_CYCLE_TIMES")
+    try:
+        cycle_times = tuple(float(x) for x in raw.split(",")) if raw else DEFAULT_CYCLE_TIMES
+        if len(cycle_times) != len(DEFAULT_CYCLE_TIMES) or min(cycle_times) <= 0: raise ValueError
+    except ValueError:
+        print(f"Rotation Config Error: VOLCANO_CYCLE_TIMES={raw!r} needs {len(DEFAULT_CYCLE_TIMES)} positive values")
+        cycle_times = DEFAULT_CYCLE_TIMES
+    return PlaylistClock(cycle_times, epoch=float(os.getenv("VOLCANO_ROTATION_EPOCH", "0")))
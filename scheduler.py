@@ -0,0 +1,253 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import telemetry
+
+# ==============================================================================
+# --- 1. FUENTE DE DATOS CON REFRESCO EN SEGUNDO PLANO ---
+# ==============================================================================
+class BackgroundJob:
+    """
+    Una fuente registrada en el scheduler. Publica el último resultado bueno
+    para que cualquier sesión lo lea sin pagar la latencia.
+    - cadence: vida útil del dato (segundos). Se refresca ANTES de expirar
+      (refresh_ahead) y mientras tanto se sirve el valor anterior (stale-while-revalidate).
+    - jitter: desplazamiento aleatorio (±) para que las fuentes no coincidan.
+    - timeout: si una ejecución tarda más, se abandona y cuenta como fallo.
+    - backoff: tras fallos consecutivos el reintento se duplica hasta max_backoff.
+    - accept: validador opcional; un resultado rechazado cuenta como fallo y
+      se conserva el último valor bueno.
+    - store: si se indica (warmstart.SnapshotStore), cada valor nuevo se guarda
+      en disco y al arrancar se sirve el último guardado hasta revalidar.
+    """
+    def __init__(self, name, fn, interval, timeout=30, max_backoff=None,
+                 jitter=0, priority=5, refresh_ahead=0.1, accept=None, store=None):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff or interval * 8
+        self.jitter = jitter
+        self.priority = priority          # Menor número = más prioridad
+        self.refresh_ahead = refresh_ahead
+        self.accept = accept
+        self.store = store
+
+        self.value = None          # Último resultado bueno
+        self.version = 0           # Sube con cada resultado nuevo
+        self.updated_at = 0        # Última ejecución exitosa
+        self.changed_at = 0        # Última vez que el valor cambió
+        self.next_run_at = 0       # 0 = ejecutar cuanto antes
+        self.failures = 0
+        self.last_error = None
+        self.restored = False      # True mientras se sirve el snapshot del arranque
+
+        self._lock = threading.Lock()
+        self._worker = None        # Hilo de la última ejecución (sigue vivo si se abandonó por timeout)
+
+    @property
+    def expires_at(self):
+        return self.updated_at + self.interval
+
+    def is_stale(self, now=None):
+        return (now or time.time()) >= self.expires_at
+
+    @property
+    def busy(self):
+        """La última ejecución sigue en marcha (p. ej. abandonada por timeout pero sin terminar)."""
+        return self._worker is not None and self._worker.is_alive()
+
+    def next_delay(self):
+        if self.failures == 0:
+            base = self.interval * (1 - self.refresh_ahead)
+            return max(0.0, base + random.uniform(-self.jitter, self.jitter))
+        return min(self.interval * (2 ** self.failures), self.max_backoff)
+
+    def restore(self):
+        """Carga el último snapshot guardado. Queda caducado: se revalida en seguida."""
+        if self.store is None: return False
+        saved = self.store.load(self.name)
+        if saved is None: return False
+        with self._lock:
+            self.value, self.updated_at = saved
+            self.changed_at = self.updated_at
+            self.version = 1
+            self.restored = True
+            self.next_run_at = 0
+        return True
+
+    def run_once(self):
+        """Una ejecución con timeout. Devuelve True si publicó un resultado."""
+        box = {}
+
+        def target():
+            try: box['value'] = self.fn()
+            except Exception as e: box['error'] = e
+
+        t0 = time.perf_counter()
+        worker = threading.Thread(target=target, name=f"job-{self.name}-run", daemon=True)
+        self._worker = worker
+        worker.start()
+        worker.join(self.timeout)
+
+        if worker.is_alive(): error = TimeoutError(f"{self.name} exceeded {self.timeout}s")
+        else: error = box.get('error')
+        if error is None and self.accept is not None and not self.accept(box['value']):
+            error = ValueError(f"{self.name} returned an unusable result")
+        telemetry.observe("volcano_refresh_seconds", "source", self.name, time.perf_counter() - t0, error=error is not None)
+
+        with self._lock:
+            now = time.time()
+            if error is not None:
+                self.failures += 1
+                self.last_error = error
+                self.next_run_at = now + self.next_delay()
+                print(f"Job {self.name} Error: {error}")
+                return False
+            changed = not _same_value(box['value'], self.value)
+            if changed: self.changed_at = now
+            self.value = box['value']
+            self.version += 1
+            self.updated_at = now
+            self.failures = 0
+            self.last_error = None
+            self.restored = False
+            self.next_run_at = now + self.next_delay()
+
+        if changed and self.store is not None:
+            try: mapped = self.store.save(self.name, box['value'])
+            except Exception as e:
+                mapped = None
+                print(f"Job {self.name} Snapshot Error: {e}")
+            # Stores mapeados en disco (colstore.py) devuelven el valor ya mapeado:
+            # se publica ese y la copia descargada se libera
+            if mapped is not None:
+                with self._lock:
+                    if self.value is box['value']: self.value = mapped
+        return True
+
+def _same_value(a, b):
+    # DataFrames no admiten '==' directo como booleano
+    try: return bool(a == b)
+    except Exception: return a is b
+
+# ==============================================================================
+# --- 2. SCHEDULER CENTRAL (Un solo hilo despachador para todas las fuentes) ---
+# ==============================================================================
+# La prioridad solo ordena el envío: dentro de un pool la cola es FIFO. Las
+# fuentes rápidas (precio vivo, alertas, libro) tienen su propio carril para que
+# full_history, backtest o forecast ocupando todos los hilos lentos no dejen
+# congelados los banners durante minutos.
+FAST_CADENCE = 60           # Cadencia (s) por debajo de la cual una fuente va al carril rápido
+
+class RefreshScheduler:
+    """
+    Registra cada fuente con su cadencia, jitter, timeout y prioridad, y las
+    refresca en dos pools pequeños de hilos (rápido y lento). Las lecturas nunca
+    bloquean: devuelven el último valor publicado y su versión.
+    - store: snapshot en disco para las fuentes registradas con persist=True.
+    - fast_workers: hilos del carril rápido (cadencia < FAST_CADENCE).
+    """
+    def __init__(self, max_workers=4, store=None, fast_workers=2):
+        self.jobs = {}
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="refresh")
+        self._fast_pool = ThreadPoolExecutor(max_workers=fast_workers, thread_name_prefix="refresh-fast")
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def register(self, name, fn, cadence, jitter=0, timeout=30, priority=5,
+                 refresh_ahead=0.1, accept=None, max_backoff=None, persist=False, store=None):
+        # store: snapshot propio de esta fuente (p. ej. colstore.ColumnStore); si no, el común con persist=True
+        self.jobs[name] = BackgroundJob(
+            name, fn, cadence, timeout=timeout, max_backoff=max_backoff,
+            jitter=jitter, priority=priority, refresh_ahead=refresh_ahead, accept=accept,
+            store=store or (self.store if persist else None)
+        )
+        # Arranque en caliente: el último dato bueno está disponible antes de la primera descarga
+        self.jobs[name].restore()
+        self._wake.set()
+        return self.jobs[name]
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._dispatch, name="refresh-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def trigger(self, name):
+        """Fuerza el refresco inmediato de una fuente."""
+        self.jobs[name].next_run_at = 0
+        self._wake.set()
+
+    def publish(self, name, value, expected):
+        """
+        Publica un valor derivado del actual de otra fuente (p. ej. live_prices fusiona
+        la vela en curso en 'market') solo si el publicado sigue siendo `expected`:
+        una descarga que haya llegado entretanto gana. Sube la versión pero no
+        updated_at ni changed_at (la fuente no se ha revalidado; el movimiento de
+        precio ya lo vigila heartbeat con su umbral). Devuelve True si se publicó.
+        """
+        job = self.jobs.get(name)
+        if job is None: return False
+        with job._lock:
+            if job.value is not expected: return False
+            job.value = value
+            job.version += 1
+        return True
+
+    # --- Lectura (nunca bloquea) ---
+    def job(self, name):
+        return self.jobs[name]
+
+    def value(self, name, max_age=None):
+        job = self.jobs.get(name)
+        if job is None: return None
+        if max_age is not None and time.time() - job.updated_at > max_age: return None
+        return job.value
+
+    def version(self, name):
+        job = self.jobs.get(name)
+        return job.version if job else 0
+
+    def versions(self, names=None):
+        """{fuente: (versión, edad en segundos)} para mostrar qué dato ve cada vista."""
+        now = time.time()
+        names = names or list(self.jobs)
+        return {n: (self.jobs[n].version, now - self.jobs[n].updated_at) for n in names if n in self.jobs}
+
+    # --- Despacho ---
+    def _due_jobs(self, now):
+        # Una fuente cuya ejecución anterior se abandonó por timeout pero sigue viva
+        # no se relanza: cada fuente tiene como mucho un hilo ocupando CPU
+        with self._lock:
+            due = [j for j in self.jobs.values()
+                   if j.next_run_at <= now and j.name not in self._running and not j.busy]
+            for j in due: self._running.add(j.name)
+        return sorted(due, key=lambda j: j.priority)
+
+    def _lane(self, job):
+        return self._fast_pool if job.interval < FAST_CADENCE else self._pool
+
+    def _finish(self, name):
+        with self._lock: self._running.discard(name)
+        self._wake.set()
+
+    def _dispatch(self):
+        while True:
+            now = time.time()
+            for job in self._due_jobs(now):
+                future = self._lane(job).submit(job.run_once)
+                future.add_done_callback(lambda _f, n=job.name: self._finish(n))
+
+            with self._lock:
+                idle = [j for j in self.jobs.values() if j.name not in self._running]
+            pending = [j.next_run_at for j in idle if not j.busy]
+            sleep_for = max(0.05, min(pending) - time.time()) if pending else 1.0
+            # Hilos abandonados: se vuelve a mirar cada segundo si ya terminaron
+            if len(pending) < len(idle): sleep_for = min(sleep_for, 1.0)
+            self._wake.wait(min(sleep_for, 60))
+            self._wake.clear()
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+import pandas as pd
+import data_fetcher
+
+# ==============================================================================
+# --- COSTE DE LIQUIDAR EL COLATERAL (Recorrer el libro de órdenes) ---
+# ==============================================================================
+# El simulador de crédito supone que el colateral se vende al último precio,
+# pero una liquidación de `collateral_btc` BTC se come los bids nivel a nivel.
+# Con los acumulados de cantidad y nominal de los bids (mejor precio primero),
+# vender q BTC es una búsqueda binaria: el nivel donde cum_qty alcanza q da el
+# precio peor y el nominal cobrado sale de los acumulados sin recorrer niveles.
+# Todos los tamaños de una cartera de préstamos se evalúan en una sola llamada.
+BOOK_SYMBOL = "BTC/USD"
+BOOK_LEVELS = 5000              # Niveles por lado que se piden a Bitstamp (libro agrupado)
+LOAN_BOOK = (1, 2, 5, 10)       # Líneas iguales liquidadas a la vez (cascada de margin calls)
+
+class BookDepth:
+    """
+    Lado comprador del libro con sus acumulados, listo para cualquier tamaño de venta.
+    - book: DataFrame de data_fetcher.fetch_order_book_ccxt (price, amount, side, is_simulated).
+    El slippage se mide contra el mid del propio libro, no contra el precio vivo
+    de otro exchange.
+    """
+    def __init__(self, book):
+        bids = book[book['side'] == 'bid']
+        price = bids['price'].to_numpy(dtype=np.float64)
+        amount = bids['amount'].to_numpy(dtype=np.float64)
+        keep = (price > 0) & (amount > 0)
+        order = np.argsort(-price[keep], kind='stable')
+        self.price, amount = price[keep][order], amount[keep][order]
+        if not len(self.price): raise ValueError("Order book has no bids")
+        self.cum_qty = np.cumsum(amount)
+        self.cum_notional = np.cumsum(self.price * amount)
+
+        asks = book.loc[book['side'] == 'ask', 'price']
+        asks = asks[asks > 0]
+        self.best_bid = float(self.price[0])
+        self.mid = (self.best_bid + float(asks.min())) / 2 if len(asks) else self.best_bid
+        self.depth_btc = float(self.cum_qty[-1])
+        self.simulated = bool(book['is_simulated'].any()) if 'is_simulated' in book.columns else False
+        self.fetched_at = time.time()
+
+    def sell(self, sizes):
+        """
+        Venta a mercado de cada tamaño (BTC) contra los bids, todos a la vez.
+        DataFrame indexado por tamaño: filled_btc, proceeds (USD), vwap, slippage
+        (fracción bajo el mid), worst_price, levels, shortfall_btc (lo que el libro
+        no absorbe) y exhausted.
+        """
+        sizes = np.atleast_1d(np.asarray(sizes, dtype=np.float64))
+        filled = np.clip(sizes, 0.0, self.depth_btc)
+        # Nivel donde se llena la última unidad de cada venta
+        level = np.minimum(np.searchsorted(self.cum_qty, filled, side='left'), len(self.price) - 1)
+        before_qty = np.where(level > 0, self.cum_qty[level - 1], 0.0)
+        before_notional = np.where(level > 0, self.cum_notional[level - 1], 0.0)
+        proceeds = before_notional + (filled - before_qty) * self.price[level]
+        empty = filled <= 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = np.where(empty, self.best_bid, proceeds / filled)
+        return pd.DataFrame({
+            'filled_btc': filled,
+            'proceeds': proceeds,
+            'vwap': vwap,
+            'slippage': 1 - vwap / self.mid,
+            'worst_price': np.where(empty, self.best_bid, self.price[level]),
+            'levels': np.where(empty, 0, level + 1),
+            'shortfall_btc': sizes - filled,
+            'exhausted': sizes > self.depth_btc,
+        }, index=pd.Index(sizes, name='size_btc'))
+
+def collateral_liquidation(depth, sim, loan_book=LOAN_BOOK):
+    """
+    Coste de vender el colateral de la línea (risk_math.simulate_credit_line) y el
+    de N líneas iguales a la vez. Sin libro -> None.
+    """
+    if depth is None or not sim: return None
+    loans = np.asarray(loan_book, dtype=np.float64)
+    fills = depth.sell(sim['collateral_btc'] * loans)
+    fills.index = pd.Index(loan_book, name='loans')
+    single = fills.iloc[0]
+    return {
+        'fills': fills,
+        'slippage': float(single['slippage']),
+        'vwap': float(single['vwap']),
+        # Lo que se recupera si la liquidación salta en liq_price con la misma forma de libro
+        'liq_proceeds': float(sim['collateral_btc'] * sim['liq_price'] * (1 - single['slippage'])),
+        'depth_btc': depth.depth_btc,
+        'simulated': depth.simulated,
+        'age': time.time() - depth.fetched_at,
+    }
+
+# ==============================================================================
+# --- FUENTE PARA EL SCHEDULER ---
+# ==============================================================================
+def refresh_book_depth(symbol=BOOK_SYMBOL, limit=BOOK_LEVELS):
+    """Libro nuevo de Bitstamp (o el simulado si falla) ya acumulado para las sesiones."""
+    return BookDepth(data_fetcher.fetch_order_book_ccxt(symbol, limit=limit))
@@ -0,0 +1,119 @@
+import pandas as pd
+import data_fetcher, news_fetcher, scheduler, correlation, warmstart, colstore, hashrate, derivatives, etfs, alerts, candles, ivsurface, backtest, regime, slippage, liquidation
+
+# ==============================================================================
+# --- FUENTES DEL DASHBOARD (Compartidas por Streamlit y el modo broadcast) ---
+# ==============================================================================
+
+# --- LÓGICA DE PROPHET (AI FORECAST) ---
+# Intentamos importar Prophet. Si falla (por errores de C++ en Mac), usamos fallback.
+HAS_PROPHET = False
+try:
+    from prophet import Prophet
+    HAS_PROPHET = True
+except ImportError:
+    pass
+
+def train_forecast(df):
+    """Entrena Prophet sobre el frame de mercado (lo ejecuta el scheduler cada 1 hora)"""
+    if df is None or df.empty: raise ValueError("Market data not loaded yet")
+
+    # Preparamos datos
+    ph_df = df.reset_index()[['Date', 'close']].rename(columns={'Date': 'ds', 'close': 'y'})
+    if ph_df['ds'].dt.tz is not None: ph_df['ds'] = ph_df['ds'].dt.tz_localize(None)
+
+    # Entrenamos (Rápido)
+    m = Prophet(daily_seasonality=True, changepoint_prior_scale=0.15)
+    m.fit(ph_df)
+
+    # Predicción 30 días
+    future = m.make_future_dataframe(periods=30)
+    forecast = m.predict(future)
+    return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+# Cada fuente con su cadencia (s), jitter (±s), timeout (s) y prioridad (0 = máxima).
+# Se refrescan ANTES de expirar y las pantallas siempre leen el último dato bueno.
+_has_rows = lambda df: df is not None and not df.empty
+_has_btc = lambda m: bool(m) and 'BTC' in m['frames']
+
+def make_macro_refresher(window=30):
+    """Macro + motor de correlación: cada refresco solo procesa las fechas nuevas."""
+    engine = correlation.RollingCorrelationEngine(window=window, base="Bitcoin")
+
+    def refresh_macro():
+        prices = data_fetcher.fetch_macro_prices(period="1y")
+        if prices.empty: return None
+        engine.update(prices)
+        recent = prices[prices.index >= prices.index[-1] - pd.DateOffset(months=6)] # 6 meses para el gráfico macro
+        return {
+            'normalized': data_fetcher.normalize_returns(recent),
+            'corr_history': engine.base_history(),
+            'corr_matrix': engine.matrix(),
+        }
+    return refresh_macro
+
+def build_refresh_scheduler(max_workers=4, store=None):
+    """
+    Registra todas las fuentes. Quien lo llame decide cuándo hacer start().
+    Las fuentes con persist=True arrancan desde el snapshot en disco (warmstart.py).
+    Las de cadencia < scheduler.FAST_CADENCE (live_prices, order_book, alerts) van
+    al carril rápido: las descargas lentas no las bloquean.
+    """
+    refresh = scheduler.RefreshScheduler(max_workers=max_workers, store=store or warmstart.get_store())
+    # Las fuentes que leen el valor de otra fallan mientras esa no haya publicado
+    # (arranque en frío): max_backoff=300 para que reintenten a los 5 minutos en
+    # vez de esperar interval*8.
+    # Multi-activo: una petición a Kraken y un panel (fecha x activo) para BTC, ETH, SOL...
+    # Cada tick se fusiona en la vela del día del frame de mercado cacheado (candles.py)
+    refresh.register("live_prices", candles.make_live_refresher(refresh),
+                     cadence=5, jitter=1, timeout=3, priority=0, accept=lambda p: p is not None, max_backoff=60)
+    # Libro de órdenes BTC ya acumulado: coste de liquidar el colateral del simulador de crédito (slippage.py)
+    refresh.register("order_book", slippage.refresh_book_depth,
+                     cadence=30, jitter=5, timeout=10, priority=1)
+    refresh.register("market", lambda: data_fetcher.fetch_multi_asset_data(period="2y", interval="1d"),
+                     cadence=600, jitter=30, timeout=45, priority=0, accept=_has_btc, persist=True)
+    # ETFs spot: cesta concurrente, solo se re-descargan los tickers cuya última barra cambió
+    refresh.register("etf", etfs.make_etf_refresher(),
+                     cadence=300, jitter=30, timeout=30, priority=2, persist=True)
+    refresh.register("breaking", lambda: news_fetcher.check_for_breaking_video(raise_errors=True),
+                     cadence=300, jitter=20, timeout=20, priority=1, max_backoff=1800)
+    refresh.register("news", lambda: news_fetcher.fetch_sentinel_news(limit=40),
+                     cadence=600, jitter=60, timeout=30, priority=2, persist=True)
+    refresh.register("fng", data_fetcher.fetch_fear_and_greed_index,
+                     cadence=600, jitter=60, timeout=10, priority=2, persist=True)
+    refresh.register("macro", make_macro_refresher(),
+                     cadence=3600, jitter=120, timeout=60, priority=3, accept=lambda m: m is not None, persist=True)
+    # Historial completo: en el almacén columnar mapeado (colstore.py), compartido por
+    # todas las sesiones y procesos sin copias; arranca desde el último mapeo en disco
+    columns = colstore.get_store()
+    refresh.register("full_history", data_fetcher.fetch_full_history,
+                     cadence=3600*12, jitter=600, timeout=120, priority=4, accept=_has_rows, persist=True, store=columns)
+    # Derivados: histórico incremental de funding/OI; el OI en BTC usa el precio vivo ya publicado
+    refresh_derivatives = derivatives.make_derivatives_refresher()
+    refresh.register("derivatives", lambda: refresh_derivatives((refresh.value("live_prices", max_age=60) or {}).get('BTC')),
+                     cadence=600, jitter=60, timeout=20, priority=3, persist=True, max_backoff=300)
+    # Opciones: superficie de IV invirtiendo toda la cadena de Deribit (ivsurface.py)
+    refresh.register("iv_surface", ivsurface.make_iv_refresher(refresh),
+                     cadence=900, jitter=60, timeout=30, priority=3, persist=True)
+    # Montecarlo de barreras del crédito: se simula aquí al cambiar de bucket de sigma
+    # (IV de Deribit o realizada); el render solo consulta el ensemble (liquidation.py)
+    refresh.register("credit_paths", liquidation.make_paths_refresher(refresh),
+                     cadence=60, jitter=5, timeout=30, priority=3, accept=lambda e: e is not None, max_backoff=300)
+    # Hash rate: almacén incremental propio + señales; la valoración usa el historial de precio
+    refresh_hash = hashrate.make_hash_refresher()
+    refresh.register("hash_rate", lambda: refresh_hash(refresh.value("full_history")),
+                     cadence=3600*6, jitter=600, timeout=60, priority=4, accept=_has_rows, persist=True, store=columns,
+                     max_backoff=300)
+    # Regímenes de volatilidad: HMM ajustado con el historial completo, filtrado barra a barra (regime.py)
+    refresh.register("regime", regime.make_regime_refresher(refresh),
+                     cadence=600, jitter=60, timeout=60, priority=4, persist=True, max_backoff=300)
+    # Backtest de las señales del dashboard + barridos de parámetros en varios procesos (backtest.py)
+    refresh.register("backtest", lambda: backtest.run_backtests(refresh.value("full_history")),
+                     cadence=3600*12, jitter=600, timeout=300, priority=5, persist=True, max_backoff=300)
+    # Alertas de mercado: un tick por precio vivo sobre el último frame BTC (alerts.py)
+    refresh.register("alerts", alerts.make_alert_refresher(refresh),
+                     cadence=5, jitter=1, timeout=3, priority=0, max_backoff=60)
+    if HAS_PROPHET:
+        refresh.register("forecast", lambda: train_forecast((refresh.value("market") or {}).get('frames', {}).get('BTC')),
+                         cadence=3600, jitter=120, timeout=300, priority=5, persist=True, max_backoff=300)
+    return refresh
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import logging
+import threading
+from functools import wraps
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==============================================================================
+# --- CONFIGURACIÓN ---
+# ==============================================================================
+# VOLCANO_METRICS=1          -> activa la instrumentación
+# VOLCANO_METRICS_PORT=9109  -> endpoint Prometheus en http://host:PORT/metrics
+# VOLCANO_METRICS_LOG=path   -> además, vuelca percentiles a un log rotativo
+METRIC_HELP = {
+    "volcano_section_seconds": "Duration of each main.py rerun section",
+    "volcano_rerun_seconds": "Duration of a full main.py rerun",
+    "volcano_heartbeat_seconds": "Time a session slept between full reruns, by wake reason",
+    "volcano_upstream_seconds": "Latency of each upstream call (yfinance, HTTP, RSS, YouTube)",
+    "volcano_refresh_seconds": "Duration of each scheduler refresh job",
+    "volcano_chart_seconds": "Time spent building each chart figure",
+    "volcano_broadcast_seconds": "Broadcast bundle render and write time",
+}
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 2048   # Muestras recientes por serie (percentiles sobre ventana deslizante)
+
+class _State:
+    enabled = os.getenv("VOLCANO_METRICS", "0").lower() in ("1", "true", "yes")
+
+def configure(enabled=None):
+    """Relee el entorno (llamar tras load_dotenv) o fuerza el estado."""
+    if enabled is None: enabled = os.getenv("VOLCANO_METRICS", "0").lower() in ("1", "true", "yes")
+    _State.enabled = enabled
+    return enabled
+
+def is_enabled():
+    return _State.enabled
+
+# ==============================================================================
+# --- 1. HISTOGRAMAS (Summary con ventana deslizante) ---
+# ==============================================================================
+class Summary:
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if error: self.errors += 1
+
+    def quantiles(self):
+        with self.lock: data = sorted(self.samples)
+        if not data: return {q: 0.0 for q in QUANTILES}
+        return {q: data[min(len(data) - 1, int(q * len(data)))] for q in QUANTILES}
+
+_registry = {}   # (métrica, etiqueta, valor) -> Summary
+_registry_lock = threading.Lock()
+
+def _summary(metric, label, value):
+    key = (metric, label, value)
+    s = _registry.get(key)
+    if s is None:
+        with _registry_lock: s = _registry.setdefault(key, Summary())
+    return s
+
+def observe(metric, label, value, seconds, error=False):
+    if _State.enabled: _summary(metric, label, value).observe(seconds, error)
+
+# ==============================================================================
+# --- 2. CRONÓMETROS ---
+# ==============================================================================
+class _Timer:
+    __slots__ = ("metric", "label", "value", "t0")
+
+    def __init__(self, metric, label, value):
+        self.metric, self.label, self.value = metric, label, value
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _summary(self.metric, self.label, self.value).observe(time.perf_counter() - self.t0, error=exc_type is not None)
+        return False
+
+class _NullTimer:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NULL = _NullTimer()
+
+def timer(metric, label, value):
+    """with telemetry.timer('volcano_upstream_seconds', 'source', 'kraken'): ..."""
+    return _Timer(metric, label, value) if _State.enabled else _NULL
+
+def timed(metric, label="name"):
+    """Decorador: mide cada llamada usando el nombre de la función como etiqueta."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _State.enabled: return fn(*args, **kwargs)
+            with _Timer(metric, label, fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class RerunTrace:
+    """
+    Traza secuencial de un rerun de main.py: cada mark() cierra la sección
+    anterior y abre la siguiente, sin reindentar el script.
+    """
+    def __init__(self):
+        self.start = self.t = time.perf_counter()
+        self.section = None
+
+    def mark(self, section):
+        if not _State.enabled: return
+        now = time.perf_counter()
+        if self.section: _summary("volcano_section_seconds", "section", self.section).observe(now - self.t)
+        self.section, self.t = section, now
+
+    def end(self):
+        if not _State.enabled: return
+        self.mark(None)
+        _summary("volcano_rerun_seconds", "page", "main").observe(time.perf_counter() - self.start)
+
+# ==============================================================================
+# --- 3. EXPORTACIÓN (Prometheus texto / log rotativo) ---
+# ==============================================================================
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def render_prometheus():
+    lines = []
+    by_metric = {}
+    for (metric, label, value), s in list(_registry.items()):
+        by_metric.setdefault(metric, []).append((label, value, s))
+
+    for metric in sorted(by_metric):
+        lines.append(f"# HELP {metric} {METRIC_HELP.get(metric, metric)}")
+        lines.append(f"# TYPE {metric} summary")
+        for label, value, s in sorted(by_metric[metric], key=lambda x: str(x[1])):
+            tag = f'{label}="{_escape(value)}"'
+            for q, v in s.quantiles().items():
+                lines.append(f'{metric}{{{tag},quantile="{q}"}} {v:.6f}')
+            lines.append(f"{metric}_sum{{{tag}}} {s.total:.6f}")
+            lines.append(f"{metric}_count{{{tag}}} {s.count}")
+            if s.errors: lines.append(f"{metric}_errors_total{{{tag}}} {s.errors}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """{métrica: {valor: {p50, p95, p99, count}}} para logs o depuración."""
+    out = {}
+    for (metric, _, value), s in list(_registry.items()):
+        q = s.quantiles()
+        out.setdefault(metric, {})[str(value)] = {
+            "p50": q[0.5], "p95": q[0.95], "p99": q[0.99], "count": s.count, "errors": s.errors
+        }
+    return out
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_metrics_server(port=None):
+    """Servidor /metrics en un hilo daemon. Devuelve el servidor o None si falla."""
+    port = int(port or os.getenv("VOLCANO_METRICS_PORT", "9109"))
+    try:
+        server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        print(f"Metrics Server Error: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+def start_metrics_log(path=None, interval=60, max_bytes=5_000_000, backups=3):
+    """Vuelca snapshot() cada `interval` segundos a un log rotativo (JSON por línea)."""
+    path = path or os.getenv("VOLCANO_METRICS_LOG")
+    if not path: return None
+    logger = logging.getLogger("volcano.metrics")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups))
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            logger.info(json.dumps({"t": time.time(), "metrics": snapshot()}))
+
+    threading.Thread(target=loop, name="metrics-log", daemon=True).start()
+    return logger
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+import alerts
+import risk_math
+
+def test_engines_do_not_share_rate_of_change_windows():
+    a = alerts.AlertEngine()
+    for t in range(0, 3600, 5):
+        a.update({'price': 100.0}, t=t)
+    # Motor nuevo con las mismas reglas por defecto: sin una hora de historial no hay caída
+    b = alerts.AlertEngine()
+    fired = b.update({'price': 90.0}, t=3600) + b.update({'price': 90.0}, t=3605)
+    assert not [x for x in fired if x['rule'] == 'btc_crash_1h']
+
+def test_rate_of_change_fires_on_its_own_window():
+    engine = alerts.AlertEngine()
+    fired = []
+    for t in range(0, 3600, 60):
+        fired += engine.update({'price': 100.0}, t=t)
+    for t in (3600, 3660):
+        fired += engine.update({'price': 90.0}, t=t)
+    crash = [x for x in fired if x['rule'] == 'btc_crash_1h']
+    assert len(crash) == 1 and crash[0]['value'] < -5
+
+def test_credit_buffer_falls_with_price_for_a_booked_line():
+    line = risk_math.simulate_credit_line(96000)
+    buffers = [risk_math.credit_buffer(p, line) for p in (150000, 96000, 60000)]
+    assert buffers[0] > buffers[1] > buffers[2]
+    assert abs(buffers[1] - line['buffer_pct']) < 1e-12
+
+def test_credit_critical_can_fire():
+    btc = pd.DataFrame({'close': [96000.0], 'z_score': [0.0], 'volatility': [0.5], 'sma_50': [90000.0]})
+    line = risk_math.simulate_credit_line(96000)
+    # Justo por encima del precio de liquidación: colchón < CRITICAL_BUFFER
+    price = line['liq_price'] * 1.05
+    engine = alerts.AlertEngine()
+    fired = []
+    for t in (0, 5):
+        fired += engine.update(alerts.market_metrics(btc, price, line), t=t)
+    assert [x['rule'] for x in fired].count('credit_critical') == 1
+
+def test_market_metrics_without_line_has_no_buffer():
+    btc = pd.DataFrame({'close': [96000.0], 'z_score': [0.0], 'volatility': [0.5], 'sma_50': [90000.0]})
+    assert 'credit_buffer' not in alerts.market_metrics(btc)
@@ -0,0 +1,12 @@
+import backtest
+
+def test_small_grids_stay_in_process(monkeypatch):
+    monkeypatch.delenv("VOLCANO_BACKTEST_WORKERS", raising=False)
+    assert backtest.default_workers(3650 * backtest.grid_size()) == 1
+    assert backtest.default_workers(backtest.PARALLEL_MIN_CELLS) >= 1
+
+def test_env_forces_worker_count(monkeypatch):
+    monkeypatch.setenv("VOLCANO_BACKTEST_WORKERS", "3")
+    assert backtest.default_workers(10) == 3
+    monkeypatch.setenv("VOLCANO_BACKTEST_WORKERS", "many")
+    assert backtest.default_workers(10) == 1
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+import candles
+import data_fetcher
+import scheduler
+from benchmarks import synthetic_ohlcv
+
+def market(days=300):
+    """Salida de fetch_multi_asset_data para BTC y ETH sobre datos sintéticos."""
+    raw = {'BTC': synthetic_ohlcv(days), 'ETH': synthetic_ohlcv(days, start_price=2000.0, seed=3)}
+    panel = {f: pd.DataFrame({c: df[f] for c, df in raw.items()}) for f in data_fetcher.PANEL_FIELDS}
+    indicators = data_fetcher.compute_panel_indicators(panel['close'])
+    return {'assets': list(raw), 'panel': panel, 'indicators': indicators,
+            'frames': {c: data_fetcher.asset_frame(panel, indicators, c) for c in raw}}
+
+def snapshot(multi):
+    return {'frames': {c: df.copy() for c, df in multi['frames'].items()},
+            'panel': {f: w.copy() for f, w in multi['panel'].items()},
+            'indicators': {f: w.copy() for f, w in multi['indicators'].items()}}
+
+def assert_untouched(multi, before):
+    for key in ('frames', 'panel', 'indicators'):
+        for name, df in before[key].items():
+            pd.testing.assert_frame_equal(multi[key][name], df)
+
+def test_apply_leaves_the_published_market_untouched():
+    multi = market()
+    before = snapshot(multi)
+    last = multi['frames']['BTC'].index[-1]
+    tick = float(multi['frames']['BTC']['close'].iloc[-1]) * 1.05
+    agg = candles.CandleAggregator()
+
+    same_day = agg.apply(multi, {'BTC': tick}, t=(last + pd.Timedelta(hours=3)).timestamp())
+    assert_untouched(multi, before)
+    assert same_day is not multi and same_day['frames']['BTC'] is not multi['frames']['BTC']
+    assert same_day['frames']['ETH'] is multi['frames']['ETH']       # Sin tick: se comparte
+    assert same_day['frames']['BTC']['close'].iloc[-1] == np.float32(tick)
+    assert same_day['panel']['close']['BTC'].iloc[-1] == np.float32(tick)
+
+    next_day = agg.apply(same_day, {'BTC': tick}, t=(last + pd.Timedelta(days=1, hours=1)).timestamp())
+    assert len(next_day['frames']['BTC']) == len(multi['frames']['BTC']) + 1
+    assert len(next_day['panel']['close']) == len(multi['panel']['close']) + 1
+    assert len(same_day['panel']['close']) == len(multi['panel']['close'])
+    assert_untouched(multi, before)
+
+def test_live_refresher_publishes_a_new_market(monkeypatch):
+    refresh = scheduler.RefreshScheduler()
+    job = refresh.register("market", lambda: None, cadence=600)
+    job.value, job.version, job.changed_at = market(), 1, 123.0
+    published = job.value
+    monkeypatch.setattr(data_fetcher, "fetch_live_prices", lambda: {'BTC': 50000.0})
+
+    candles.make_live_refresher(refresh)()
+    assert refresh.value("market") is not published
+    assert refresh.value("market")['frames']['BTC']['close'].iloc[-1] == 50000.0
+    assert job.version == 2 and job.changed_at == 123.0
+
+def test_publish_loses_to_a_newer_download():
+    refresh = scheduler.RefreshScheduler()
+    job = refresh.register("market", lambda: None, cadence=600)
+    old, fresh = {'frames': {}}, {'frames': {}}
+    job.value = fresh                                  # Descarga publicada mientras se fusionaba el tick
+    assert not refresh.publish("market", {'frames': {}}, expected=old)
+    assert refresh.value("market") is fresh
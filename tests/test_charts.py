@@ -0,0 +1,62 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import charts
+from benchmarks import synthetic_ohlcv
+
+def decode(array):
+    """Array de una traza tal como viaja al navegador (binario base64 de Plotly o lista)."""
+    if isinstance(array, dict): return np.frombuffer(base64.b64decode(array['bdata']), dtype=array['dtype'])
+    return np.asarray(array)
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_date_axis_any_unit(unit):
+    index = pd.date_range("2024-03-01", periods=5, freq="D").as_unit(unit)
+    x = charts.date_axis(index)
+    assert x.dtype == np.float64
+    assert pd.Timestamp(x[0], unit="ms") == index[0]
+    assert pd.Timestamp(x[-1], unit="ms") == index[-1]
+
+@pytest.mark.parametrize("unit", ["s", "us"])
+def test_price_volume_x_decodes_to_index(unit):
+    df = synthetic_ohlcv(400)
+    df.index = df.index.as_unit(unit)
+    fig = charts.create_price_volume_chart(df)
+    plot_index = df.index[-365:]
+    x = decode(fig.to_plotly_json()['data'][0]['x'])
+    assert pd.Timestamp(x[0], unit="ms") == plot_index[0]
+    assert pd.Timestamp(x[-1], unit="ms") == plot_index[-1]
+
+def test_price_volume_keeps_one_figure_per_asset():
+    btc, eth = synthetic_ohlcv(400, seed=1), synthetic_ohlcv(400, seed=2)
+    first_btc = charts.create_price_volume_chart(btc, "BTC")
+    first_eth = charts.create_price_volume_chart(eth, "ETH")
+    # Alternar activos no invalida la figura del otro: mismo frame -> misma figura, sin trabajo
+    assert charts.create_price_volume_chart(btc, "BTC") is first_btc
+    assert charts.create_price_volume_chart(eth, "ETH") is first_eth
+
+def regime_state(index, turbulent):
+    """Salida mínima de regime.make_regime_refresher con P(Turbulent) constante (sin la vela en curso)."""
+    days = index[:-1].tz_localize(None) if index.tz is not None else index[:-1]
+    probs = pd.DataFrame({'Calm': 1 - turbulent, 'Normal': 0.0, 'Turbulent': turbulent}, index=days).astype(np.float32)
+    return {'probs': probs, 'regime': 'Turbulent' if turbulent > 0.5 else 'Calm', 'current': probs.iloc[-1].to_dict()}
+
+def test_volatility_proxy_follows_turbulent_probability():
+    df = synthetic_ohlcv(400)
+    df.index = df.index.tz_localize("UTC")
+    df['volatility'] = 0.3
+    df['implied_vol'] = 0.0
+    proxy = lambda fig: decode(fig.to_plotly_json()['data'][1]['y'])
+    calm = proxy(charts.create_volatility_chart(df, regime=regime_state(df.index, 0.0)))
+    panic = proxy(charts.create_volatility_chart(df, regime=regime_state(df.index, 1.0)))
+    # Factor de pánico 0.15 -> 0.40 sobre vol 30%, más el piso del 5%; la vela en curso hereda el último día
+    np.testing.assert_allclose(calm, 0.3 + 0.3 * 0.15 + 0.05)
+    np.testing.assert_allclose(panic, 0.3 + 0.3 * 0.40 + 0.05)
+
+def test_volatility_chart_is_timed_and_helper_is_not():
+    # @telemetry.timed deja __wrapped__ (functools.wraps)
+    assert hasattr(charts.create_volatility_chart, '__wrapped__')
+    assert not hasattr(charts.turbulent_probability, '__wrapped__')
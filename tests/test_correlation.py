@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+import correlation
+
+def macro_prices(days=90, seed=7):
+    rng = np.random.default_rng(seed)
+    idx = pd.date_range("2025-01-01", periods=days, freq="D")
+    r = rng.normal(0, 0.02, (days, 3))
+    r[:, 1] += 0.5 * r[:, 0]
+    return pd.DataFrame(100 * np.exp(np.cumsum(r, axis=0)), index=idx, columns=["Bitcoin", "Nasdaq", "Gold"])
+
+def test_in_progress_bar_is_not_consumed():
+    prices = macro_prices()
+    today = prices.index[-1]
+    # Refresco intradía: la última fila todavía se mueve
+    intraday = prices.copy()
+    intraday.iloc[-1] *= 1.03
+    engine = correlation.RollingCorrelationEngine(window=30)
+    engine.update(intraday, today=today)
+    assert engine.last_date == prices.index[-2]
+
+    # Al día siguiente llega el cierre definitivo y entra como barra nueva
+    engine.update(prices, today=today + pd.Timedelta(days=1))
+    reference = correlation.RollingCorrelationEngine(window=30).update(prices, today=today + pd.Timedelta(days=1))
+    assert engine.last_date == today
+    np.testing.assert_allclose(engine.matrix(), reference.matrix())
+    pd.testing.assert_frame_equal(engine.base_history(), reference.base_history())
+
+def test_incremental_updates_match_bootstrap():
+    prices = macro_prices()
+    tomorrow = prices.index[-1] + pd.Timedelta(days=1)
+    engine = correlation.RollingCorrelationEngine(window=30)
+    for end in range(45, len(prices) + 1, 5):
+        engine.update(prices.iloc[:end], today=tomorrow)
+    reference = correlation.RollingCorrelationEngine(window=30).update(prices, today=tomorrow)
+    pd.testing.assert_frame_equal(engine.base_history(), reference.base_history())
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_fetcher
+import hashrate
+import upstream
+
+START = pd.Timestamp("2024-01-01")
+DAYS = 200
+DROP = (90, 110)          # Días con el hash rate hundido (capitulación)
+REVISED = 150             # Día que blockchain.com corrige en la descarga de 90 días
+
+def hash_series(days=DAYS):
+    """Hash rate (TH/s) creciente con un hundimiento de 20 días."""
+    i = np.arange(days)
+    values = 5e8 * (1 + 0.002 * i)
+    values[DROP[0]:DROP[1]] *= 0.7
+    # Misma unidad que fetch_hash_rate (segundos de la API)
+    index = pd.date_range(START, periods=days, freq="D", name="Date").as_unit("s")
+    return pd.Series(values, index=index, name="hash_rate")
+
+def blockchain_values(series):
+    """Formato de la API de charts: [{x: unix segundos, y: TH/s}] (con hora, como la real)."""
+    x = (series.index + pd.Timedelta(hours=6)).as_unit("s").asi8
+    return [{'x': int(t), 'y': float(y)} for t, y in zip(x, series)]
+
+def daily_prices(close=60000.0):
+    """Lo que publica full_history: cierres diarios con zona UTC."""
+    return pd.DataFrame({'close': np.full(DAYS, close)},
+                        index=pd.date_range(START, periods=DAYS, freq="D", tz="UTC"))
+
+def url(timespan):
+    return f"{data_fetcher.HASH_RATE_URL}?timespan={timespan}&format=json&sampled=false"
+
+@pytest.fixture
+def replay_feed(tmp_path, monkeypatch):
+    """
+    Log grabado con el propio formato de upstream: la carga completa ('all', 180
+    días) y una actualización de 90 días con 20 días nuevos y uno corregido.
+    Devuelve la serie final que debería quedar fusionada.
+    """
+    truth = hash_series()
+    initial = truth.iloc[:180]
+    update = truth.iloc[-90:].copy()
+    update.iloc[REVISED - (DAYS - 90)] *= 1.05
+    log = tmp_path / "feed_log.jsonl.gz"
+
+    monkeypatch.setenv("VOLCANO_FEED_LOG", str(log))
+    upstream._record(f"http:{url('all')}", payload={'values': blockchain_values(initial)})
+    upstream._record(f"http:{url('90days')}", payload={'values': blockchain_values(update)})
+
+    monkeypatch.setenv("VOLCANO_FEED_MODE", "replay")
+    monkeypatch.setenv("VOLCANO_REPLAY_SPEED", "0")
+    monkeypatch.setattr(upstream, "_replay", None)
+    return update.combine_first(initial)
+
+def test_fetch_hash_rate_replays_daily_frame(replay_feed):
+    df = data_fetcher.fetch_hash_rate("all")
+    assert list(df.columns) == ['hash_rate'] and df.index.name == 'Date'
+    assert df.index[0] == START and len(df) == 180
+    np.testing.assert_allclose(df['hash_rate'], hash_series().iloc[:180])
+
+def test_ribbon_signals_mark_capitulation_and_recovery():
+    signals = hashrate.ribbon_signals(hash_series())
+    assert list(signals.columns) == hashrate.SIGNAL_COLUMNS
+    # Sin media lenta completa no hay régimen ni eventos
+    warmup = signals.iloc[:hashrate.SLOW - 1]
+    assert warmup['ma_slow'].isna().all() and not warmup[['capitulating', 'capitulation', 'recovery']].any().any()
+
+    capitulations = signals.index[signals['capitulation']]
+    recoveries = signals.index[signals['recovery']]
+    # Un solo ciclo: la rápida cruza durante el hundimiento y vuelve después
+    assert len(capitulations) == 1 and len(recoveries) == 1
+    assert START + pd.Timedelta(days=DROP[0]) <= capitulations[0] < START + pd.Timedelta(days=DROP[1])
+    assert recoveries[0] > START + pd.Timedelta(days=DROP[1])
+    between = signals.loc[capitulations[0]:recoveries[0]].iloc[:-1]
+    assert between['capitulating'].all() and (between['ribbon'] < 0).all()
+
+def test_incremental_update_equals_full_recompute(replay_feed):
+    engine = hashrate.HashRibbonEngine()
+    refresh = hashrate.make_hash_refresher(engine)
+    refresh(daily_prices())                     # 'all'
+    assert len(engine.frame) == 180
+    fresh = engine.update(data_fetcher.fetch_hash_rate("90days"))
+    # Solo se recalcula desde el día corregido
+    assert fresh.index[0] == START + pd.Timedelta(days=REVISED)
+
+    full = hashrate.ribbon_signals(replay_feed)
+    pd.testing.assert_frame_equal(engine.frame, full, check_freq=False)
+    # Sin cambios, la misma descarga no recalcula nada
+    assert engine.update(data_fetcher.fetch_hash_rate("90days")).empty
+
+def test_store_round_trip_continues_incrementally(replay_feed, tmp_path):
+    path = str(tmp_path / "hash_rate_store.pkl")
+    hashrate.HashRibbonEngine(path).update(data_fetcher.fetch_hash_rate("all"))
+    reloaded = hashrate.HashRibbonEngine(path)
+    assert not reloaded.empty
+    signals = hashrate.make_hash_refresher(reloaded)(daily_prices())    # '90days': el almacén ya tiene datos
+    pd.testing.assert_frame_equal(signals[hashrate.SIGNAL_COLUMNS],
+                                  hashrate.ribbon_signals(replay_feed), check_freq=False)
+
+def test_latest_status(replay_feed):
+    engine = hashrate.HashRibbonEngine()
+    refresh = hashrate.make_hash_refresher(engine)
+    refresh(daily_prices())
+    status = hashrate.latest_status(refresh(daily_prices()))
+
+    full = hashrate.ribbon_signals(replay_feed)
+    recovery = full.index[full['recovery']][-1]
+    assert status['regime'] == "HEALTHY"
+    assert status['last_event'] == "Recovery" and status['last_event_date'] == recovery
+    assert status['days_since_event'] == (full.index[-1] - recovery).days
+    assert status['hash_eh'] == pytest.approx(replay_feed.iloc[-1] / 1_000_000)
+    assert status['ribbon'] == pytest.approx(full['ribbon'].iloc[-1])
+    assert status['valuation'] == pytest.approx(60000.0 / status['hash_eh'])
+
+def test_refresh_fails_until_full_history_is_published(replay_feed):
+    engine = hashrate.HashRibbonEngine()
+    refresh = hashrate.make_hash_refresher(engine)
+    # Arranque en frío: sin precio no se publica una valoración vacía...
+    with pytest.raises(RuntimeError):
+        refresh(None)
+    # ...pero la descarga ya quedó en el almacén y el reintento es incremental
+    assert len(engine.frame) == 180
+    signals = refresh(daily_prices())
+    assert len(signals) == DAYS and signals['valuation'].notna().all()
+
+def test_latest_status_during_capitulation():
+    signals = hashrate.ribbon_signals(hash_series().iloc[:DROP[1]])
+    status = hashrate.latest_status(signals)
+    assert status['regime'] == "CAPITULATION" and status['last_event'] == "Capitulation"
+    assert status['last_event_date'] == signals.index[signals['capitulation']][-1]
+    assert status['days_since_event'] == (signals.index[-1] - status['last_event_date']).days
+    assert np.isnan(status['valuation'])
+    assert hashrate.latest_status(pd.DataFrame(columns=hashrate.SIGNAL_COLUMNS)) is None
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import liquidation
+import risk_math
+import scheduler
+
+def test_chunked_ensemble_matches_closed_form():
+    ensemble = liquidation.PathEnsemble(0.55, model="gbm", n_paths=20_000)
+    assert ensemble.running_min.dtype == np.float32
+    # El mínimo acumulado nunca sube de un día al siguiente (también entre bloques)
+    assert (np.diff(ensemble.running_min.mean(axis=1)) <= 1e-6).all()
+    mc = ensemble.hit_prob(100.0, [70.0, 50.0])
+    closed = liquidation.closed_form_hit_prob(100.0, [70.0, 50.0], 0.55)
+    np.testing.assert_allclose(mc[:, [89, 364]], closed[:, [89, 364]], atol=0.03)
+
+def test_render_path_only_queries_the_published_ensemble(monkeypatch):
+    built = []
+    monkeypatch.setattr(liquidation, "PathEnsemble", lambda *a, **k: built.append(a) or "ensemble")
+    sim = risk_math.simulate_credit_line(96000)
+    risk = liquidation.credit_barrier_risk(96000, 0.5, sim)
+    # Sin ensemble publicado: solo fórmula cerrada y ninguna simulación en el render
+    assert not built and risk['margin_call']['mc'] is None and len(risk['margin_call']['closed']) == 4
+
+def test_paths_source_builds_for_the_reference_sigma():
+    refresh = scheduler.RefreshScheduler()
+    frame = pd.DataFrame({'volatility': [0.4, 0.62]}, index=pd.date_range("2025-01-01", periods=2))
+    refresh.register("market", lambda: None, cadence=600).value = {'frames': {'BTC': frame}}
+    refresh.register("iv_surface", lambda: None, cadence=900)
+    ensemble = liquidation.make_paths_refresher(refresh)()
+    assert ensemble.sigma == 0.62 and ensemble.model == "jump"
+    risk = liquidation.credit_barrier_risk(96000, 0.62, ensemble=ensemble)
+    assert len(risk['liquidation']['mc']) == 4 and risk['model'] == "jump"
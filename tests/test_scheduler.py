@@ -0,0 +1,42 @@
+import threading
+import time
+
+import scheduler
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition(): return True
+        time.sleep(0.02)
+    return False
+
+def test_fast_sources_run_while_slow_ones_hold_every_worker():
+    release = threading.Event()
+    refresh = scheduler.RefreshScheduler(max_workers=2)
+    for i in range(4):
+        refresh.register(f"slow_{i}", lambda: release.wait(10), cadence=600, timeout=30, priority=0)
+    refresh.register("live_prices", lambda: time.time(), cadence=5, timeout=3, priority=5)
+    refresh.start()
+    try:
+        assert wait_for(lambda: refresh.version("live_prices") > 0, timeout=2)
+        assert all(refresh.version(f"slow_{i}") == 0 for i in range(4))
+    finally:
+        release.set()
+
+def test_timed_out_job_is_not_dispatched_while_still_running():
+    release = threading.Event()
+    calls = []
+    def hung():
+        calls.append(time.time())
+        release.wait(10)
+    refresh = scheduler.RefreshScheduler()
+    job = refresh.register("hung", hung, cadence=0.1, timeout=0.05, max_backoff=0.05)
+    refresh.start()
+    try:
+        assert wait_for(lambda: job.failures >= 1)
+        time.sleep(0.5)           # Varios next_run_at vencidos con el hilo aún vivo
+        assert len(calls) == 1 and job.busy
+        release.set()
+        assert wait_for(lambda: len(calls) >= 2)
+    finally:
+        release.set()
@@ -0,0 +1,190 @@
+"""
+Capa única de acceso a servicios externos (yfinance, HTTP/JSON, RSS, YouTube).
+
+Modos (variable de entorno VOLCANO_FEED_MODE):
+    live    -> llamadas reales (por defecto)
+    record  -> llamadas reales + se guarda cada respuesta en VOLCANO_FEED_LOG
+    replay  -> no toca la red: sirve las respuestas grabadas
+
+En replay, VOLCANO_REPLAY_SPEED controla el reloj:
+    1   -> tiempo real (cada respuesta aparece cuando apareció al grabar)
+    60  -> 60x más rápido
+    0   -> paso a paso (cada llamada avanza a la siguiente respuesta grabada)
+
+El log es JSON Lines comprimido con gzip: {"t", "key", "payload" | "error"}.
+"""
+import os
+import gzip
+import json
+import time
+import threading
+from types import SimpleNamespace
+
+import requests
+import pandas as pd
+import yfinance as yf
+from urllib.parse import urlparse
+import feedparser
+from youtubesearchpython import VideosSearch
+import telemetry
+
+DEFAULT_LOG = "feed_log.jsonl.gz"
+
+_lock = threading.Lock()
+_replay = None   # Índice cargado en modo replay
+
+def feed_mode():
+    return os.getenv("VOLCANO_FEED_MODE", "live").lower()
+
+def feed_log_path():
+    return os.getenv("VOLCANO_FEED_LOG", DEFAULT_LOG)
+
+# ==============================================================================
+# --- 1. GRABACIÓN ---
+# ==============================================================================
+def _record(key, payload=None, error=None):
+    row = {"t": time.time(), "key": key}
+    if error is not None: row["error"] = str(error)
+    else: row["payload"] = payload
+    line = json.dumps(row, separators=(",", ":"), default=str) + "\n"
+    with _lock:
+        # gzip admite 'append' (cada escritura es un miembro nuevo del stream)
+        with gzip.open(feed_log_path(), "at", encoding="utf-8") as f:
+            f.write(line)
+
+# ==============================================================================
+# --- 2. REPRODUCCIÓN ---
+# ==============================================================================
+class ReplayFeed:
+    """Sirve respuestas grabadas siguiendo un reloj real o acelerado."""
+    def __init__(self, path, speed=1.0):
+        self.speed = speed
+        self.records = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                self.records.setdefault(row["key"], []).append(row)
+        for rows in self.records.values(): rows.sort(key=lambda r: r["t"])
+
+        starts = [rows[0]["t"] for rows in self.records.values()]
+        self.recorded_start = min(starts) if starts else 0
+        self.started_at = time.time()
+        self._cursor = {}
+
+    def clock(self):
+        """Instante de la grabación equivalente a 'ahora'."""
+        return self.recorded_start + (time.time() - self.started_at) * self.speed
+
+    def lookup(self, key):
+        rows = self.records.get(key)
+        if not rows: raise LookupError(f"No recorded response for {key}")
+
+        if self.speed <= 0:
+            i = self._cursor.get(key, 0)
+            self._cursor[key] = min(i + 1, len(rows) - 1)
+            row = rows[i]
+        else:
+            now = self.clock()
+            row = rows[0]
+            for r in rows:
+                if r["t"] > now: break
+                row = r
+
+        if "error" in row: raise RuntimeError(f"Recorded failure for {key}: {row['error']}")
+        return row["payload"]
+
+def _get_replay():
+    global _replay
+    with _lock:
+        if _replay is None:
+            speed = float(os.getenv("VOLCANO_REPLAY_SPEED", "1"))
+            _replay = ReplayFeed(feed_log_path(), speed=speed)
+        return _replay
+
+def _source_label(key):
+    """Etiqueta corta por fuente para las métricas (host o símbolo, sin parámetros)."""
+    kind, _, rest = key.partition(":")
+    if kind in ("http", "rss"): return f"{kind}:{urlparse(rest).netloc}"
+    if kind.startswith("yf."): return f"{kind}:{rest.split(':')[0]}"
+    return kind
+
+def _call(key, live_fn, encode=lambda x: x, decode=lambda x: x):
+    """Punto único: live / record / replay para cualquier llamada externa."""
+    with telemetry.timer("volcano_upstream_seconds", "source", _source_label(key)):
+        return _dispatch(key, live_fn, encode, decode)
+
+def _dispatch(key, live_fn, encode, decode):
+    mode = feed_mode()
+    if mode == "replay":
+        return decode(_get_replay().lookup(key))
+
+    if mode != "record":
+        return live_fn()
+
+    try:
+        result = live_fn()
+    except Exception as e:
+        _record(key, error=e)
+        raise
+    _record(key, payload=encode(result))
+    return result
+
+# ==============================================================================
+# --- 3. SERIALIZACIÓN DE DATAFRAMES ---
+# ==============================================================================
+def _encode_frame(df):
+    idx = df.index
+    tz = str(idx.tz) if getattr(idx, "tz", None) is not None else None
+    ns = idx.tz_convert("UTC").tz_localize(None) if tz else idx
+    return {
+        "index": pd.DatetimeIndex(ns).values.astype("datetime64[ns]").astype("int64").tolist(),
+        "index_name": idx.name,
+        "tz": tz,
+        "columns": list(df.columns),
+        "data": df.to_numpy().tolist(),
+    }
+
+def _decode_frame(p):
+    idx = pd.DatetimeIndex(pd.to_datetime(p["index"], unit="ns"), name=p["index_name"])
+    if p["tz"]: idx = idx.tz_localize("UTC").tz_convert(p["tz"])
+    return pd.DataFrame(p["data"], index=idx, columns=p["columns"])
+
+# ==============================================================================
+# --- 4. LLAMADAS EXTERNAS ---
+# ==============================================================================
+def get_json(url, headers=None, timeout=5):
+    """GET HTTP y decodifica JSON (Bitstamp, Kraken, CoinGecko, alternative.me...)."""
+    return _call(f"http:{url}", lambda: requests.get(url, headers=headers, timeout=timeout).json())
+
+def yf_history(symbol, session=None, **kwargs):
+    """yfinance Ticker.history() -> DataFrame con columnas originales."""
+    def live():
+        t = yf.Ticker(symbol, session=session) if session else yf.Ticker(symbol)
+        return t.history(**kwargs)
+    key = f"yf.history:{symbol}:{json.dumps(kwargs, sort_keys=True)}"
+    return _call(key, live, encode=_encode_frame, decode=_decode_frame)
+
+def yf_last_price(symbol):
+    """yfinance fast_info['last_price']."""
+    return _call(f"yf.last_price:{symbol}", lambda: yf.Ticker(symbol).fast_info['last_price'])
+
+def rss_entries(url):
+    """Entradas de un feed RSS (solo los campos que usa el dashboard)."""
+    def live():
+        feed = feedparser.parse(url)
+        return [
+            {
+                "title": e.get("title", ""),
+                "link": e.get("link", "#"),
+                "published_parsed": list(e.published_parsed) if e.get("published_parsed") else None,
+            }
+            for e in feed.entries
+        ]
+    rows = _call(f"rss:{url}", live)
+    return [SimpleNamespace(**{**r, "published_parsed": tuple(r["published_parsed"]) if r["published_parsed"] else None}) for r in rows]
+
+def youtube_search(query, limit=10):
+    """Resultados de youtube-search-python (lista de dicts)."""
+    def live():
+        return VideosSearch(query, limit=limit).result()['result']
+    return _call(f"youtube:{query}:{limit}", live)
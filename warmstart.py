@@ -0,0 +1,52 @@
+import os
+import time
+import pickle
+import threading
+
+# ==============================================================================
+# --- SNAPSHOT DE ARRANQUE EN CALIENTE ---
+# ==============================================================================
+# Guarda el último resultado bueno de cada fuente en disco para que, tras un
+# deploy o un reinicio del kiosko, la primera pantalla se pinte al instante con
+# esos datos mientras el scheduler revalida en segundo plano.
+#   VOLCANO_SNAPSHOT=0           -> desactiva el snapshot
+#   VOLCANO_SNAPSHOT_DIR=path    -> carpeta (por defecto .volcano_snapshot)
+DEFAULT_DIR = ".volcano_snapshot"
+
+class SnapshotStore:
+    """Un fichero pickle por fuente: {'saved_at', 'value'}. Escritura atómica."""
+    def __init__(self, directory=DEFAULT_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.pkl")
+
+    def save(self, name, value):
+        path = self._path(name)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"saved_at": time.time(), "value": value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock: os.replace(tmp, path)
+
+    def load(self, name):
+        """(valor, instante de guardado) o None si no hay snapshot utilizable."""
+        try:
+            with open(self._path(name), "rb") as f:
+                row = pickle.load(f)
+            return row["value"], row["saved_at"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Snapshot corrupto o de otra versión de pandas: se ignora y se descarga de nuevo
+            print(f"Snapshot Load Error ({name}): {e}")
+            return None
+
+def get_store():
+    """Store configurado por entorno o None si está desactivado."""
+    if os.getenv("VOLCANO_SNAPSHOT", "1").lower() in ("0", "false", "no"): return None
+    try: return SnapshotStore(os.getenv("VOLCANO_SNAPSHOT_DIR", DEFAULT_DIR))
+    except OSError as e:
+        print(f"Snapshot Dir Error: {e}")
+        return None